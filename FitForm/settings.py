@@ -83,6 +83,10 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    # Số liệu latency/SQL theo endpoint, xem tại /metrics (api/metrics.py)
+    'api.metrics.MetricsMiddleware',
+    # Đọc từ replica + ghim client vào primary sau khi ghi (chỉ bật khi có DATABASE_REPLICA_URL)
+    'api.replicas.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
 
@@ -119,6 +123,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'FitForm.wsgi.application'
+# Production chạy ASGI (uvicorn, xem Procfile) để các endpoint đọc async
+# (view adrf trong api/views.py) không giữ worker trong lúc chờ CSDL
+ASGI_APPLICATION = 'FitForm.asgi.application'
 
 
 # Database
@@ -131,9 +138,37 @@ if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.config(
             default=DATABASE_URL,
-            conn_max_age=600
+            # Dưới ASGI mỗi request chạy ORM trong một thread riêng, kết nối
+            # "persistent" không được dùng lại => đặt DB_CONN_MAX_AGE=0 (Procfile)
+            conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '600'))
         )
     }
+    # Bản sao chỉ-đọc (tùy chọn): các request GET đọc từ đây, xem api/replicas.py
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    if DATABASE_REPLICA_URL:
+        DATABASES['replica'] = dj_database_url.parse(
+            DATABASE_REPLICA_URL,
+            conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+        )
+        # Khi chạy test, 'replica' dùng chung CSDL test với 'default'
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+        DATABASE_ROUTERS = ['api.replicas.PrimaryReplicaRouter']
+        # Số giây một client chỉ đọc từ 'default' sau khi ghi (đợi replica bắt kịp)
+        DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', '5'))
+
+    # Connection pool của psycopg 3 cho Postgres: giới hạn số kết nối mỗi
+    # process (tổng = số worker x DB_POOL_MAX_SIZE), thống kê ở /metrics.
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql' and os.environ.get('DB_POOL', 'True') == 'True':
+            database['CONN_MAX_AGE'] = 0  # Pool thay cho persistent connection
+            database.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+                # Số giây tối đa chờ lấy kết nối khi pool đã đầy, quá hạn => lỗi PoolTimeout
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+                # Đóng bớt kết nối rảnh (trên min_size) sau số giây này
+                'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '300')),
+            }
 else:
 
     DATABASES = {
@@ -157,6 +192,32 @@ else:
     }
 
 
+# Cache
+# Dùng cho dữ liệu tính sẵn từ thư viện bài tập (api/catalog.py), ...
+# Khi chạy nhiều worker/instance, đặt REDIS_URL để các worker dùng chung
+# một cache (và cùng thấy khi catalog được làm mới).
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fitform',
+            'OPTIONS': {
+                # Đủ chỗ cho token của các user đang hoạt động (api/authentication.py)
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -222,7 +283,9 @@ REST_FRAMEWORK = {
     # Cấu hình xác thực mặc định
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # Sử dụng Token (gửi qua Header `Authorization: Token ...`)
-        'rest_framework.authentication.TokenAuthentication', 
+        # Bản có cache của TokenAuthentication: không query Token/User
+        # ở mỗi request (xem api/authentication.py)
+        'api.authentication.CachedTokenAuthentication', 
         
         # (Lựa chọn khác: Dùng Session/Cookie, dễ cho web)
         # 'rest_framework.authentication.SessionAuthentication',
@@ -238,6 +301,17 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Token để Prometheus đọc /metrics (header `Authorization: Bearer <token>`).
+# Nếu bỏ trống, chỉ tài khoản staff đã đăng nhập Admin mới xem được.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Thêm header Server-Timing (thời gian, số câu SQL) vào mọi response.
+# Chỉ bật khi đo hiệu năng (manage.py bench), không bật trên production.
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'False') == 'True'
+
+# Thời gian (giây) giữ token đã xác thực (id + quyền của user) trong cache
+TOKEN_CACHE_TIMEOUT = int(os.environ.get('TOKEN_CACHE_TIMEOUT', 300))
+
 # 3. Cấu hình dj-rest-auth
 # Yêu cầu người dùng xác thực email (tùy chọn, có thể set 'none')
 ACCOUNT_EMAIL_VERIFICATION = 'none' 
@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from api.metrics import metrics_view
 
 urlpatterns = [
     # 1. URL cho trang Admin của Django
@@ -33,4 +34,7 @@ urlpatterns = [
     # 3. URL cho các API nghiệp vụ của bạn (UC03 -> UC20)
     # "Bất cứ URL nào bắt đầu bằng /api/v1/ hãy chuyển tiếp đến file api.urls"
     path('api/v1/', include('api.urls')),
+
+    # 4. Số liệu hiệu năng cho Prometheus (cần METRICS_TOKEN)
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
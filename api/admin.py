@@ -8,8 +8,14 @@ from .models import (
     PlanExercise, 
     WorkoutSession, 
     ExerciseLog, 
+    ExerciseSet,
     NutritionLog, 
-    HydrationLog
+    HydrationLog,
+    UserStats,
+    DailyActivity,
+    PersonalRecord,
+    ExerciseHistory,
+    WeeklyMuscleVolume
 )
 
 # Đăng ký các models của bạn tại đây
@@ -20,5 +26,11 @@ admin.site.register(WorkoutPlan)
 admin.site.register(PlanExercise)
 admin.site.register(WorkoutSession)
 admin.site.register(ExerciseLog)
+admin.site.register(ExerciseSet)
 admin.site.register(NutritionLog)
 admin.site.register(HydrationLog)
+admin.site.register(UserStats)
+admin.site.register(DailyActivity)
+admin.site.register(PersonalRecord)
+admin.site.register(ExerciseHistory)
+admin.site.register(WeeklyMuscleVolume)
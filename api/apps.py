@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Đăng ký các signal làm mới catalog bài tập (api/catalog.py)
+        # và xóa cache token khi logout/đổi mật khẩu (api/authentication.py)
+        from . import catalog, authentication  # noqa: F401
@@ -0,0 +1,94 @@
+# api/authentication.py
+"""
+TokenAuthentication có cache.
+
+TokenAuthentication mặc định của DRF JOIN Token + User ở MỌI request. Lớp
+dưới đây chỉ giữ trong Django cache (có TTL) các trường mà việc xác thực cần
+(AUTH_USER_FIELDS: id, username, is_active, ...) rồi dựng lại User từ đó, nên
+request đã xác thực không tốn query nào cho việc này.
+
+KHÔNG cache cả object User: cache dùng chung (Redis), không được chứa hash mật
+khẩu hay dữ liệu cá nhân. Các trường khác của User được để "deferred" và chỉ
+query khi có code đọc tới.
+
+Cache bị xóa ngay khi:
+- Token bị xóa (logout của dj-rest-auth, xóa user => xóa token).
+- User được lưu (đổi mật khẩu, khóa tài khoản, ...).
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Thời gian (giây) một token được giữ trong cache
+TOKEN_CACHE_TIMEOUT = getattr(settings, 'TOKEN_CACHE_TIMEOUT', 300)
+
+# Các trường của User được giữ trong cache (không có password, email, ...)
+AUTH_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def token_cache_key(key):
+    # Không dùng trực tiếp token làm khóa cache
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ Giống TokenAuthentication, nhưng đọc User (chỉ AUTH_USER_FIELDS) từ cache """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        values = cache.get(cache_key)
+        if values is None:
+            row = (
+                Token.objects.filter(key=key)
+                .values_list(*('user__' + name for name in AUTH_USER_FIELDS))
+                .first()
+            )
+            if row is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            values = dict(zip(AUTH_USER_FIELDS, row))
+            cache.set(cache_key, values, TOKEN_CACHE_TIMEOUT)
+        return self._check_token(self._build_token(key, values))
+
+    def _build_token(self, key, values):
+        # Dựng lại User như khi query bằng .only(*AUTH_USER_FIELDS)
+        fields = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+        user = User.from_db('default', fields, [values[name] for name in fields])
+        token = Token.from_db('default', ['key', 'user_id'], [key, user.pk])
+        token.user = user
+        return token
+
+    def _check_token(self, token):
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
+
+
+def forget_tokens(keys):
+    """ Xóa các token khỏi cache: ngay lập tức và lần nữa sau khi commit """
+    cache_keys = [token_cache_key(key) for key in keys]
+    if not cache_keys:
+        return
+    cache.delete_many(cache_keys)
+    # Tránh trường hợp request khác nạp lại dữ liệu cũ trước khi transaction commit
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    if not created:
+        forget_tokens(Token.objects.filter(user=instance).values_list('key', flat=True))
+
@@ -0,0 +1,375 @@
+# api/benchmark.py
+"""
+Đo tải API bằng cách phát lại Postman collection đi kèm repo
+(`My Collection.postman_collection.json`). Dùng qua `manage.py bench`.
+
+1. Tạo N user giả lập có lịch sử tập luyện/dinh dưỡng (`seed_bench_users`).
+2. Mỗi user phát lại các request trong collection, nhiều user chạy song song
+   (thread), trong process (Django test Client) hoặc tới một server thật
+   (vd. gunicorn local) qua HTTP.
+3. Báo cáo cho từng endpoint: throughput, p50/p95/p99 và số câu SQL/request.
+
+Số câu SQL được đọc từ header Server-Timing (xem api/metrics.py). Khi đo
+một server thật, server đó cần chạy với METRICS_SERVER_TIMING=True.
+"""
+import http.client
+import json
+import math
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import Client
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .catalog import get_suggested_plan
+from .fake_data import FOODS, WATER_AMOUNTS_ML, fake_log_values, fake_profile_values
+from .models import Profile, WorkoutPlan, PlanExercise, NutritionLog, HydrationLog
+from .serializers import create_sessions
+
+DEFAULT_COLLECTION = settings.BASE_DIR / 'My Collection.postman_collection.json'
+
+# Không phát lại mặc định:
+# - 'Auth': đăng ký trùng username sẽ lỗi, user bench đã có token sẵn.
+# - 'Create Custom Exercise': tên bài tập là unique, và mỗi lần tạo đều làm
+#   mới catalog (xóa cache của /exercises/, /plans/generate/) => sai số đo.
+DEFAULT_EXCLUDE = ('Auth', 'Create Custom Exercise')
+
+BENCH_USERNAME_PREFIX = 'bench_user_'
+BENCH_PASSWORD = 'BenchPassword123'
+
+SERVER_TIMING_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+# url_name của các route chi tiết trong collection -> đối tượng của user bench
+OWNED_OBJECT_ROUTES = {
+    'plan-detail': 'plan_id',
+    'session-detail': 'session_id',
+}
+
+
+# -------------------------------------------------------------------
+# ĐỌC POSTMAN COLLECTION
+# -------------------------------------------------------------------
+
+class CollectionRequest:
+    """ Một request trong Postman collection """
+
+    def __init__(self, folder, name, method, path, body):
+        self.folder = folder
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+
+    @property
+    def label(self):
+        return f"{self.method} {self.name}"
+
+    def prepare(self, bench_user):
+        """
+        Trả về (path, body) cho một user bench: ID trong URL chi tiết
+        (plans/1/, sessions/1/) và trường 'plan' của body được thay bằng
+        đối tượng của chính user đó.
+        """
+        path = self.path
+        match = resolve(urlsplit(path).path)
+        attr = OWNED_OBJECT_ROUTES.get(match.url_name)
+        if attr and 'pk' in match.kwargs:
+            head, sep, tail = path.rpartition(f"/{match.kwargs['pk']}/")
+            path = f"{head}/{getattr(bench_user, attr)}/{tail}"
+
+        body = self.body
+        if isinstance(body, dict) and 'plan' in body:
+            body = {**body, 'plan': bench_user.plan_id}
+        return path, body
+
+
+def load_collection(path=DEFAULT_COLLECTION, exclude=DEFAULT_EXCLUDE):
+    """ Đọc collection thành danh sách CollectionRequest (theo đúng thứ tự) """
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+
+    requests = []
+
+    def walk(items, folder):
+        for item in items:
+            if 'item' in item:
+                if item['name'] not in exclude:
+                    walk(item['item'], item['name'])
+                continue
+            if item['name'] in exclude:
+                continue
+
+            request = item['request']
+            method = request['method'].upper()
+            path = request['url']['raw'].replace('{{baseUrl}}', '')
+
+            body = None
+            raw = (request.get('body') or {}).get('raw', '').strip()
+            if raw and method not in ('GET', 'HEAD', 'DELETE'):
+                body = json.loads(raw)
+            requests.append(CollectionRequest(folder, item['name'], method, path, body))
+
+    walk(collection['item'], None)
+    return requests
+
+
+# -------------------------------------------------------------------
+# DỮ LIỆU GIẢ LẬP
+# -------------------------------------------------------------------
+
+class BenchUser:
+    def __init__(self, user_id, token, plan_id, session_id):
+        self.user_id = user_id
+        self.token = token
+        self.plan_id = plan_id
+        self.session_id = session_id
+
+
+def _fake_session(rng, plan_exercises, now, history_days):
+    start = now - timedelta(days=rng.uniform(0, history_days), minutes=rng.randint(0, 59))
+    chosen = rng.sample(plan_exercises, k=min(len(plan_exercises), rng.randint(3, 6)))
+    return {
+        'plan': None,
+        'start_time': start,
+        'end_time': start + timedelta(minutes=rng.randint(30, 75)),
+        'total_calories': rng.randint(200, 600),
+        'posture_score_avg': None if rng.random() < 0.1 else round(rng.uniform(60, 98), 1),
+        'logs': [fake_log_values(rng, exercise['exercise_name']) for exercise in chosen],
+    }
+
+
+def seed_bench_users(count, sessions_per_user=30, seed=0, history_days=90):
+    """
+    Xóa các user bench cũ rồi tạo `count` user mới, mỗi user có profile đầy đủ,
+    1 plan gợi ý, `sessions_per_user` buổi tập (đi qua `create_sessions` như
+    API thật, nên UserStats/DailyActivity đúng) và nhật ký dinh dưỡng/nước uống.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    User.objects.filter(username__startswith=BENCH_USERNAME_PREFIX).delete()
+    # Băm mật khẩu 1 lần cho tất cả user (PBKDF2 rất chậm)
+    password = make_password(BENCH_PASSWORD)
+
+    for index in range(count):
+        user = User.objects.create(
+            username=f"{BENCH_USERNAME_PREFIX}{index}",
+            email=f"{BENCH_USERNAME_PREFIX}{index}@example.com",
+            password=password,
+        )
+        profile = fake_profile_values(rng)
+        Profile.objects.filter(user=user).update(**profile)
+        Token.objects.create(user=user)
+
+        suggested = get_suggested_plan(
+            profile['main_goal'], profile['experience_level'],
+            profile['days_per_week'], profile['equipment_available'],
+        )
+        plan_exercises = suggested['plan_exercises'] if suggested else []
+        plan = WorkoutPlan.objects.create(
+            user=user,
+            name=suggested['name'] if suggested else 'Bench plan',
+            description=suggested['description'] if suggested else '',
+        )
+        PlanExercise.objects.bulk_create([
+            PlanExercise(
+                plan=plan, exercise_id=row['exercise_id'], sets=row['sets'],
+                reps=row['reps'], day_number=row['day_number'],
+            )
+            for row in plan_exercises
+        ])
+
+        if plan_exercises:
+            sessions = [
+                _fake_session(rng, plan_exercises, now, history_days)
+                for _ in range(sessions_per_user)
+            ]
+            for session in sessions:
+                session['plan'] = plan
+            create_sessions(user, sessions)
+
+        NutritionLog.objects.bulk_create([
+            NutritionLog(user=user, food_name=food[0], calories=food[1],
+                         protein_g=food[2], carbs_g=food[3], fat_g=food[4])
+            for food in (rng.choice(FOODS) for _ in range(sessions_per_user * 2))
+        ])
+        HydrationLog.objects.bulk_create([
+            HydrationLog(user=user, water_ml=rng.choice(WATER_AMOUNTS_ML))
+            for _ in range(sessions_per_user * 3)
+        ])
+
+    return get_bench_users()
+
+
+def get_bench_users():
+    """ Các user bench đang có trong DB (kèm token, plan và session mới nhất) """
+    bench_users = []
+    users = User.objects.filter(username__startswith=BENCH_USERNAME_PREFIX).order_by('id')
+    for user in users.select_related('auth_token'):
+        plan = user.plans.order_by('id').first()
+        session = user.sessions.order_by('-start_time', '-id').first()
+        bench_users.append(BenchUser(
+            user.id, user.auth_token.key,
+            plan.id if plan else 0, session.id if session else 0,
+        ))
+    return bench_users
+
+
+# -------------------------------------------------------------------
+# GỬI REQUEST
+# -------------------------------------------------------------------
+
+def parse_server_timing(value):
+    """ Số câu SQL trong header Server-Timing, hoặc None nếu server không gửi """
+    match = SERVER_TIMING_QUERIES_RE.search(value or '')
+    return int(match.group(1)) if match else None
+
+
+class InProcessTransport:
+    """ Gọi thẳng vào Django trong process này (không qua mạng) """
+
+    def __init__(self):
+        self._local = threading.local()
+        # Host hợp lệ theo ALLOWED_HOSTS (Client mặc định dùng 'testserver')
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+        self.host = hosts[0] if hosts else 'localhost'
+
+    def request(self, method, path, body, token):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(raise_request_exception=False, HTTP_HOST=self.host)
+        response = client.generic(
+            method, path,
+            data=json.dumps(body) if body is not None else '',
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f"Token {token}",
+        )
+        return response.status_code, response.get('Server-Timing')
+
+
+class HttpTransport:
+    """ Gửi request tới server thật (vd. http://127.0.0.1:8000), giữ kết nối keep-alive """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+
+    def _connection(self, fresh=False):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or fresh:
+            if connection is not None:
+                connection.close()
+            connection = self._local.connection = self.connection_class(self.netloc, timeout=60)
+        return connection
+
+    def request(self, method, path, body, token):
+        headers = {'Authorization': f"Token {token}", 'Content-Type': 'application/json'}
+        payload = json.dumps(body).encode() if body is not None else None
+        try:
+            connection = self._connection()
+            connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = connection.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            # Server đóng kết nối keep-alive => mở lại 1 lần
+            connection = self._connection(fresh=True)
+            connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = connection.getresponse()
+        response.read()
+        return response.status, response.getheader('Server-Timing')
+
+
+# -------------------------------------------------------------------
+# CHẠY VÀ THỐNG KÊ
+# -------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """ Phân vị theo nearest-rank trên danh sách đã sắp xếp """
+    if not sorted_values:
+        return 0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class EndpointStats:
+    def __init__(self, label):
+        self.label = label
+        self.latencies = []
+        self.queries = []
+        self.errors = 0
+
+    def add(self, elapsed, status, queries):
+        self.latencies.append(elapsed)
+        if status is None or status >= 400:
+            self.errors += 1
+        if queries is not None:
+            self.queries.append(queries)
+
+    def summary(self, wall_time):
+        latencies = sorted(self.latencies)
+        return {
+            'endpoint': self.label,
+            'requests': len(latencies),
+            'errors': self.errors,
+            'throughput_rps': len(latencies) / wall_time if wall_time else 0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries_per_request': sum(self.queries) / len(self.queries) if self.queries else None,
+        }
+
+
+def run_benchmark(requests, bench_users, transport, concurrency=4, iterations=5, warmup=1):
+    """
+    Mỗi user bench phát lại `requests` (warmup + iterations) lượt; tối đa
+    `concurrency` user chạy cùng lúc. Lượt warmup không được tính.
+    Trả về (danh sách summary theo endpoint, tổng thời gian chạy).
+    """
+    stats = {request.label: EndpointStats(request.label) for request in requests}
+    lock = threading.Lock()
+
+    def run_user(bench_user):
+        for iteration in range(warmup + iterations):
+            for request in requests:
+                path, body = request.prepare(bench_user)
+                start = time.perf_counter()
+                try:
+                    status, timing = transport.request(request.method, path, body, bench_user.token)
+                except Exception:
+                    status, timing = None, None
+                elapsed = time.perf_counter() - start
+                if iteration >= warmup:
+                    with lock:
+                        stats[request.label].add(elapsed, status, parse_server_timing(timing))
+
+    def run_user_in_thread(bench_user):
+        try:
+            run_user(bench_user)
+        finally:
+            # Mỗi thread có kết nối DB riêng (chế độ in-process)
+            connections.close_all()
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        for bench_user in bench_users:
+            run_user(bench_user)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(run_user_in_thread, bench_users))
+    wall_time = time.perf_counter() - start
+
+    return [endpoint.summary(wall_time) for endpoint in stats.values()], wall_time
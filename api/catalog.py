@@ -0,0 +1,259 @@
+# api/catalog.py
+"""
+Dữ liệu suy ra từ thư viện bài tập (Exercise), được tính sẵn và giữ trong
+bộ nhớ của process.
+
+Mọi thứ ở đây gắn với một "phiên bản catalog" lưu trong Django cache.
+Mỗi lần bảng Exercise thay đổi (qua API, Django Admin, ...), phiên bản được
+đổi => dữ liệu tính sẵn tự động được tính lại ở lần đọc kế tiếp.
+Khi chạy nhiều worker, cần cấu hình CACHES dùng chung (Redis) để mọi
+worker cùng thấy phiên bản mới (xem FitForm/settings.py).
+"""
+import hashlib
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.http import quote_etag
+
+from .models import Profile, Exercise
+from .utils import normalize_exercise_name
+
+CATALOG_VERSION_KEY = 'exercise-catalog-version'
+
+
+def get_catalog_version():
+    """ Trả về phiên bản hiện tại của thư viện bài tập (chuỗi ngẫu nhiên). """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def aget_catalog_version():
+    """ Bản async của `get_catalog_version` """
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def exercise_changed(sender, instance, **kwargs):
+    # Đổi phiên bản sau khi commit, để process khác không tính lại từ dữ liệu cũ
+    transaction.on_commit(bump_catalog_version)
+
+
+# (version, {id: Exercise}, {tên đã chuẩn hóa: id}) — thay cả tuple một lần để các thread luôn đọc bản nhất quán
+_exercise_index = (None, {}, {})
+_exercise_index_lock = threading.Lock()
+
+
+def _get_exercise_index():
+    global _exercise_index
+
+    version = get_catalog_version()
+    if _exercise_index[0] != version:
+        with _exercise_index_lock:
+            if _exercise_index[0] != version:
+                by_id = Exercise.objects.in_bulk()
+                by_name = {normalize_exercise_name(exercise.name): pk for pk, exercise in by_id.items()}
+                _exercise_index = (version, by_id, by_name)
+    return _exercise_index
+
+
+def get_exercises_by_id():
+    """
+    {id: Exercise} của toàn bộ thư viện bài tập, dùng để validate ID bài tập
+    gửi lên mà không tốn 1 query/bài tập. Các instance được dùng chung giữa
+    các request: chỉ đọc, không sửa.
+    """
+    return _get_exercise_index()[1]
+
+
+def get_exercise_ids_by_name():
+    """
+    {tên bài tập đã chuẩn hóa: id} (xem `normalize_exercise_name`), để gắn
+    ExerciseLog.exercise theo exercise_name khi ghi log mà không tốn query nào.
+    """
+    return _get_exercise_index()[2]
+
+
+# -------------------------------------------------------------------
+# UC15: CACHE RESPONSE CỦA GET /exercises/
+# -------------------------------------------------------------------
+
+# Các tham số lọc của ExerciseViewSet (khớp với `filterset_fields`)
+EXERCISE_FILTER_FIELDS = ('muscle_group', 'equipment', 'difficulty', 'movement_pattern')
+EXERCISE_LIST_CACHE_TIMEOUT = 60 * 60
+
+
+def exercise_filter_signature(query_params):
+    """ Chuẩn hóa các tham số lọc (sắp xếp, bỏ giá trị rỗng) thành 1 chuỗi """
+    return '&'.join(
+        f"{field}={query_params[field]}"
+        for field in EXERCISE_FILTER_FIELDS
+        if query_params.get(field)
+    )
+
+
+def exercise_list_cache_key(query_params, version=None):
+    """
+    Khóa cache cho một bộ lọc: gồm phiên bản catalog + các tham số lọc.
+    Catalog đổi => khóa đổi => cache cũ bị bỏ qua.
+    (Các view async truyền sẵn `version` lấy từ `aget_catalog_version`.)
+    """
+    version = version or get_catalog_version()
+    return f"exercise-list:{version}:{exercise_filter_signature(query_params)}"
+
+
+def exercise_etag(*parts, version=None):
+    """
+    ETag (strong) cho một response của thư viện bài tập, vd.
+    exercise_etag('guide', pk). Đổi mỗi khi catalog đổi phiên bản.
+    """
+    raw = ':'.join([version or get_catalog_version(), *map(str, parts)])
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+# -------------------------------------------------------------------
+# UC06: CATALOG KẾ HOẠCH GỢI Ý (cho GET /plans/generate/)
+# -------------------------------------------------------------------
+
+# Template cho các loại buổi tập
+SESSION_TEMPLATES = {
+    'Full Body': ['squat', 'hinge', 'horizontal_push', 'horizontal_pull', 'core'],
+    'Upper': ['horizontal_push', 'horizontal_pull', 'vertical_push', 'vertical_pull', 'isolation'],
+    'Lower': ['squat', 'hinge', 'lunge', 'core'],
+    'Push': ['horizontal_push', 'vertical_push', 'isolation'], # Chest, Shoulders, Triceps
+    'Pull': ['horizontal_pull', 'vertical_pull', 'isolation'], # Back, Biceps
+    'Legs': ['squat', 'hinge', 'lunge', 'core'],
+}
+
+# Các giá trị days_per_week được tính sẵn (ngoài khoảng này vẫn tính được, chỉ không cache)
+PLAN_DAYS_RANGE = range(1, 8)
+
+
+def get_structure(days, experience):
+    """Helper: Quyết định cấu trúc plan (e.g., Full Body, Upper/Lower)"""
+    if days <= 2:
+        return ['Full Body'] * days
+    if days == 3:
+        return ['Full Body'] * 3 # (e.g., Full Body A, B, C)
+    if days == 4:
+        if experience == 'beginner':
+            return ['Full Body', 'Full Body', 'Full Body', 'Full Body']
+        else:
+            return ['Upper', 'Lower', 'Upper', 'Lower']
+    if days >= 5:
+        if experience == 'beginner':
+            return ['Upper', 'Lower', 'Rest', 'Upper', 'Lower'] # 4 ngày
+        else:
+            # PPL (Push, Pull, Legs)
+            return ['Push', 'Pull', 'Legs', 'Push', 'Pull'] # 5 ngày
+    return ['Full Body'] # Default
+
+
+def get_sets_reps(goal):
+    """Helper: Quyết định sets/reps dựa trên mục tiêu"""
+    if goal == 'build_muscle':
+        return (4, "8-12") # (sets, reps)
+    elif goal == 'lose_weight':
+        return (3, "12-15")
+    else: # maintain
+        return (3, "10-12")
+
+
+def build_suggested_plan(pattern_pool, goal, experience, days):
+    """
+    Tạo JSON kế hoạch gợi ý (khớp với WorkoutPlanSerializer).
+    `pattern_pool` là {movement_pattern: exercise} của một loại dụng cụ.
+    """
+    plan_structure = get_structure(days, experience)
+    sets, reps = get_sets_reps(goal)
+
+    final_exercise_list = []
+    for day_index, session_type in enumerate(plan_structure):
+        day_number = day_index + 1 # (e.g., 1, 2, 3)
+
+        if session_type == 'Rest':
+            continue
+
+        for pattern in SESSION_TEMPLATES.get(session_type, []):
+            exercise = pattern_pool.get(pattern)
+            if exercise:
+                # Nó phải khớp với PlanExerciseSerializer
+                final_exercise_list.append({
+                    "exercise_id": exercise['id'],
+                    "exercise_name": exercise['name'], # Thêm tên cho dễ đọc ở frontend
+                    "sets": sets,
+                    "reps": reps,
+                    "day_number": day_number,
+                    "description": exercise['description']
+                })
+
+    return {
+        "name": f"Gợi ý: {goal} - {days} ngày",
+        "description": f"Kế hoạch tự động cho {experience} - {days} ngày/tuần.",
+        "plan_exercises": final_exercise_list
+    }
+
+
+# (version, pools, plans) — thay cả tuple một lần để các thread luôn đọc bản nhất quán
+_plan_catalog = (None, {}, {})
+_plan_catalog_lock = threading.Lock()
+
+
+def _build_plan_catalog():
+    """
+    Đọc Exercise đúng 1 lần rồi tính sẵn kế hoạch cho mọi tổ hợp
+    goal × experience × days × equipment.
+    """
+    # {equipment: {movement_pattern: exercise đầu tiên (theo id)}}
+    pools = {}
+    exercises = Exercise.objects.order_by('id').values('id', 'name', 'description', 'equipment', 'movement_pattern')
+    for exercise in exercises:
+        pools.setdefault(exercise['equipment'], {}).setdefault(exercise['movement_pattern'], exercise)
+
+    plans = {}
+    for equipment, _label in Profile.EQUIPMENT_CHOICES:
+        if equipment not in pools:
+            continue
+        for goal in Profile.GoalChoices.values:
+            for experience in Profile.ExperienceChoices.values:
+                for days in PLAN_DAYS_RANGE:
+                    plans[(goal, experience, days, equipment)] = build_suggested_plan(
+                        pools[equipment], goal, experience, days
+                    )
+    return pools, plans
+
+
+def get_suggested_plan(goal, experience, days, equipment):
+    """
+    Trả về kế hoạch gợi ý đã tính sẵn, hoặc None nếu không có bài tập nào
+    cho loại dụng cụ này. Không tốn query nào khi catalog còn mới.
+    """
+    global _plan_catalog
+
+    version = get_catalog_version()
+    if _plan_catalog[0] != version:
+        with _plan_catalog_lock:
+            if _plan_catalog[0] != version:
+                _plan_catalog = (version, *_build_plan_catalog())
+
+    _version, pools, plans = _plan_catalog
+    plan = plans.get((goal, experience, days, equipment))
+    if plan is None and equipment in pools:
+        # Tổ hợp ngoài danh sách tính sẵn (vd. days_per_week = 10)
+        plan = build_suggested_plan(pools[equipment], goal, experience, days)
+    return plan
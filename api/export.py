@@ -0,0 +1,192 @@
+# api/export.py
+"""
+Xuất toàn bộ lịch sử của một user (buổi tập, log bài tập, dinh dưỡng, nước uống)
+dưới dạng NDJSON hoặc CSV, xem `ExportView` trong api/views.py.
+
+Dữ liệu được stream: mỗi bảng đọc bằng `.iterator()` (server-side cursor trên
+Postgres), ghi ra từng dòng và gom thành các khối ~64 KB, có thể nén gzip
+trên đường đi. Bộ nhớ dùng không phụ thuộc độ dài lịch sử.
+"""
+import csv
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.text import compress_sequence
+from rest_framework.renderers import BaseRenderer
+
+from .models import WorkoutSession, ExerciseLog, ExerciseSet, NutritionLog, HydrationLog
+
+# Số dòng mỗi lần lấy từ cursor
+EXPORT_FETCH_SIZE = 2000
+# Kích thước mỗi khối gửi đi (byte)
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Giá trị q=... của một mục trong Accept-Encoding (RFC 9110, mục 12.4.2)
+_QVALUE = re.compile(r'^(0(?:\.\d{0,3})?|1(?:\.0{0,3})?)$')
+
+
+class ExportDataset:
+    """ Một bảng có thể xuất: các cột, cách lọc theo user và theo ngày """
+
+    def __init__(self, model, user_field, date_field, fields, ordering=None):
+        self.model = model
+        self.user_field = user_field
+        self.date_field = date_field
+        self.fields = fields
+        self.ordering = ordering or (date_field, 'id')
+
+    def queryset(self, user, since=None):
+        queryset = self.model.objects.filter(**{self.user_field: user})
+        if since is not None:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': since})
+        return queryset.order_by(*self.ordering).values_list(*self.fields)
+
+
+EXPORT_DATASETS = {
+    'sessions': ExportDataset(
+        WorkoutSession, 'user', 'start_time',
+        ('id', 'plan_id', 'start_time', 'end_time', 'total_calories', 'posture_score_avg'),
+    ),
+    'exercise_logs': ExportDataset(
+        ExerciseLog, 'session__user', 'session__start_time',
+        ('id', 'session_id', 'exercise_id', 'muscle_group', 'exercise_name', 'sets_completed', 'reps_completed', 'weight_kg', 'posture_feedback'),
+        # Cùng thứ tự với 'sessions'
+        ordering=('session__start_time', 'session_id', 'id'),
+    ),
+    'exercise_sets': ExportDataset(
+        ExerciseSet, 'log__session__user', 'log__session__start_time',
+        ('id', 'log_id', 'set_number', 'reps', 'duration_seconds', 'weight_kg'),
+        ordering=('log__session__start_time', 'log__session_id', 'log_id', 'set_number'),
+    ),
+    'nutrition': ExportDataset(
+        NutritionLog, 'user', 'log_date',
+        ('id', 'log_date', 'food_name', 'calories', 'protein_g', 'carbs_g', 'fat_g'),
+    ),
+    'hydration': ExportDataset(
+        HydrationLog, 'user', 'log_time',
+        ('id', 'log_time', 'water_ml'),
+    ),
+}
+
+
+class NDJSONRenderer(BaseRenderer):
+    """ Chỉ dùng cho content negotiation (?format=ndjson) và render lỗi """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """ Chỉ dùng cho content negotiation (?format=csv) và render lỗi """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data.items() if isinstance(data, dict) else [('detail', data)]
+        return ''.join(_csv_line(row) for row in rows)
+
+
+class _Echo:
+    """ "File" giả cho csv.writer: trả lại luôn dòng vừa ghi thay vì lưu """
+
+    def write(self, value):
+        return value
+
+
+_csv_writer = csv.writer(_Echo())
+
+
+def _csv_line(row):
+    return _csv_writer.writerow(row)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def ndjson_lines(querysets):
+    """ querysets: [(tên bảng, ExportDataset, queryset)] -> mỗi bản ghi một dòng JSON có "type" """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for name, dataset, queryset in querysets:
+        for row in queryset.iterator(chunk_size=EXPORT_FETCH_SIZE):
+            yield encoder.encode({'type': name, **dict(zip(dataset.fields, row))}) + '\n'
+
+
+def csv_lines(dataset, queryset):
+    yield _csv_line(dataset.fields)
+    for row in queryset.iterator(chunk_size=EXPORT_FETCH_SIZE):
+        yield _csv_line([_csv_value(value) for value in row])
+
+
+def chunked(lines, size=EXPORT_CHUNK_SIZE):
+    """ Gom các dòng thành khối bytes ~`size`, tránh gửi quá nhiều gói nhỏ """
+    buffer = []
+    buffered = 0
+    for line in lines:
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= size:
+            yield ''.join(buffer).encode()
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Client có nhận gzip không, theo header Accept-Encoding:
+    "gzip, deflate" -> True; "gzip;q=0" / "x-gzip" / "" -> False; "*" -> True.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                # q không hợp lệ => coi như không nhận
+                quality = float(value.strip()) if _QVALUE.match(value.strip()) else 0.0
+        qualities[coding] = quality
+    return qualities.get('gzip', qualities.get('*', 0)) > 0
+
+
+def export_stream(lines, gzip=False, asynchronous=False):
+    """
+    Nội dung cho StreamingHttpResponse.
+    Dưới ASGI Django chỉ stream được iterator async (iterator thường bị đọc hết vào
+    bộ nhớ), nên khi `asynchronous` mỗi khối được lấy trong thread của request,
+    cùng kết nối CSDL đang giữ cursor.
+    """
+    body = chunked(lines)
+    if gzip:
+        body = compress_sequence(body)
+    return _aiterate(body) if asynchronous else body
+
+
+_EXHAUSTED = object()
+
+
+async def _aiterate(iterator):
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(iterator, _EXHAUSTED)) is not _EXHAUSTED:
+            yield chunk
+    finally:
+        # Client ngắt giữa chừng: đóng cursor trong đúng thread đang giữ kết nối
+        await sync_to_async(iterator.close)()
@@ -0,0 +1,302 @@
+# api/fake_data.py
+"""
+Sinh dữ liệu giả lập quy mô lớn (hàng triệu dòng) để tái hiện các vấn đề
+hiệu năng chỉ xuất hiện khi có nhiều dữ liệu. Dùng qua `manage.py generate_fake_data`.
+
+- Ghi bằng bulk_create theo lô, từng nhóm user một (bộ nhớ không tăng theo tổng số dòng).
+- Cùng seed + cùng ngày kết thúc => cùng một bộ dữ liệu (trừ khóa chính do DB cấp).
+- Các bảng tổng hợp (UserStats, DailyActivity) được tính lại sau mỗi nhóm user.
+"""
+import datetime
+import operator
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .catalog import build_suggested_plan
+from .models import (
+    Profile, Exercise, WorkoutPlan, PlanExercise, WorkoutSession, ExerciseLog, ExerciseSet,
+    NutritionLog, HydrationLog,
+)
+from .stats import rebuild_all
+from .utils import parse_sets
+
+FAKE_USERNAME_PREFIX = 'fake_user_'
+FAKE_PASSWORD = 'FakePassword123'
+
+# Cách phân bố số bản ghi (session, bữa ăn, ...) giữa các user
+DISTRIBUTIONS = ('fixed', 'uniform', 'exponential')
+
+FOODS = [
+    ('Ức gà và Cơm', 450, 35.5, 50.0, 10.2),
+    ('Phở bò', 500, 28.0, 65.0, 12.0),
+    ('Bánh mì trứng', 380, 15.0, 45.0, 14.0),
+    ('Sữa chua Hy Lạp', 150, 15.0, 8.0, 5.0),
+    ('Salad cá ngừ', 320, 30.0, 12.0, 16.0),
+    ('Yến mạch chuối', 350, 10.0, 60.0, 7.0),
+]
+WATER_AMOUNTS_ML = [200, 250, 330, 500]
+
+# Thứ tự cột cho các bảng được ghi bằng `_insert_rows`
+EXERCISE_LOG_FIELDS = ['session', 'exercise', 'muscle_group', 'exercise_name', 'sets_completed', 'reps_completed', 'weight_kg', 'posture_feedback']
+EXERCISE_SET_FIELDS = ['log', 'set_number', 'reps', 'duration_seconds', 'weight_kg']
+NUTRITION_LOG_FIELDS = ['user', 'food_name', 'calories', 'protein_g', 'carbs_g', 'fat_g', 'log_date']
+HYDRATION_LOG_FIELDS = ['user', 'water_ml', 'log_time']
+log_row_values = operator.itemgetter(*EXERCISE_LOG_FIELDS[3:])
+
+
+def fake_log_values(rng, exercise_name):
+    """ Các trường của một ExerciseLog (khớp ExerciseLogSerializer) """
+    sets = rng.randint(3, 5)
+    weight = rng.choice([0, 10, 20, 30, 40, 60, 80, 100])
+    return {
+        'exercise_name': exercise_name,
+        'sets_completed': sets,
+        'reps_completed': ', '.join(str(rng.randint(5, 15)) for _ in range(sets)),
+        'weight_kg': ', '.join(str(weight) for _ in range(sets)),
+        'posture_feedback': {'form_score': rng.randint(50, 100)},
+    }
+
+
+def fake_profile_values(rng):
+    return {
+        'height_cm': rng.randint(150, 195),
+        'weight_kg': rng.randint(45, 110),
+        'age': rng.randint(16, 70),
+        'gender': rng.choice(Profile.GenderChoices.values),
+        'activity_level': rng.choice(Profile.ActivityChoices.values),
+        'main_goal': rng.choice(Profile.GoalChoices.values),
+        'experience_level': rng.choice(Profile.ExperienceChoices.values),
+        'days_per_week': rng.randint(2, 6),
+        'equipment_available': rng.choice([value for value, _label in Profile.EQUIPMENT_CHOICES]),
+    }
+
+
+class FakeDataGenerator:
+    """
+    Sinh user + profile, plan (kèm PlanExercise), session (kèm ExerciseLog và ExerciseSet),
+    nutrition log và hydration log.
+
+    Số bản ghi mỗi user là "trung bình" theo `distribution`:
+    - 'fixed': mọi user đều bằng trung bình;
+    - 'uniform': ngẫu nhiên đều trong [0, 2 x trung bình];
+    - 'exponential': đuôi dài — đa số user ít dữ liệu, một số rất nhiều.
+    """
+
+    def __init__(self, users=1000, plans_per_user=2, sessions_per_user=50, logs_per_session=(3, 8),
+                 nutrition_per_user=100, hydration_per_user=150, history_days=365,
+                 distribution='exponential', end_date=None, seed=0, batch_size=5000,
+                 users_per_chunk=500, progress=None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"distribution phải là một trong {DISTRIBUTIONS}")
+        self.users = users
+        self.plans_per_user = plans_per_user
+        self.sessions_per_user = sessions_per_user
+        self.logs_per_session = logs_per_session
+        self.nutrition_per_user = nutrition_per_user
+        self.hydration_per_user = hydration_per_user
+        self.history_days = history_days
+        self.distribution = distribution
+        self.end_date = end_date or timezone.localdate()
+        self.end_of_history = timezone.make_aware(
+            datetime.datetime.combine(self.end_date + datetime.timedelta(days=1), datetime.time())
+        )
+        self.batch_size = batch_size
+        self.users_per_chunk = users_per_chunk
+        self.progress = progress or (lambda counts: None)
+        self.rng = random.Random(seed)
+        self.counts = dict.fromkeys(
+            ['users', 'plans', 'plan_exercises', 'sessions', 'exercise_logs', 'exercise_sets',
+             'nutrition_logs', 'hydration_logs'], 0
+        )
+
+    # --- Tiện ích ---
+
+    def _count(self, mean):
+        if self.distribution == 'fixed':
+            return mean
+        if self.distribution == 'uniform':
+            return self.rng.randint(0, 2 * mean)
+        return int(self.rng.expovariate(1 / mean)) if mean else 0
+
+    def _timestamp(self):
+        """ Một thời điểm ngẫu nhiên (5h-23h) trong `history_days` ngày tính đến hết `end_date` """
+        return self.end_of_history - datetime.timedelta(
+            days=self.rng.randrange(self.history_days),
+            minutes=self.rng.randrange(60, 19 * 60),
+        )
+
+    def _bulk_create(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        return objs
+
+    def _insert_rows(self, model, field_names, rows):
+        """
+        INSERT nhiều dòng (tuple theo thứ tự `field_names`) mà không tạo model
+        instance. Dùng cho các bảng lớn nhất, không cần lấy lại khóa chính:
+        bulk_create tốn phần lớn thời gian cho việc dựng object và chuẩn bị
+        từng giá trị. Lưu ý: bỏ qua auto_now_add và giá trị mặc định của field.
+        """
+        fields = [model._meta.get_field(name) for name in field_names]
+        # Chỉ các kiểu cần chuyển đổi riêng theo backend (datetime, JSON)
+        adapters = [
+            (index, field) for index, field in enumerate(fields)
+            if isinstance(field, (models.DateTimeField, models.JSONField))
+        ]
+        if adapters:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for index, field in adapters:
+                    row[index] = field.get_db_prep_save(row[index], connection)
+
+        batch_size = min(self.batch_size, connection.ops.bulk_batch_size(fields, rows) or self.batch_size)
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        placeholder = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) VALUES {', '.join([placeholder] * len(batch))}",
+                    [value for row in batch for value in row],
+                )
+        return len(rows)
+
+    # --- Sinh dữ liệu ---
+
+    def generate(self):
+        """ Sinh toàn bộ dữ liệu, trả về số dòng đã tạo của từng bảng """
+        catalog = list(Exercise.objects.order_by('id').values(
+            'id', 'name', 'description', 'equipment', 'movement_pattern', 'muscle_group'
+        ))
+        if not catalog:
+            raise ValueError("Chưa có bài tập nào (hãy chạy migrate để seed thư viện bài tập).")
+        pools = {}
+        for exercise in catalog:
+            pools.setdefault(exercise['equipment'], {}).setdefault(exercise['movement_pattern'], exercise)
+
+        # Băm mật khẩu 1 lần cho tất cả user (PBKDF2 rất chậm)
+        password = make_password(FAKE_PASSWORD)
+        start_index = User.objects.filter(username__startswith=FAKE_USERNAME_PREFIX).count()
+
+        for offset in range(0, self.users, self.users_per_chunk):
+            size = min(self.users_per_chunk, self.users - offset)
+            with transaction.atomic():
+                users = self._generate_chunk(start_index + offset, size, password, catalog, pools)
+                rebuild_all([user.pk for user in users])
+            self.progress(self.counts)
+        return self.counts
+
+    def _generate_chunk(self, start_index, size, password, catalog, pools):
+        """ Sinh một nhóm user: mỗi bảng chỉ vài câu INSERT cho cả nhóm """
+        users = self._bulk_create(User, [
+            User(
+                username=f"{FAKE_USERNAME_PREFIX}{start_index + index}",
+                email=f"{FAKE_USERNAME_PREFIX}{start_index + index}@example.com",
+                password=password,
+            )
+            for index in range(size)
+        ])
+        # bulk_create không gửi signal post_save => tự tạo Profile
+        profiles = self._bulk_create(Profile, [
+            Profile(user=user, **fake_profile_values(self.rng)) for user in users
+        ])
+
+        plans = [(user, self._fake_plans(user, profile, catalog, pools)) for user, profile in zip(users, profiles)]
+        self._bulk_create(WorkoutPlan, [plan for _user, user_plans in plans for plan, _rows in user_plans])
+        plan_exercises = self._bulk_create(PlanExercise, [
+            PlanExercise(plan=plan, exercise_id=row['exercise_id'], sets=row['sets'],
+                         reps=row['reps'], day_number=row['day_number'])
+            for _user, user_plans in plans
+            for plan, rows in user_plans
+            for row in rows
+        ])
+
+        sessions = [session for user, user_plans in plans for session in self._fake_sessions(user, user_plans, catalog)]
+        # Cần khóa chính của session (bulk_create trả về id trên PostgreSQL/SQLite)
+        self._bulk_create(WorkoutSession, [session for session, _names in sessions])
+        # Tên bài tập đều lấy từ catalog => gắn luôn exercise_id, muscle_group (như ExerciseLogSerializer)
+        exercises = {exercise['name']: (exercise['id'], exercise['muscle_group']) for exercise in catalog}
+        logs = self._insert_rows(ExerciseLog, EXERCISE_LOG_FIELDS, [
+            (session.pk, *exercises.get(name, (None, None)), *log_row_values(fake_log_values(self.rng, name)))
+            for session, names in sessions
+            for name in names
+        ])
+        # Log được ghi không lấy lại khóa chính => đọc lại để tách từng set (như ExerciseLogSerializer)
+        exercise_sets = self._insert_rows(ExerciseSet, EXERCISE_SET_FIELDS, [
+            (log_id, *exercise_set)
+            for log_id, *strings in ExerciseLog.objects.filter(session__user__in=users).values_list(
+                'id', 'sets_completed', 'reps_completed', 'weight_kg',
+            ).iterator()
+            for exercise_set in parse_sets(*strings)
+        ])
+        nutrition = self._insert_rows(NutritionLog, NUTRITION_LOG_FIELDS, [
+            (user.pk, *self.rng.choice(FOODS), self._timestamp())
+            for user in users
+            for _ in range(self._count(self.nutrition_per_user))
+        ])
+        hydration = self._insert_rows(HydrationLog, HYDRATION_LOG_FIELDS, [
+            (user.pk, self.rng.choice(WATER_AMOUNTS_ML), self._timestamp())
+            for user in users
+            for _ in range(self._count(self.hydration_per_user))
+        ])
+
+        self.counts['users'] += len(users)
+        self.counts['plans'] += sum(len(user_plans) for _user, user_plans in plans)
+        self.counts['plan_exercises'] += len(plan_exercises)
+        self.counts['sessions'] += len(sessions)
+        self.counts['exercise_logs'] += logs
+        self.counts['exercise_sets'] += exercise_sets
+        self.counts['nutrition_logs'] += nutrition
+        self.counts['hydration_logs'] += hydration
+        return users
+
+    def _fake_plans(self, user, profile, catalog, pools):
+        """ [(WorkoutPlan, các dòng plan_exercises)]: plan đầu là plan gợi ý theo profile """
+        rng = self.rng
+        plans = []
+        for index in range(self.plans_per_user):
+            if index == 0 and profile.equipment_available in pools:
+                suggested = build_suggested_plan(
+                    pools[profile.equipment_available], profile.main_goal,
+                    profile.experience_level, profile.days_per_week,
+                )
+                rows = suggested['plan_exercises']
+                name = suggested['name']
+            else:
+                rows = [
+                    {'exercise_id': exercise['id'], 'exercise_name': exercise['name'],
+                     'sets': rng.randint(3, 5), 'reps': rng.choice(['5', '8-12', '12-15', '30s']),
+                     'day_number': day}
+                    for day in range(1, rng.randint(1, 5) + 1)
+                    for exercise in rng.sample(catalog, k=min(len(catalog), rng.randint(3, 6)))
+                ]
+                name = f"Plan {index + 1}"
+            plans.append((WorkoutPlan(user=user, name=name, description=''), rows))
+        return plans
+
+    def _fake_sessions(self, user, plans, catalog):
+        """ [(WorkoutSession, tên các bài tập đã tập)]: 80% theo plan, còn lại tập tự do """
+        rng = self.rng
+        sessions = []
+        for _ in range(self._count(self.sessions_per_user)):
+            plan, rows = rng.choice(plans) if plans and rng.random() < 0.8 else (None, [])
+            names = [row['exercise_name'] for row in rows] or [exercise['name'] for exercise in catalog]
+            start = self._timestamp()
+            session = WorkoutSession(
+                user=user, plan=plan,
+                start_time=start,
+                end_time=start + datetime.timedelta(minutes=rng.randint(20, 90)),
+                total_calories=rng.randint(150, 800),
+                posture_score_avg=None if rng.random() < 0.1 else round(rng.uniform(50, 99), 1),
+            )
+            sessions.append((session, rng.choices(names, k=rng.randint(*self.logs_per_session))))
+        return sessions
+
+
+def delete_fake_data():
+    """ Xóa toàn bộ user giả lập (và mọi dữ liệu của họ, theo CASCADE) """
+    return User.objects.filter(username__startswith=FAKE_USERNAME_PREFIX).delete()
@@ -0,0 +1,110 @@
+# api/management/commands/bench.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api.benchmark import (
+    DEFAULT_COLLECTION, DEFAULT_EXCLUDE,
+    load_collection, seed_bench_users, get_bench_users, run_benchmark,
+    InProcessTransport, HttpTransport,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo tải API: tạo user giả lập rồi phát lại Postman collection, báo cáo "
+        "throughput, p50/p95/p99 và số câu SQL/request cho từng endpoint. "
+        "CHÚ Ý: ghi dữ liệu vào database đang cấu hình, chỉ chạy trên DB thử nghiệm."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help="Số user giả lập (mặc định 20).")
+        parser.add_argument('--sessions', type=int, default=30, help="Số buổi tập có sẵn của mỗi user (mặc định 30).")
+        parser.add_argument('--seed', type=int, default=0, help="Seed cho dữ liệu giả lập.")
+        parser.add_argument('--no-seed', action='store_true', help="Dùng lại các user bench đã tạo ở lần chạy trước.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Số user chạy song song (mặc định 4).")
+        parser.add_argument('--iterations', type=int, default=5, help="Số lượt phát lại collection của mỗi user.")
+        parser.add_argument('--warmup', type=int, default=1, help="Số lượt chạy trước, không tính vào kết quả.")
+        parser.add_argument(
+            '--url',
+            help="Đo một server đang chạy (vd. http://127.0.0.1:8000) thay vì gọi trong process. "
+                 "Server cần METRICS_SERVER_TIMING=True để có số câu SQL.",
+        )
+        parser.add_argument('--collection', default=str(DEFAULT_COLLECTION), help="Đường dẫn Postman collection.")
+        parser.add_argument(
+            '--exclude', action='append',
+            help=f"Bỏ qua thư mục/request theo tên (lặp lại được). Mặc định: {', '.join(DEFAULT_EXCLUDE)}.",
+        )
+        parser.add_argument('--output', help="Ghi kết quả ra file JSON (để so sánh giữa các lần chạy).")
+
+    def handle(self, *args, **options):
+        exclude = options['exclude'] if options['exclude'] is not None else DEFAULT_EXCLUDE
+        requests = load_collection(options['collection'], exclude)
+        if not requests:
+            raise CommandError("Collection không còn request nào để chạy.")
+
+        if options['no_seed']:
+            bench_users = get_bench_users()
+        else:
+            self.stdout.write(f"Tạo {options['users']} user giả lập...")
+            bench_users = seed_bench_users(options['users'], options['sessions'], options['seed'])
+        if not bench_users:
+            raise CommandError("Chưa có user bench nào, hãy chạy lại không kèm --no-seed.")
+
+        if options['url']:
+            transport = HttpTransport(options['url'])
+        else:
+            transport = InProcessTransport()
+            if connection.vendor == 'sqlite' and options['concurrency'] > 1:
+                self.stdout.write(self.style.WARNING(
+                    "SQLite chỉ cho 1 transaction ghi tại một thời điểm: các request ghi "
+                    "có thể lỗi 'database is locked' khi chạy song song."
+                ))
+
+        target = options['url'] or 'in-process'
+        self.stdout.write(
+            f"Phát lại {len(requests)} request x {options['iterations']} lượt x {len(bench_users)} user "
+            f"({options['concurrency']} song song, {target}, {connection.vendor})..."
+        )
+        with override_settings(METRICS_SERVER_TIMING=True):
+            results, wall_time = run_benchmark(
+                requests, bench_users, transport,
+                concurrency=options['concurrency'],
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+            )
+
+        self.print_report(results, wall_time)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'target': target,
+                    'database': connection.vendor,
+                    'users': len(bench_users),
+                    'concurrency': options['concurrency'],
+                    'iterations': options['iterations'],
+                    'wall_time_s': wall_time,
+                    'endpoints': results,
+                }, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Đã ghi kết quả vào {options['output']}")
+
+    def print_report(self, results, wall_time):
+        header = f"{'Endpoint':<40} {'Req':>6} {'Err':>5} {'RPS':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL/req':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in results:
+            queries = row['queries_per_request']
+            self.stdout.write(
+                f"{row['endpoint'][:40]:<40} {row['requests']:>6} {row['errors']:>5} "
+                f"{row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                f"{row['p99_ms']:>8.1f} {(f'{queries:.1f}' if queries is not None else '-'):>8}"
+            )
+        total = sum(row['requests'] for row in results)
+        errors = sum(row['errors'] for row in results)
+        self.stdout.write('-' * len(header))
+        style = self.style.SUCCESS if not errors else self.style.WARNING
+        self.stdout.write(style(
+            f"Tổng: {total} request, {errors} lỗi, {total / wall_time if wall_time else 0:.1f} req/s trong {wall_time:.1f}s"
+        ))
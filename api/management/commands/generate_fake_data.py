@@ -0,0 +1,84 @@
+# api/management/commands/generate_fake_data.py
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.fake_data import DISTRIBUTIONS, FAKE_USERNAME_PREFIX, FakeDataGenerator, delete_fake_data
+
+
+def parse_range(value):
+    """ "3-8" -> (3, 8); "5" -> (5, 5) """
+    low, _sep, high = value.partition('-')
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise CommandError(f"Khoảng không hợp lệ: {value!r} (ví dụ: 3-8)")
+    if low < 1 or high < low:
+        raise CommandError(f"Khoảng không hợp lệ: {value!r} (ví dụ: 3-8)")
+    return low, high
+
+
+class Command(BaseCommand):
+    help = (
+        "Sinh dữ liệu giả lập (user, profile, plan, session, log dinh dưỡng/nước uống) "
+        "để kiểm thử hiệu năng. Cùng --seed và --end-date => cùng một bộ dữ liệu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Số user cần tạo (mặc định 1000).")
+        parser.add_argument('--plans-per-user', type=int, default=2, help="Số plan mỗi user (mặc định 2).")
+        parser.add_argument('--sessions-per-user', type=int, default=50, help="Số buổi tập trung bình mỗi user (mặc định 50).")
+        parser.add_argument('--logs-per-session', default='3-8', help="Số bài tập mỗi buổi, dạng min-max (mặc định 3-8).")
+        parser.add_argument('--nutrition-per-user', type=int, default=100, help="Số bữa ăn trung bình mỗi user (mặc định 100).")
+        parser.add_argument('--hydration-per-user', type=int, default=150, help="Số lần uống nước trung bình mỗi user (mặc định 150).")
+        parser.add_argument('--days', type=int, default=365, help="Dữ liệu trải đều trong bao nhiêu ngày gần nhất (mặc định 365).")
+        parser.add_argument(
+            '--distribution', choices=DISTRIBUTIONS, default='exponential',
+            help="Phân bố số bản ghi giữa các user (mặc định exponential: đuôi dài, giống dữ liệu thật).",
+        )
+        parser.add_argument('--end-date', type=datetime.date.fromisoformat, help="Ngày cuối của dữ liệu, YYYY-MM-DD (mặc định hôm nay).")
+        parser.add_argument('--seed', type=int, default=0, help="Seed cho bộ sinh số ngẫu nhiên (mặc định 0).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Số dòng mỗi câu INSERT (mặc định 5000).")
+        parser.add_argument('--chunk-users', type=int, default=500, help="Số user mỗi transaction (mặc định 500).")
+        parser.add_argument('--clear', action='store_true', help=f"Xóa các user {FAKE_USERNAME_PREFIX}* đã tạo trước khi sinh.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _per_model = delete_fake_data()
+            self.stdout.write(f"Đã xóa {deleted} dòng dữ liệu giả lập cũ.")
+
+        started = time.perf_counter()
+
+        def progress(counts):
+            self.stdout.write(
+                f"  {counts['users']}/{options['users']} user, {counts['sessions']} session, "
+                f"{counts['exercise_logs']} exercise log ({time.perf_counter() - started:.0f}s)"
+            )
+
+        try:
+            generator = FakeDataGenerator(
+                users=options['users'],
+                plans_per_user=options['plans_per_user'],
+                sessions_per_user=options['sessions_per_user'],
+                logs_per_session=parse_range(options['logs_per_session']),
+                nutrition_per_user=options['nutrition_per_user'],
+                hydration_per_user=options['hydration_per_user'],
+                history_days=options['days'],
+                distribution=options['distribution'],
+                end_date=options['end_date'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                users_per_chunk=options['chunk_users'],
+                progress=progress,
+            )
+            counts = generator.generate()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tạo {total} dòng trong {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} dòng/s): "
+            + ', '.join(f"{count} {name}" for name, count in counts.items())
+        ))
@@ -0,0 +1,20 @@
+# api/management/commands/rebuild_stats.py
+from django.core.management.base import BaseCommand
+
+from api.stats import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Tính lại các bảng tổng hợp (UserStats, DailyActivity, WeeklyMuscleVolume, PersonalRecord, ExerciseHistory) từ dữ liệu WorkoutSession gốc."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help="Chỉ tính lại cho user có ID này (có thể lặp lại nhiều lần).",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        rebuild_all(user_ids)
+        scope = f"{len(user_ids)} user" if user_ids else "tất cả user"
+        self.stdout.write(self.style.SUCCESS(f"Đã tính lại các bảng tổng hợp cho {scope}."))
@@ -0,0 +1,359 @@
+# api/metrics.py
+"""
+Số liệu hiệu năng theo từng endpoint, xuất ra định dạng text của Prometheus
+tại GET /metrics (cần token, xem `metrics_view`).
+
+Với mỗi route đã resolve (vd. 'plan-generate', 'dashboard', 'session-list'):
+- thời gian xử lý request (histogram),
+- số câu SQL và tổng thời gian SQL của request (histogram),
+- kích thước response (histogram),
+- số request theo status code (counter).
+Ngoài ra là thống kê connection pool của Postgres (đang dùng, rảnh, thời gian
+chờ, số lần quá hạn), nếu có bật pool (xem DATABASES trong settings).
+
+Nếu bật METRICS_SERVER_TIMING, mỗi response có thêm header Server-Timing
+(thời gian xử lý, số câu SQL) — dùng cho `manage.py bench`.
+
+Response stream (vd. GET /export/) chỉ chạy phần lớn câu SQL khi body được
+gửi đi, sau khi view đã trả về: số liệu của chúng được ghi khi stream kết
+thúc (tính cả thời gian gửi body), và không có header Server-Timing (header
+đã được gửi trước body).
+
+Lưu ý: số liệu nằm trong bộ nhớ của từng process. Khi chạy nhiều worker
+gunicorn, mỗi lần scrape chỉ thấy số liệu của worker trả lời request đó.
+"""
+import hmac
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+METRICS_PATH = '/metrics'
+# Route của các request không khớp URL nào (404), gom chung để tránh bùng nổ nhãn
+UNMATCHED_ROUTE = 'unmatched'
+# Method ngoài danh sách này (client gửi tùy ý) cũng được gom chung vì cùng lý do
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+OTHER_METHOD = 'other'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}'
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.labelnames = labelnames
+        # {labels: [số đếm mỗi bucket..., tổng, số quan sát]}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * len(self.buckets) + [0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            items = sorted((labels, list(state)) for labels, state in self._values.items())
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = (('le', _format_number(bound)),)
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(state[-2])}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {state[-1]}'
+
+
+REQUESTS = Counter(
+    'fitform_http_requests_total', 'Số request theo route, method và status code.',
+    ('route', 'method', 'status'),
+)
+REQUEST_LATENCY = Histogram(
+    'fitform_http_request_duration_seconds', 'Thời gian xử lý request (giây).',
+    LATENCY_BUCKETS, ('route', 'method'),
+)
+DB_QUERIES = Histogram(
+    'fitform_http_db_queries', 'Số câu SQL trong mỗi request.',
+    QUERY_COUNT_BUCKETS, ('route', 'method'),
+)
+DB_TIME = Histogram(
+    'fitform_http_db_duration_seconds', 'Tổng thời gian chạy SQL trong mỗi request (giây).',
+    LATENCY_BUCKETS, ('route', 'method'),
+)
+RESPONSE_SIZE = Histogram(
+    'fitform_http_response_size_bytes', 'Kích thước body của response (byte; response stream: số byte đã gửi).',
+    SIZE_BUCKETS, ('route', 'method'),
+)
+
+
+def connection_pools():
+    """ [(alias, pool)] của các kết nối CSDL có bật pool (Postgres + psycopg 3) """
+    pools = []
+    for alias in connections:
+        wrapper = connections[alias]
+        if wrapper.vendor == 'postgresql' and wrapper.settings_dict['OPTIONS'].get('pool'):
+            pools.append((alias, wrapper.pool))
+    return pools
+
+
+class PoolStatsCollector:
+    """
+    Thống kê connection pool, đọc trực tiếp từ `pool.get_stats()` mỗi lần scrape.
+    Các bộ đếm của psycopg_pool là lũy kế từ lúc mở pool (chỉ có khi khác 0).
+    """
+    # (tên, loại, mô tả, hàm tính từ stats)
+    SAMPLES = (
+        ('fitform_db_pool_max_connections', 'gauge', 'Số kết nối tối đa của pool.',
+         lambda stats: stats.get('pool_max', 0)),
+        ('fitform_db_pool_in_use_connections', 'gauge', 'Số kết nối đang được request sử dụng.',
+         lambda stats: stats.get('pool_size', 0) - stats.get('pool_available', 0)),
+        ('fitform_db_pool_idle_connections', 'gauge', 'Số kết nối rảnh trong pool.',
+         lambda stats: stats.get('pool_available', 0)),
+        ('fitform_db_pool_waiting_requests', 'gauge', 'Số request đang chờ lấy kết nối.',
+         lambda stats: stats.get('requests_waiting', 0)),
+        ('fitform_db_pool_requests_total', 'counter', 'Số lần lấy kết nối từ pool.',
+         lambda stats: stats.get('requests_num', 0)),
+        ('fitform_db_pool_queued_requests_total', 'counter', 'Số lần phải xếp hàng vì pool không còn kết nối rảnh.',
+         lambda stats: stats.get('requests_queued', 0)),
+        ('fitform_db_pool_wait_seconds_total', 'counter', 'Tổng thời gian chờ lấy kết nối (giây).',
+         lambda stats: stats.get('requests_wait_ms', 0) / 1000),
+        ('fitform_db_pool_timeouts_total', 'counter', 'Số lần lấy kết nối thất bại (hết DB_POOL_TIMEOUT).',
+         lambda stats: stats.get('requests_errors', 0)),
+        ('fitform_db_pool_connections_lost_total', 'counter', 'Số kết nối hỏng bị pool loại bỏ.',
+         lambda stats: stats.get('connections_lost', 0) + stats.get('returns_bad', 0)),
+    )
+
+    def __init__(self, get_pools=connection_pools):
+        self.get_pools = get_pools
+
+    def collect(self):
+        pools = [(alias, pool.get_stats()) for alias, pool in self.get_pools()]
+        if not pools:
+            return
+        for name, kind, documentation, value in self.SAMPLES:
+            yield f'# HELP {name} {documentation}'
+            yield f'# TYPE {name} {kind}'
+            for alias, stats in pools:
+                yield f'{name}{_format_labels(("alias",), (alias,))} {_format_number(value(stats))}'
+
+
+DB_POOL = PoolStatsCollector()
+
+REGISTRY = [REQUESTS, REQUEST_LATENCY, DB_QUERIES, DB_TIME, RESPONSE_SIZE, DB_POOL]
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+class QueryRecorder:
+    """ execute_wrapper đếm số câu SQL và cộng dồn thời gian chạy """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def server_timing(recorder, elapsed):
+    """ Giá trị header Server-Timing: tổng thời gian và thời gian/số câu SQL (ms) """
+    return (
+        f'app;dur={elapsed * 1000:.3f}, '
+        f'db;dur={recorder.duration * 1000:.3f};desc="{recorder.count} queries"'
+    )
+
+
+class MetricsMiddleware:
+    """
+    Ghi số liệu cho mọi request (trừ chính /metrics).
+    Chạy được cả dưới WSGI lẫn ASGI (các view async của adrf, xem api/views.py).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path == METRICS_PATH:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        stack = self.install(recorder)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        if response.streaming:
+            return self.finish_stream(request, response, recorder, start, stack)
+        stack.close()
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if request.path == METRICS_PATH:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        # Mỗi thread có kết nối CSDL riêng: cài wrapper trong đúng thread mà
+        # ORM (sync_to_async, thread_sensitive) của request này sẽ dùng
+        stack = await sync_to_async(self.install)(recorder)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            await sync_to_async(stack.close)()
+            raise
+        if response.streaming:
+            return self.finish_stream(request, response, recorder, start, stack)
+        await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, time.perf_counter() - start)
+
+    @staticmethod
+    def install(recorder):
+        """ Gắn `recorder` vào mọi kết nối CSDL của thread hiện tại """
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def finish(self, request, response, recorder, elapsed):
+        self.record(request, response, recorder, elapsed, len(response.content))
+        if getattr(settings, 'METRICS_SERVER_TIMING', False):
+            response['Server-Timing'] = server_timing(recorder, elapsed)
+        return response
+
+    def finish_stream(self, request, response, recorder, start, stack):
+        """
+        Giữ `recorder` tới khi body được gửi hết (hoặc client ngắt) rồi mới ghi số liệu.
+        Body được đọc trong đúng thread đã cài recorder: thread của request
+        dưới WSGI; dưới ASGI là thread sync_to_async (thread_sensitive) của request.
+        """
+        content = response.streaming_content
+
+        def done(size):
+            stack.close()
+            self.record(request, response, recorder, time.perf_counter() - start, size)
+
+        if response.is_async:
+            async def measured():
+                size = 0
+                try:
+                    async for chunk in content:
+                        size += len(chunk)
+                        yield chunk
+                finally:
+                    await sync_to_async(done)(size)
+        else:
+            def measured():
+                size = 0
+                try:
+                    for chunk in content:
+                        size += len(chunk)
+                        yield chunk
+                finally:
+                    done(size)
+
+        response.streaming_content = measured()
+        return response
+
+    @staticmethod
+    def record(request, response, recorder, elapsed, size):
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name or match.view_name) if match else UNMATCHED_ROUTE
+        method = request.method if request.method in KNOWN_METHODS else OTHER_METHOD
+        labels = (route, method)
+
+        REQUESTS.inc(labels + (str(response.status_code),))
+        REQUEST_LATENCY.observe(labels, elapsed)
+        DB_QUERIES.observe(labels, recorder.count)
+        DB_TIME.observe(labels, recorder.duration)
+        RESPONSE_SIZE.observe(labels, size)
+
+
+def metrics_view(request):
+    """
+    GET /metrics — cần header `Authorization: Bearer <METRICS_TOKEN>`.
+    Nếu chưa cấu hình METRICS_TOKEN thì chỉ tài khoản staff (đăng nhập
+    Django Admin) xem được.
+    """
+    expected = getattr(settings, 'METRICS_TOKEN', None)
+    provided = request.headers.get('Authorization', '')
+    if expected:
+        allowed = hmac.compare_digest(provided, f'Bearer {expected}')
+    else:
+        allowed = request.user.is_authenticated and request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2025-11-03 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_alter_planexercise_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hydrationlog',
+            index=models.Index(fields=['user', '-log_time', '-id'], name='hydration_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nutritionlog',
+            index=models.Index(fields=['user', '-log_date', '-id'], name='nutrition_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutsession',
+            index=models.Index(fields=['user', '-start_time', '-id'], name='session_user_start_idx'),
+        ),
+    ]
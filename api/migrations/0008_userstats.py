@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_user_stats(apps, schema_editor):
+    """ Tính UserStats cho các session đã có trước migration này """
+    WorkoutSession = apps.get_model('api', 'WorkoutSession')
+    UserStats = apps.get_model('api', 'UserStats')
+
+    rows = WorkoutSession.objects.values('user_id').annotate(
+        total_calories=Sum('total_calories'),
+        workout_count=Count('id'),
+        posture_score_sum=Sum('posture_score_avg'),
+        posture_score_count=Count('posture_score_avg'),
+    ).order_by()
+    UserStats.objects.bulk_create([
+        UserStats(
+            user_id=row['user_id'],
+            total_calories=row['total_calories'] or 0,
+            workout_count=row['workout_count'],
+            posture_score_sum=row['posture_score_sum'] or 0,
+            posture_score_count=row['posture_score_count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_hydrationlog_hydration_user_time_idx_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_calories', models.BigIntegerField(default=0)),
+                ('workout_count', models.IntegerField(default=0)),
+                ('posture_score_sum', models.FloatField(default=0)),
+                ('posture_score_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_activity(apps, schema_editor):
+    """ Tạo chỉ mục ngày tập cho các session đã có trước migration này """
+    WorkoutSession = apps.get_model('api', 'WorkoutSession')
+    DailyActivity = apps.get_model('api', 'DailyActivity')
+
+    rows = WorkoutSession.objects.annotate(day=TruncDate('start_time')).values('user_id', 'day').annotate(
+        session_count=Count('id'),
+    ).order_by()
+    DailyActivity.objects.bulk_create([
+        DailyActivity(user_id=row['user_id'], date=row['day'], session_count=row['session_count'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_userstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('session_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_activity, migrations.RunPython.noop),
+    ]
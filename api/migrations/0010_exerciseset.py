@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_dailyactivity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('set_number', models.PositiveSmallIntegerField()),
+                ('reps', models.PositiveIntegerField(blank=True, null=True)),
+                ('duration_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('weight_kg', models.FloatField(blank=True, null=True)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sets', to='api.exerciselog')),
+            ],
+            options={
+                'ordering': ['log', 'set_number'],
+                'unique_together': {('log', 'set_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:36
+
+import re
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+# Cách tách set dưới đây được chép từ api/utils.py lúc viết migration (không
+# import): migration phải cho cùng kết quả dù api/utils.py đổi về sau.
+MAX_SETS_PER_LOG = 50
+
+_SET_SEPARATOR = re.compile(r'[,;/]')
+_REPS = re.compile(r'^(\d+)\s*(s|sec|giây)?\b', re.IGNORECASE)
+_WEIGHT = re.compile(r'^(\d+(?:\.\d+)?)')
+
+
+def _split_values(text):
+    return [value.strip() for value in _SET_SEPARATOR.split(str(text or '')) if value.strip()]
+
+
+def parse_reps(value):
+    match = _REPS.match(value)
+    if not match:
+        return None, None
+    number = int(match.group(1))
+    return (None, number) if match.group(2) else (number, None)
+
+
+def parse_weight(value):
+    match = _WEIGHT.match(value)
+    return float(match.group(1)) if match else None
+
+
+def parse_sets(sets_completed, reps_completed, weight_kg):
+    """ (3, "12, 10, 8", "60, 60, 70") -> [(set_number, reps, duration_seconds, weight_kg), ...] """
+    reps = _split_values(reps_completed)
+    weights = _split_values(weight_kg)
+    count = max(len(reps), len(weights), sets_completed or 0)
+    count = min(count, MAX_SETS_PER_LOG)
+
+    def value_at(values, index):
+        if not values:
+            return None
+        if len(values) == 1:
+            return values[0]
+        return values[index] if index < len(values) else None
+
+    sets = []
+    for index in range(count):
+        rep_value = value_at(reps, index)
+        weight_value = value_at(weights, index)
+        set_reps, duration = parse_reps(rep_value) if rep_value else (None, None)
+        sets.append((index + 1, set_reps, duration, parse_weight(weight_value) if weight_value else None))
+    return sets
+
+
+def backfill_exercise_sets(apps, schema_editor):
+    """
+    Tách reps_completed/weight_kg của các log đã có thành ExerciseSet.
+    Chạy theo lô (theo id) và commit từng lô: không giữ cả bảng trong bộ nhớ,
+    không giữ một transaction dài. Chạy lại được: bỏ qua log đã có set.
+    """
+    ExerciseLog = apps.get_model('api', 'ExerciseLog')
+    ExerciseSet = apps.get_model('api', 'ExerciseSet')
+
+    last_id = 0
+    while True:
+        batch = list(
+            ExerciseLog.objects.filter(id__gt=last_id, sets__isnull=True)
+            .order_by('id')
+            .values_list('id', 'sets_completed', 'reps_completed', 'weight_kg')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        with transaction.atomic():
+            ExerciseSet.objects.bulk_create([
+                ExerciseSet(log_id=log_id, set_number=number, reps=reps, duration_seconds=duration, weight_kg=weight)
+                for log_id, sets_completed, reps_completed, weight_kg in batch
+                for number, reps, duration, weight in parse_sets(sets_completed, reps_completed, weight_kg)
+            ], batch_size=BATCH_SIZE)
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+    # Mỗi lô tự commit (xem backfill_exercise_sets)
+    atomic = False
+
+    dependencies = [
+        ('api', '0010_exerciseset'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_exercise_sets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:41
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+
+def normalize_exercise_name(name):
+    """ Bản sao của api.utils.normalize_exercise_name lúc viết migration (không import code đang chạy) """
+    return ' '.join(str(name or '').split()).casefold()
+
+
+def backfill_exerciselog_exercise(apps, schema_editor):
+    """
+    Gắn ExerciseLog.exercise cho các log đã có, theo exercise_name.
+    Chạy theo lô (theo id) và commit từng lô; mỗi lô chỉ 1 UPDATE cho mỗi
+    bài tập xuất hiện trong lô. Log có tên không khớp bài tập nào giữ null.
+    """
+    Exercise = apps.get_model('api', 'Exercise')
+    ExerciseLog = apps.get_model('api', 'ExerciseLog')
+
+    exercise_ids = {
+        normalize_exercise_name(name): pk
+        for pk, name in Exercise.objects.values_list('id', 'name')
+    }
+    if not exercise_ids:
+        return
+
+    last_id = 0
+    while True:
+        batch = list(
+            ExerciseLog.objects.filter(id__gt=last_id, exercise__isnull=True)
+            .order_by('id')
+            .values_list('id', 'exercise_name')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        log_ids = {}
+        for log_id, name in batch:
+            exercise_id = exercise_ids.get(normalize_exercise_name(name))
+            if exercise_id is not None:
+                log_ids.setdefault(exercise_id, []).append(log_id)
+        with transaction.atomic():
+            for exercise_id, ids in log_ids.items():
+                ExerciseLog.objects.filter(id__in=ids).update(exercise_id=exercise_id)
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+    # Mỗi lô tự commit (xem backfill_exerciselog_exercise)
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_exerciselog_exercise'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_exerciselog_exercise, migrations.RunPython.noop),
+    ]
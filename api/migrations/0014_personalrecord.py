@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Cách tính kỷ lục dưới đây được chép từ api/utils.py lúc viết migration (không
+# import): đổi công thức về sau không được làm đổi kết quả của backfill này.
+E1RM_MAX_REPS = 12
+
+RECORD_METRICS = {
+    'max_weight_kg': 'max_weight_at',
+    'max_reps': 'max_reps_at',
+    'estimated_1rm_kg': 'estimated_1rm_at',
+}
+
+
+def estimate_one_rep_max(reps, weight_kg):
+    if not reps or not weight_kg or reps > E1RM_MAX_REPS:
+        return None
+    if reps == 1:
+        return weight_kg
+    return round(weight_kg * (1 + reps / 30), 1)
+
+
+def set_marks(reps, weight_kg):
+    marks = {
+        'max_weight_kg': weight_kg or None,
+        'max_reps': reps or None,
+        'estimated_1rm_kg': estimate_one_rep_max(reps, weight_kg),
+    }
+    return {metric: value for metric, value in marks.items() if value is not None}
+
+
+def best_marks(rows):
+    """ rows: (khóa, thời điểm, reps, weight_kg) theo thứ tự thời gian -> {khóa: {chỉ số: (giá trị, thời điểm)}} """
+    bests = {}
+    for key, achieved_at, reps, weight_kg in rows:
+        best = bests.setdefault(key, {})
+        for metric, value in set_marks(reps, weight_kg).items():
+            if metric not in best or value > best[metric][0]:
+                best[metric] = (value, achieved_at)
+    return bests
+
+
+def backfill_personal_records(apps, schema_editor):
+    """ Tính kỷ lục cá nhân từ các ExerciseSet đã có trước migration này """
+    ExerciseSet = apps.get_model('api', 'ExerciseSet')
+    PersonalRecord = apps.get_model('api', 'PersonalRecord')
+
+    rows = ExerciseSet.objects.filter(log__exercise__isnull=False).order_by(
+        'log__session__start_time', 'log_id', 'set_number',
+    ).values_list('log__session__user_id', 'log__exercise_id', 'log__session__start_time', 'reps', 'weight_kg')
+    bests = best_marks(
+        ((user_id, exercise_id), achieved_at, reps, weight_kg)
+        for user_id, exercise_id, achieved_at, reps, weight_kg in rows.iterator(chunk_size=2000)
+    )
+    PersonalRecord.objects.bulk_create([
+        PersonalRecord(
+            user_id=user_id,
+            exercise_id=exercise_id,
+            **{metric: value for metric, (value, _at) in best.items()},
+            **{RECORD_METRICS[metric]: achieved_at for metric, (_value, achieved_at) in best.items()},
+        )
+        for (user_id, exercise_id), best in bests.items()
+        if best
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_backfill_exerciselog_exercise'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonalRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_weight_kg', models.FloatField(blank=True, null=True)),
+                ('max_weight_at', models.DateTimeField(blank=True, null=True)),
+                ('max_reps', models.PositiveIntegerField(blank=True, null=True)),
+                ('max_reps_at', models.DateTimeField(blank=True, null=True)),
+                ('estimated_1rm_kg', models.FloatField(blank=True, null=True)),
+                ('estimated_1rm_at', models.DateTimeField(blank=True, null=True)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to='api.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'exercise')},
+            },
+        ),
+        migrations.RunPython(backfill_personal_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:50
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+BATCH_SIZE = 2000
+
+# Định dạng ExerciseHistory.recent lúc viết migration, chép từ api/utils.py
+# (không import code đang chạy)
+RECENT_LOGS_PER_EXERCISE = 5
+
+
+def history_entry(session_id, start_time, sets):
+    return {
+        'session': session_id,
+        'at': start_time.astimezone(datetime.timezone.utc).isoformat(timespec='microseconds'),
+        'sets': [list(set_values) for set_values in sets],
+    }
+
+
+def latest_entries(entries):
+    return sorted(entries, key=lambda entry: (entry['at'], entry['session']), reverse=True)[:RECENT_LOGS_PER_EXERCISE]
+
+
+def backfill_exercise_history(apps, schema_editor):
+    """ N lần tập gần nhất mỗi (user, bài tập) cho các log đã có trước migration này """
+    ExerciseLog = apps.get_model('api', 'ExerciseLog')
+    ExerciseSet = apps.get_model('api', 'ExerciseSet')
+    ExerciseHistory = apps.get_model('api', 'ExerciseHistory')
+
+    ranked = list(ExerciseLog.objects.filter(exercise__isnull=False).annotate(rank=Window(
+        RowNumber(),
+        partition_by=[F('session__user_id'), F('exercise_id')],
+        order_by=[F('session__start_time').desc(), F('session_id').desc(), F('id').desc()],
+    )).filter(rank__lte=RECENT_LOGS_PER_EXERCISE).values_list(
+        'id', 'session__user_id', 'exercise_id', 'session_id', 'session__start_time',
+    ))
+
+    sets = {}
+    for start in range(0, len(ranked), BATCH_SIZE):
+        log_ids = [row[0] for row in ranked[start:start + BATCH_SIZE]]
+        rows = ExerciseSet.objects.filter(log_id__in=log_ids).order_by('log_id', 'set_number').values_list(
+            'log_id', 'reps', 'weight_kg', 'duration_seconds',
+        )
+        for log_id, *set_values in rows:
+            sets.setdefault(log_id, []).append(set_values)
+
+    recent = {}
+    for log_id, user_id, exercise_id, session_id, start_time in ranked:
+        recent.setdefault((user_id, exercise_id), []).append(history_entry(session_id, start_time, sets.get(log_id, [])))
+    ExerciseHistory.objects.bulk_create([
+        ExerciseHistory(user_id=user_id, exercise_id=exercise_id, recent=latest_entries(entries))
+        for (user_id, exercise_id), entries in recent.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_personalrecord'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recent', models.JSONField(default=list)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='histories', to='api.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_histories', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'exercise')},
+            },
+        ),
+        migrations.RunPython(backfill_exercise_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, ExpressionWrapper, F, FloatField, Sum
+from django.db.models.functions import TruncWeek
+
+
+def backfill_weekly_muscle_volume(apps, schema_editor):
+    """ Số set, rep, tonnage mỗi (user, tuần, nhóm cơ) cho các set đã có trước migration này """
+    ExerciseSet = apps.get_model('api', 'ExerciseSet')
+    WeeklyMuscleVolume = apps.get_model('api', 'WeeklyMuscleVolume')
+
+    rows = ExerciseSet.objects.filter(log__exercise__isnull=False).annotate(
+        week=TruncWeek('log__session__start_time', output_field=DateField()),
+    ).values('log__session__user_id', 'week', 'log__exercise__muscle_group').annotate(
+        set_count=Count('id'),
+        total_reps=Sum('reps'),
+        volume_kg=Sum(ExpressionWrapper(F('reps') * F('weight_kg'), output_field=FloatField())),
+    ).order_by()
+    WeeklyMuscleVolume.objects.bulk_create([
+        WeeklyMuscleVolume(
+            user_id=row['log__session__user_id'],
+            week_start=row['week'],
+            muscle_group=row['log__exercise__muscle_group'],
+            set_count=row['set_count'],
+            total_reps=row['total_reps'] or 0,
+            volume_kg=round(row['volume_kg'] or 0, 2),
+        )
+        for row in rows.iterator(chunk_size=2000)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_exercisehistory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyMuscleVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('muscle_group', models.CharField(choices=[('legs', 'Legs'), ('chest', 'Chest'), ('back', 'Back'), ('shoulders', 'Shoulders'), ('arms', 'Arms'), ('core', 'Core'), ('other', 'Other')], max_length=50)),
+                ('set_count', models.IntegerField(default=0)),
+                ('total_reps', models.IntegerField(default=0)),
+                ('volume_kg', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_volumes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'week_start', 'muscle_group')},
+            },
+        ),
+        migrations.RunPython(backfill_weekly_muscle_volume, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+def backfill_exerciselog_muscle_group(apps, schema_editor):
+    """
+    Chép nhóm cơ hiện tại của bài tập sang các log đã có (1 UPDATE mỗi nhóm cơ),
+    khớp với WeeklyMuscleVolume đã được tính ở 0016.
+    """
+    Exercise = apps.get_model('api', 'Exercise')
+    ExerciseLog = apps.get_model('api', 'ExerciseLog')
+
+    for muscle_group in Exercise.objects.values_list('muscle_group', flat=True).distinct():
+        ExerciseLog.objects.filter(exercise__muscle_group=muscle_group).update(muscle_group=muscle_group)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_weeklymusclevolume'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exerciselog',
+            name='muscle_group',
+            field=models.CharField(blank=True, choices=[('legs', 'Legs'), ('chest', 'Chest'), ('back', 'Back'), ('shoulders', 'Shoulders'), ('arms', 'Arms'), ('core', 'Core'), ('other', 'Other')], max_length=50, null=True),
+        ),
+        migrations.RunPython(backfill_exerciselog_muscle_group, migrations.RunPython.noop),
+    ]
@@ -159,13 +159,25 @@ class WorkoutSession(models.Model):
     total_calories = models.IntegerField(default=0)
     posture_score_avg = models.FloatField(null=True, blank=True) # Điểm tư thế TB (từ UC10)
 
+    class Meta:
+        indexes = [
+            # Phục vụ lịch sử buổi tập (phân trang theo con trỏ)
+            models.Index(fields=['user', '-start_time', '-id'], name='session_user_start_idx'),
+        ]
+
     def __str__(self):
         return f"Session on {self.start_time.strftime('%Y-%m-%d')} by {self.user.username}"
 
 class ExerciseLog(models.Model):
     """ (UC09, UC10) Lưu chi tiết TỪNG bài tập trong 1 session """
     session = models.ForeignKey(WorkoutSession, on_delete=models.CASCADE, related_name='logs')
+    # Bài tập trong thư viện, tra theo tên khi ghi log (xem api/catalog.py).
+    # Null nếu tên không có trong thư viện hoặc Exercise gốc đã bị xóa.
+    exercise = models.ForeignKey(Exercise, null=True, blank=True, on_delete=models.SET_NULL, related_name='logs')
     exercise_name = models.CharField(max_length=100) # Lưu tên, phòng khi Exercise gốc bị xóa
+    # Nhóm cơ của bài tập lúc ghi log (cho WeeklyMuscleVolume): không đổi khi
+    # Exercise gốc bị sửa nhóm cơ hoặc bị xóa. Null nếu không gắn được bài tập.
+    muscle_group = models.CharField(max_length=50, choices=Exercise.MuscleGroup.choices, null=True, blank=True)
     
     # Dữ liệu tracking (UC09)
     sets_completed = models.IntegerField()
@@ -175,6 +187,125 @@ class ExerciseLog(models.Model):
     # Dữ liệu AI (UC10)
     posture_feedback = models.JSONField(null=True, blank=True) # (e.g., {"back_straight": 90, "knee_angle": 85})
 
+class ExerciseSet(models.Model):
+    """
+    Từng set của một ExerciseLog, dạng số (tách từ chuỗi "12, 10, 8" / "60, 60, 70").
+    Để tính volume/tonnage/set tốt nhất bằng aggregate SQL thay vì parse chuỗi.
+    """
+    log = models.ForeignKey(ExerciseLog, on_delete=models.CASCADE, related_name='sets')
+    set_number = models.PositiveSmallIntegerField() # 1, 2, 3, ...
+    reps = models.PositiveIntegerField(null=True, blank=True)
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True) # Bài giữ tư thế (e.g., "30s")
+    weight_kg = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('log', 'set_number')
+        ordering = ['log', 'set_number']
+
+    def __str__(self):
+        return f"Set {self.set_number} of log #{self.log_id}"
+
+# -------------------------------------------------------------------
+# NHÓM 4: PROGRESS VISUALIZATION (UC12)
+# -------------------------------------------------------------------
+class UserStats(models.Model):
+    """ 
+    (UC12) Số liệu tổng hợp của user cho Dashboard.
+    Được cập nhật mỗi khi thêm/xóa WorkoutSession (xem api/stats.py),
+    nên Dashboard chỉ cần đọc 1 dòng theo khóa chính.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_calories = models.BigIntegerField(default=0)
+    workout_count = models.IntegerField(default=0)
+
+    # Điểm tư thế TB = posture_score_sum / posture_score_count (bỏ qua session không có điểm)
+    posture_score_sum = models.FloatField(default=0)
+    posture_score_count = models.IntegerField(default=0)
+
+    @property
+    def average_posture_score(self):
+        if not self.posture_score_count:
+            return 0
+        return self.posture_score_sum / self.posture_score_count
+
+    def __str__(self):
+        return f"Stats of user #{self.user_id}"
+
+class DailyActivity(models.Model):
+    """
+    (UC12) Chỉ mục hoạt động theo ngày: mỗi ngày user có tập là 1 dòng.
+    Dùng để tính streak/adherence mà không phải quét toàn bộ session.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_days')
+    date = models.DateField()
+    session_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'date')
+
+    def __str__(self):
+        return f"{self.date} ({self.session_count} sessions) by user #{self.user_id}"
+
+class WeeklyMuscleVolume(models.Model):
+    """
+    (UC12) Khối lượng tập theo tuần (bắt đầu thứ Hai) và nhóm cơ của user:
+    số set, tổng rep và tonnage (rep x kg). Được cập nhật mỗi khi thêm/sửa/xóa
+    WorkoutSession (xem api/stats.py), nên biểu đồ N tuần chỉ đọc tối đa
+    N x số nhóm cơ dòng, không phụ thuộc độ dài lịch sử.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weekly_volumes')
+    week_start = models.DateField()
+    muscle_group = models.CharField(max_length=50, choices=Exercise.MuscleGroup.choices)
+    set_count = models.IntegerField(default=0)
+    total_reps = models.IntegerField(default=0)
+    volume_kg = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'week_start', 'muscle_group')
+
+    def __str__(self):
+        return f"{self.muscle_group} in week {self.week_start} by user #{self.user_id}"
+
+class PersonalRecord(models.Model):
+    """
+    Kỷ lục cá nhân (PR) của user cho 1 bài tập trong thư viện: tạ nặng nhất,
+    nhiều rep nhất và 1RM ước tính cao nhất, kèm thời điểm đạt được
+    (start_time của buổi tập). Được cập nhật khi thêm/sửa/xóa WorkoutSession
+    (xem api/records.py), nên GET /records/ chỉ đọc 1 dòng mỗi bài tập.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='personal_records')
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='personal_records')
+
+    max_weight_kg = models.FloatField(null=True, blank=True)
+    max_weight_at = models.DateTimeField(null=True, blank=True)
+    max_reps = models.PositiveIntegerField(null=True, blank=True)
+    max_reps_at = models.DateTimeField(null=True, blank=True)
+    estimated_1rm_kg = models.FloatField(null=True, blank=True)
+    estimated_1rm_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('user', 'exercise')
+
+    def __str__(self):
+        return f"Records of user #{self.user_id} for exercise #{self.exercise_id}"
+
+class ExerciseHistory(models.Model):
+    """
+    Các lần tập gần nhất (mới nhất trước) của user cho 1 bài tập trong thư viện,
+    dùng để gợi ý tạ/rep cho buổi tập kế tiếp (xem api/progression.py) mà không
+    quét lại ExerciseLog. Được cập nhật khi thêm/sửa/xóa WorkoutSession.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exercise_histories')
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='histories')
+    # [{"session": id, "at": start_time (UTC, ISO), "sets": [[reps, weight_kg, duration_seconds], ...]}, ...]
+    recent = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ('user', 'exercise')
+
+    def __str__(self):
+        return f"History of user #{self.user_id} for exercise #{self.exercise_id}"
+
 # -------------------------------------------------------------------
 # NHÓM 6: NUTRITION & HYDRATION (UC19, UC20)
 # -------------------------------------------------------------------
@@ -188,6 +319,11 @@ class NutritionLog(models.Model):
     fat_g = models.FloatField(default=0)
     log_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-log_date', '-id'], name='nutrition_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.food_name} (by {self.user.username})"
 
@@ -195,4 +331,9 @@ class HydrationLog(models.Model):
     """ (UC20) Ghi lại nước uống """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hydration_logs')
     water_ml = models.IntegerField()
-    log_time = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    log_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-log_time', '-id'], name='hydration_user_time_idx'),
+        ]
\ No newline at end of file
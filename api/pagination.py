@@ -0,0 +1,25 @@
+# api/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class UserLogCursorPagination(CursorPagination):
+    """
+    Phân trang kiểu con trỏ (keyset) cho các log theo user.
+    Mỗi trang chỉ là một `WHERE timestamp < ... LIMIT n` trên index
+    (user, timestamp desc), nên trang thứ N nhanh như trang đầu.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class WorkoutSessionPagination(UserLogCursorPagination):
+    ordering = ('-start_time', '-id')
+
+
+class NutritionLogPagination(UserLogCursorPagination):
+    ordering = ('-log_date', '-id')
+
+
+class HydrationLogPagination(UserLogCursorPagination):
+    ordering = ('-log_time', '-id')
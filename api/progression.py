@@ -0,0 +1,262 @@
+# api/progression.py
+"""
+Gợi ý tạ/rep cho buổi tập kế tiếp của một kế hoạch (progressive overload),
+xem GET /plans/<id>/next-session/.
+
+Gợi ý dựa trên RECENT_LOGS_PER_EXERCISE lần tập gần nhất của user cho từng
+bài tập, lưu sẵn trong ExerciseHistory (1 dòng mỗi user + bài tập). Đọc gợi ý
+cho cả plan chỉ tốn 1 query, không phụ thuộc độ dài lịch sử.
+
+Bảng được cập nhật giống PersonalRecord (api/records.py):
+- thêm session: gộp các log mới vào danh sách gần nhất;
+- sửa/xóa session: tính lại các bài tập mà session nằm trong danh sách,
+  bằng 1 query "N log mới nhất mỗi bài tập" (window function).
+"""
+import datetime
+import re
+
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import ExerciseLog, ExerciseSet, ExerciseHistory
+
+# Số lần tập gần nhất được giữ cho mỗi (user, bài tập)
+RECENT_LOGS_PER_EXERCISE = 5
+# Số buổi liên tiếp không đạt rep tối thiểu thì giảm tạ
+STALL_SESSIONS = 3
+DELOAD_FACTOR = 0.9
+WEIGHT_INCREMENT_KG = 2.5
+DURATION_INCREMENT_SECONDS = 5
+
+_REP_RANGE = re.compile(r'^\s*(\d+)\s*(?:-\s*(\d+))?\s*(s|sec|giây)?', re.IGNORECASE)
+
+
+# -------------------------------------------------------------------
+# CẬP NHẬT ExerciseHistory
+# -------------------------------------------------------------------
+
+def history_entry(session_id, start_time, sets):
+    """ Một phần tử của ExerciseHistory.recent; sets: [(reps, weight_kg, duration_seconds)] """
+    return {
+        'session': session_id,
+        # Cùng múi giờ, đủ micro giây => so sánh chuỗi đúng thứ tự thời gian
+        'at': start_time.astimezone(datetime.timezone.utc).isoformat(timespec='microseconds'),
+        'sets': [list(set_values) for set_values in sets],
+    }
+
+
+def latest_entries(entries):
+    """ RECENT_LOGS_PER_EXERCISE phần tử mới nhất, mới nhất trước """
+    return sorted(entries, key=lambda entry: (entry['at'], entry['session']), reverse=True)[:RECENT_LOGS_PER_EXERCISE]
+
+
+def record_history(user_id, built):
+    """
+    Gộp các log vừa lưu (kết quả của `build_logs`) vào ExerciseHistory.
+    Phải được gọi bên trong transaction của thao tác ghi session.
+    """
+    entries = {}
+    for log, sets_data in built:
+        if log.exercise_id is None:
+            continue
+        entries.setdefault(log.exercise_id, []).append(history_entry(log.session_id, log.session.start_time, [
+            (set_data.get('reps'), set_data.get('weight_kg'), set_data.get('duration_seconds'))
+            for set_data in sets_data
+        ]))
+    if not entries:
+        return
+
+    histories = {
+        history.exercise_id: history
+        for history in ExerciseHistory.objects.select_for_update().filter(user_id=user_id, exercise_id__in=entries)
+    }
+    created = []
+    updated = []
+    for exercise_id, new_entries in entries.items():
+        history = histories.get(exercise_id)
+        if history is None:
+            created.append(ExerciseHistory(user_id=user_id, exercise_id=exercise_id, recent=latest_entries(new_entries)))
+            continue
+        # Session được ghi lại (sửa logs) thay cho bản cũ của chính nó
+        sessions = {entry['session'] for entry in new_entries}
+        recent = latest_entries([entry for entry in history.recent if entry['session'] not in sessions] + new_entries)
+        if recent != history.recent:
+            history.recent = recent
+            updated.append(history)
+
+    ExerciseHistory.objects.bulk_create(created)
+    if updated:
+        ExerciseHistory.objects.bulk_update(updated, ['recent'])
+
+
+def histories_with(session):
+    """ ID các bài tập mà `session` nằm trong danh sách gần nhất (cần tính lại khi sửa/xóa session) """
+    histories = ExerciseHistory.objects.filter(
+        user_id=session.user_id,
+        exercise_id__in=ExerciseLog.objects.filter(session=session).values('exercise_id'),
+    ).values_list('exercise_id', 'recent')
+    return {
+        exercise_id for exercise_id, recent in histories
+        if any(entry['session'] == session.pk for entry in recent)
+    }
+
+
+def recompute_history(user_id, exercise_ids):
+    """ Tính lại ExerciseHistory của user cho các bài tập này """
+    if not exercise_ids:
+        return
+    recent = _recent_entries(ExerciseLog.objects.filter(session__user_id=user_id, exercise_id__in=exercise_ids))
+    with transaction.atomic():
+        ExerciseHistory.objects.filter(user_id=user_id, exercise_id__in=exercise_ids).delete()
+        ExerciseHistory.objects.bulk_create(_histories(recent))
+
+
+def rebuild_exercise_history(user_ids=None):
+    """
+    Tính lại ExerciseHistory từ ExerciseLog/ExerciseSet.
+    `user_ids=None` nghĩa là tính lại cho tất cả user.
+    """
+    logs = ExerciseLog.objects.filter(exercise__isnull=False)
+    existing = ExerciseHistory.objects.all()
+    if user_ids is not None:
+        logs = logs.filter(session__user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    recent = _recent_entries(logs)
+    with transaction.atomic():
+        existing.delete()
+        ExerciseHistory.objects.bulk_create(_histories(recent), batch_size=1000)
+
+
+def _recent_entries(logs, chunk_size=2000):
+    """ {(user_id, exercise_id): [phần tử của recent]} cho N log mới nhất mỗi cặp trong `logs` """
+    ranked = list(logs.filter(exercise__isnull=False).annotate(rank=Window(
+        RowNumber(),
+        partition_by=[F('session__user_id'), F('exercise_id')],
+        order_by=[F('session__start_time').desc(), F('session_id').desc(), F('id').desc()],
+    )).filter(rank__lte=RECENT_LOGS_PER_EXERCISE).values_list(
+        'id', 'session__user_id', 'exercise_id', 'session_id', 'session__start_time',
+    ))
+
+    sets = {}
+    for start in range(0, len(ranked), chunk_size):
+        log_ids = [row[0] for row in ranked[start:start + chunk_size]]
+        rows = ExerciseSet.objects.filter(log_id__in=log_ids).order_by('log_id', 'set_number').values_list(
+            'log_id', 'reps', 'weight_kg', 'duration_seconds',
+        )
+        for log_id, *set_values in rows:
+            sets.setdefault(log_id, []).append(set_values)
+
+    recent = {}
+    for log_id, user_id, exercise_id, session_id, start_time in ranked:
+        recent.setdefault((user_id, exercise_id), []).append(
+            history_entry(session_id, start_time, sets.get(log_id, []))
+        )
+    return recent
+
+
+def _histories(recent):
+    return [
+        ExerciseHistory(user_id=user_id, exercise_id=exercise_id, recent=latest_entries(entries))
+        for (user_id, exercise_id), entries in recent.items()
+    ]
+
+
+# -------------------------------------------------------------------
+# GỢI Ý CHO BUỔI TẬP KẾ TIẾP
+# -------------------------------------------------------------------
+
+def parse_rep_range(reps):
+    """ "8-12" -> (8, 12, False); "5" -> (5, 5, False); "30s" -> (30, 30, True); không đọc được -> None """
+    match = _REP_RANGE.match(reps or '')
+    if not match:
+        return None
+    low = int(match.group(1))
+    high = int(match.group(2) or low)
+    return min(low, high), max(low, high), bool(match.group(3))
+
+
+def round_weight(weight_kg):
+    """ Làm tròn theo bước tăng tạ (2.5 kg), tối thiểu 1 bước """
+    return max(WEIGHT_INCREMENT_KG, round(weight_kg / WEIGHT_INCREMENT_KG) * WEIGHT_INCREMENT_KG)
+
+
+def _top_sets(entry, timed):
+    """ (mức tạ nặng nhất, [rep hoặc giây của các set ở mức tạ đó]) của 1 lần tập """
+    weights = [weight for _reps, weight, _duration in entry['sets'] if weight]
+    top_weight = max(weights, default=None)
+    values = [
+        duration if timed else reps
+        for reps, weight, duration in entry['sets']
+        if (weight or None) == top_weight and (duration if timed else reps)
+    ]
+    return top_weight, values
+
+
+def recommend(plan_exercise, recent):
+    """
+    Gợi ý cho 1 PlanExercise theo kiểu "double progression":
+    - mọi set ở mức tạ nặng nhất đạt mức trên của khoảng rep => tăng tạ
+      (bài không tạ: tăng rep/giây), quay về mức dưới;
+    - STALL_SESSIONS buổi liền ở cùng mức tạ đều có set dưới mức dưới => giảm tạ;
+    - còn lại: giữ tạ, tăng 1 rep (không quá mức trên).
+    `recent`: ExerciseHistory.recent của user cho bài tập này (có thể rỗng).
+    """
+    low, high, timed = parse_rep_range(plan_exercise.reps) or (None, None, False)
+    target_key = 'target_duration_seconds' if timed else 'target_reps'
+    suggestion = {
+        'plan_exercise_id': plan_exercise.id,
+        'exercise_id': plan_exercise.exercise_id,
+        'exercise_name': plan_exercise.exercise.name,
+        'day_number': plan_exercise.day_number,
+        'sets': plan_exercise.sets,
+        'target_reps': None,
+        'target_duration_seconds': None,
+        'target_weight_kg': None,
+        'reason': 'no_history',
+        'last_performed_at': recent[0]['at'] if recent else None,
+    }
+    suggestion[target_key] = low
+
+    weight, values = _top_sets(recent[0], timed) if recent else (None, [])
+    if not values:
+        return suggestion
+
+    suggestion.update({'target_weight_kg': weight, 'reason': 'repeat'})
+    if low is None:
+        # Không đọc được khoảng rep của plan: giữ nguyên mức tạ lần trước
+        return suggestion
+    step = DURATION_INCREMENT_SECONDS if timed else 1
+    if len(values) >= plan_exercise.sets and min(values) >= high:
+        if weight and not timed:
+            suggestion.update({'target_weight_kg': weight + WEIGHT_INCREMENT_KG, 'reason': 'increase_weight'})
+        else:
+            suggestion.update({target_key: max(values) + step, 'reason': 'increase_reps'})
+        return suggestion
+
+    stalled = weight and len(recent) >= STALL_SESSIONS and all(
+        top_weight == weight and top_values and min(top_values) < low
+        for top_weight, top_values in (_top_sets(entry, timed) for entry in recent[:STALL_SESSIONS])
+    )
+    if stalled:
+        suggestion.update({'target_weight_kg': round_weight(weight * DELOAD_FACTOR), target_key: high, 'reason': 'deload'})
+        return suggestion
+
+    suggestion.update({target_key: min(high, max(values) + step), 'reason': 'repeat'})
+    return suggestion
+
+
+def next_session(plan, user, day_number=None):
+    """ Gợi ý cho các bài tập của `plan` (đã prefetch plan_exercises + exercise), lọc theo ngày nếu có """
+    plan_exercises = [
+        plan_exercise for plan_exercise in plan.plan_exercises.all()
+        if day_number is None or plan_exercise.day_number == day_number
+    ]
+    recent = dict(ExerciseHistory.objects.filter(
+        user=user, exercise_id__in={plan_exercise.exercise_id for plan_exercise in plan_exercises},
+    ).values_list('exercise_id', 'recent'))
+    return [
+        recommend(plan_exercise, recent.get(plan_exercise.exercise_id, []))
+        for plan_exercise in sorted(plan_exercises, key=lambda plan_exercise: (plan_exercise.day_number, plan_exercise.id))
+    ]
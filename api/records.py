@@ -0,0 +1,185 @@
+# api/records.py
+"""
+Kỷ lục cá nhân (PR) cho từng bài tập: bảng PersonalRecord được cập nhật dần,
+không phải quét lại toàn bộ ExerciseLog của user mỗi lần đọc.
+
+- Thêm session: so các set mới với kỷ lục hiện có (1 SELECT, rồi ghi các dòng
+  thay đổi) và trả về các kỷ lục vừa bị phá để hiện huy hiệu "PR".
+- Sửa/xóa session: chỉ tính lại các bài tập có kỷ lục đạt trong session đó.
+
+Chỉ tính các log đã gắn với bài tập trong thư viện (ExerciseLog.exercise).
+Nếu dữ liệu bị lệch, `python manage.py rebuild_stats` tính lại từ đầu.
+"""
+import functools
+import operator
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ExerciseLog, ExerciseSet, PersonalRecord
+
+# Công thức Epley kém chính xác với set nhiều rep => không ước tính 1RM cho các set này
+E1RM_MAX_REPS = 12
+
+# Các chỉ số kỷ lục: trường giá trị -> trường thời điểm đạt được
+RECORD_METRICS = {
+    'max_weight_kg': 'max_weight_at',
+    'max_reps': 'max_reps_at',
+    'estimated_1rm_kg': 'estimated_1rm_at',
+}
+
+
+def estimate_one_rep_max(reps, weight_kg):
+    """ 1RM ước tính (Epley): (5, 100) -> 116.7; không tính được -> None """
+    if not reps or not weight_kg or reps > E1RM_MAX_REPS:
+        return None
+    if reps == 1:
+        return weight_kg
+    return round(weight_kg * (1 + reps / 30), 1)
+
+
+def set_marks(reps, weight_kg):
+    """ {chỉ số: giá trị} mà 1 set đạt được (bỏ các chỉ số không có) """
+    marks = {
+        'max_weight_kg': weight_kg or None,
+        'max_reps': reps or None,
+        'estimated_1rm_kg': estimate_one_rep_max(reps, weight_kg),
+    }
+    return {metric: value for metric, value in marks.items() if value is not None}
+
+
+def best_marks(rows):
+    """
+    rows: (khóa, thời điểm, reps, weight_kg) theo thứ tự thời gian
+    -> {khóa: {chỉ số: (giá trị tốt nhất, thời điểm)}}.
+    Bằng nhau thì giữ lần đạt đầu tiên.
+    """
+    bests = {}
+    for key, achieved_at, reps, weight_kg in rows:
+        best = bests.setdefault(key, {})
+        for metric, value in set_marks(reps, weight_kg).items():
+            if metric not in best or value > best[metric][0]:
+                best[metric] = (value, achieved_at)
+    return bests
+
+
+def record_sets(user_id, built):
+    """
+    Cập nhật kỷ lục từ các log vừa lưu (kết quả của `build_logs`).
+    Trả về {session: [kỷ lục mới]}, mỗi kỷ lục mới là dict
+    exercise_id, exercise_name, metric, value, previous (None nếu là lần đầu).
+    Phải được gọi bên trong transaction của thao tác ghi session.
+    """
+    rows = [
+        (log, set_data.get('reps'), set_data.get('weight_kg'))
+        for log, sets_data in built
+        if log.exercise_id is not None
+        for set_data in sets_data
+    ]
+    if not rows:
+        return {}
+    # Session cũ (đồng bộ offline) được xét trước session mới
+    rows.sort(key=lambda row: row[0].session.start_time)
+
+    records = {
+        record.exercise_id: record
+        for record in PersonalRecord.objects.select_for_update().filter(
+            user_id=user_id, exercise_id__in={log.exercise_id for log, _reps, _weight in rows},
+        )
+    }
+    created = {}
+    changed = {}
+    new_records = {}
+    for log, reps, weight_kg in rows:
+        record = records.get(log.exercise_id)
+        if record is None:
+            record = records[log.exercise_id] = created[log.exercise_id] = PersonalRecord(
+                user_id=user_id, exercise_id=log.exercise_id,
+            )
+        for metric, value in set_marks(reps, weight_kg).items():
+            current = getattr(record, metric)
+            if current is not None and value <= current:
+                continue
+            setattr(record, metric, value)
+            setattr(record, RECORD_METRICS[metric], log.session.start_time)
+            changed[log.exercise_id] = record
+            # Mỗi (bài tập, chỉ số) chỉ báo 1 lần cho mỗi session, với giá trị tốt nhất
+            flag = new_records.setdefault(log.session, {}).setdefault((log.exercise_id, metric), {
+                'exercise_id': log.exercise_id,
+                'exercise_name': log.exercise_name,
+                'metric': metric,
+                'previous': current,
+            })
+            flag['value'] = value
+
+    # Bài tập chưa có kỷ lục mà các set mới cũng không có số liệu nào => không tạo dòng rỗng
+    PersonalRecord.objects.bulk_create([record for exercise_id, record in created.items() if exercise_id in changed])
+    updated = [record for exercise_id, record in changed.items() if exercise_id not in created]
+    if updated:
+        PersonalRecord.objects.bulk_update(updated, [*RECORD_METRICS, *RECORD_METRICS.values()])
+    return {session: list(flags.values()) for session, flags in new_records.items()}
+
+
+def records_set_in(session):
+    """ ID các bài tập có kỷ lục đạt trong `session` (cần tính lại khi sửa/xóa session) """
+    achieved_here = functools.reduce(operator.or_, (
+        Q(**{achieved_at: session.start_time}) for achieved_at in RECORD_METRICS.values()
+    ))
+    return set(PersonalRecord.objects.filter(
+        achieved_here,
+        user_id=session.user_id,
+        exercise_id__in=ExerciseLog.objects.filter(session=session).values('exercise_id'),
+    ).values_list('exercise_id', flat=True))
+
+
+def recompute_records(user_id, exercise_ids):
+    """ Tính lại kỷ lục của user cho các bài tập này (sau khi sửa/xóa session) """
+    if not exercise_ids:
+        return
+    bests = _best_records(ExerciseSet.objects.filter(
+        log__session__user_id=user_id, log__exercise_id__in=exercise_ids,
+    ))
+    with transaction.atomic():
+        PersonalRecord.objects.filter(user_id=user_id, exercise_id__in=exercise_ids).delete()
+        PersonalRecord.objects.bulk_create(_records(bests))
+
+
+def rebuild_personal_records(user_ids=None):
+    """
+    Tính lại PersonalRecord từ ExerciseSet.
+    `user_ids=None` nghĩa là tính lại cho tất cả user.
+    """
+    sets = ExerciseSet.objects.filter(log__exercise__isnull=False)
+    existing = PersonalRecord.objects.all()
+    if user_ids is not None:
+        sets = sets.filter(log__session__user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    bests = _best_records(sets)
+    with transaction.atomic():
+        existing.delete()
+        PersonalRecord.objects.bulk_create(_records(bests), batch_size=1000)
+
+
+def _best_records(sets):
+    """ {(user_id, exercise_id): {chỉ số: (giá trị, thời điểm)}} từ một queryset ExerciseSet """
+    rows = sets.order_by('log__session__start_time', 'log_id', 'set_number').values_list(
+        'log__session__user_id', 'log__exercise_id', 'log__session__start_time', 'reps', 'weight_kg',
+    )
+    return best_marks(
+        ((user_id, exercise_id), achieved_at, reps, weight_kg)
+        for user_id, exercise_id, achieved_at, reps, weight_kg in rows.iterator(chunk_size=2000)
+    )
+
+
+def _records(bests):
+    return [
+        PersonalRecord(
+            user_id=user_id,
+            exercise_id=exercise_id,
+            **{metric: value for metric, (value, _at) in best.items()},
+            **{RECORD_METRICS[metric]: achieved_at for metric, (_value, achieved_at) in best.items()},
+        )
+        for (user_id, exercise_id), best in bests.items()
+        if best
+    ]
@@ -0,0 +1,116 @@
+# api/replicas.py
+"""
+Đọc từ bản sao chỉ-đọc (read replica) mà vẫn "đọc được thứ mình vừa ghi".
+
+Khi có DATABASE_REPLICA_URL (xem settings), `PrimaryReplicaRouter` gửi các
+câu đọc của request an toàn (GET/HEAD/OPTIONS) sang 'replica'. Mọi câu ghi, và
+mọi câu đọc ngoài request (management command, migration, test), dùng 'default'.
+
+Replica luôn trễ hơn primary một chút, nên sau khi một client ghi
+(POST/PUT/PATCH/DELETE), `ReplicaPinningMiddleware` ghim client đó vào
+'default' trong DATABASE_REPLICA_PIN_SECONDS giây: buổi tập vừa POST hiện
+ngay trong lịch sử. Client được nhận diện theo token (header Authorization)
+hoặc cookie session; dấu ghim nằm trong cache nên cần REDIS_URL khi chạy
+nhiều worker.
+
+Thư viện bài tập (Exercise) luôn đọc từ primary: các cache/index theo
+catalog version (api/catalog.py, api/search.py, cache GET /exercises/) được
+dựng lại ngay sau `bump_catalog_version`; nếu đọc từ replica còn trễ, dữ liệu
+cũ sẽ bị lưu dưới version mới và không bao giờ được làm mới.
+"""
+import hashlib
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Dữ liệu đăng nhập (user, token, session) phải luôn mới nhất => luôn đọc primary
+PRIMARY_ONLY_APPS = {'admin', 'auth', 'authtoken', 'contenttypes', 'sessions', 'account', 'socialaccount'}
+# Dữ liệu được cache theo catalog version => luôn đọc primary (xem docstring của module)
+PRIMARY_ONLY_MODELS = {'api.exercise'}
+
+# Request hiện tại có được đọc từ replica không.
+# ContextVar (không phải threading.local) để đúng cả dưới ASGI: context được
+# chép sang thread mà sync_to_async dùng để chạy ORM.
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def pin_cache_key(request):
+    """ Khóa cache ghim client gửi `request` vào primary, None nếu không nhận diện được """
+    credentials = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'db-pin:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            _use_replica.get()
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+            and model._meta.label_lower not in PRIMARY_ONLY_MODELS
+        ):
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica là bản sao của primary: quan hệ giữa hai bên luôn hợp lệ
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaPinningMiddleware:
+    """
+    Cho phép request an toàn đọc từ replica, trừ khi client vừa ghi.
+    Sau mỗi request ghi, ghim client vào primary (xem docstring của module).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if f'{__name__}.{PrimaryReplicaRouter.__name__}' not in settings.DATABASE_ROUTERS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        key = pin_cache_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if key:
+                cache.set(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+            return response
+
+        token = _use_replica.set(not (key and cache.get(key)))
+        try:
+            return self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+    async def __acall__(self, request):
+        key = pin_cache_key(request)
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            if key:
+                await cache.aset(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+            return response
+
+        token = _use_replica.set(not (key and await cache.aget(key)))
+        try:
+            return await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
@@ -0,0 +1,157 @@
+# api/search.py
+"""
+Tìm kiếm bài tập (GET /exercises/?q=...) bằng chỉ mục đảo (inverted index)
+giữ trong bộ nhớ của process.
+
+- Bỏ dấu tiếng Việt khi đánh chỉ mục và khi tìm: "gap hong" khớp "gập hông".
+- Từ cuối cùng của câu tìm được khớp theo tiền tố ("gap ho" khớp "hông").
+- Kết quả được xếp hạng: khớp ở tên nặng hơn khớp ở mô tả, từ hiếm nặng hơn từ phổ biến.
+
+Chỉ mục được dựng lại khi phiên bản catalog thay đổi (xem api/catalog.py).
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+
+from .catalog import get_catalog_version, EXERCISE_FILTER_FIELDS
+from .models import Exercise
+from .serializers import ExerciseSerializer
+
+TOKEN_RE = re.compile(r'\w+')
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+# Điểm của một từ chỉ khớp theo tiền tố so với khớp nguyên từ
+PREFIX_MATCH_FACTOR = 0.5
+# Tiền tố quá ngắn (vd. "p") khớp gần như cả chỉ mục => chỉ khớp nguyên từ
+MIN_PREFIX_LENGTH = 2
+# Số token tối đa một tiền tố được mở rộng thành (giữ độ trễ ổn định khi catalog lớn)
+MAX_PREFIX_EXPANSIONS = 64
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+def fold(text):
+    """ Bỏ dấu và chuyển về chữ thường: "Gập Hông Đơn" -> "gap hong don" """
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text or ''))
+
+
+class ExerciseSearchIndex:
+    """ Chỉ mục đảo: token -> {exercise_id: trọng số} """
+
+    def __init__(self, documents):
+        # documents: danh sách dict đã serialize (ExerciseSerializer)
+        self.documents = {doc['id']: doc for doc in documents}
+
+        postings = {}
+        for doc in documents:
+            weights = {}
+            for token in tokenize(doc['name']):
+                weights[token] = weights.get(token, 0) + NAME_WEIGHT
+            for token in tokenize(doc['description']):
+                weights[token] = weights.get(token, 0) + DESCRIPTION_WEIGHT
+            for token, weight in weights.items():
+                postings.setdefault(token, {})[doc['id']] = weight
+
+        total = len(documents) or 1
+        self.postings = {
+            token: {doc_id: weight * math.log(1 + total / len(docs)) for doc_id, weight in docs.items()}
+            for token, docs in postings.items()
+        }
+        # Danh sách token đã sắp xếp để tìm theo tiền tố bằng bisect
+        self.tokens = sorted(self.postings)
+
+        # {(field, value): set(exercise_id)} để lọc bằng phép giao tập hợp
+        self.filter_sets = {}
+        for doc in documents:
+            for field in EXERCISE_FILTER_FIELDS:
+                self.filter_sets.setdefault((field, doc.get(field)), set()).add(doc['id'])
+
+    def _match(self, term, allow_prefix):
+        """ {exercise_id: điểm} cho một từ của câu tìm """
+        exact = self.postings.get(term, {})
+        if not allow_prefix or len(term) < MIN_PREFIX_LENGTH:
+            return exact
+
+        scores = dict(exact)
+        start = bisect.bisect_right(self.tokens, term)
+        for token in self.tokens[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            for doc_id, weight in self.postings[token].items():
+                score = weight * PREFIX_MATCH_FACTOR
+                if score > scores.get(doc_id, 0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(self, query, filters=None, limit=SEARCH_DEFAULT_LIMIT):
+        """
+        Trả về các bài tập (dict) khớp TẤT CẢ các từ trong `query`,
+        đã lọc theo `filters` ({field: value}) và xếp theo điểm giảm dần.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        matches = [
+            self._match(term, allow_prefix=index == len(terms) - 1)
+            for index, term in enumerate(terms)
+        ]
+        # Giao các tập ứng viên, bắt đầu từ tập nhỏ nhất
+        candidates = set(min(matches, key=len))
+        for term_scores in matches:
+            candidates.intersection_update(term_scores.keys())
+        for field, value in (filters or {}).items():
+            candidates.intersection_update(self.filter_sets.get((field, value), ()))
+        if not candidates:
+            return []
+
+        scores = {doc_id: sum(term_scores[doc_id] for term_scores in matches) for doc_id in candidates}
+        best = heapq.nsmallest(
+            limit, candidates, key=lambda doc_id: (-scores[doc_id], self.documents[doc_id]['name'])
+        )
+        return [self.documents[doc_id] for doc_id in best]
+
+
+# (version, index) — thay cả tuple một lần để các thread luôn đọc bản nhất quán
+_search_index = (None, None)
+_search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    global _search_index
+
+    version = get_catalog_version()
+    if _search_index[0] != version:
+        with _search_index_lock:
+            if _search_index[0] != version:
+                fields = ExerciseSerializer.Meta.fields
+                documents = list(Exercise.objects.order_by('id').values(*fields))
+                _search_index = (version, ExerciseSearchIndex(documents))
+    return _search_index[1]
+
+
+def search_exercises(query_params):
+    """ Tìm kiếm theo `?q=` (+ các bộ lọc và `?limit=`) của GET /exercises/ """
+    filters = {
+        field: query_params[field]
+        for field in EXERCISE_FILTER_FIELDS
+        if query_params.get(field)
+    }
+    try:
+        limit = int(query_params.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        limit = SEARCH_DEFAULT_LIMIT
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    return get_search_index().search(query_params['q'], filters, limit)
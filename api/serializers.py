@@ -1,6 +1,8 @@
 # api/serializers.py
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
 from .models import (
     Profile, 
     Exercise, 
@@ -8,9 +10,16 @@ from .models import (
     PlanExercise, 
     WorkoutSession, 
     ExerciseLog,
+    ExerciseSet,
     NutritionLog,
-    HydrationLog
+    HydrationLog,
+    PersonalRecord
 )
+from .catalog import get_exercises_by_id, get_exercise_ids_by_name
+from .progression import record_history, histories_with, recompute_history
+from .records import record_sets, records_set_in, recompute_records
+from .stats import record_session
+from .utils import parse_sets, normalize_exercise_name, MAX_SETS_PER_LOG
 # (Bỏ qua NutritionLog và HydrationLog cho ngắn gọn, bạn có thể tự thêm sau)
 
 # --- NHÓM 1: USER & PROFILE ---
@@ -55,10 +64,27 @@ class ExcersiseGuideSerializer(serializers.ModelSerializer):
 
 # --- NHÓM 2: PLAN MANAGEMENT (Phức tạp hơn) ---
 
+class CatalogExerciseField(serializers.PrimaryKeyRelatedField):
+    """
+    ID bài tập, được tra trong thư viện bài tập đã nạp sẵn (api/catalog.py)
+    thay vì 1 query cho mỗi ID như PrimaryKeyRelatedField.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            exercise = get_exercises_by_id().get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if exercise is None:
+            self.fail('does_not_exist', pk_value=data)
+        return exercise
+
 class PlanExerciseSerializer(serializers.ModelSerializer):
     """ Dịch chi tiết bài tập TRONG một kế hoạch (UC07) """
     # Gửi ID của bài tập khi tạo/sửa
-    exercise_id = serializers.PrimaryKeyRelatedField(
+    exercise_id = CatalogExerciseField(
         queryset=Exercise.objects.all(), source='exercise'
     )
     # Gửi tên bài tập khi đọc
@@ -84,46 +110,255 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
         model = WorkoutPlan
         fields = ['id', 'name', 'description', 'schedule', 'plan_exercises']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Nạp trước `plan_exercises` và `exercise` của từng dòng.
+        PlanExerciseSerializer đọc exercise.name/description/video_url,
+        nên nếu không JOIN sẵn sẽ tốn 1 query cho mỗi dòng (N+1).
+        """
+        return queryset.prefetch_related(
+            Prefetch(
+                'plan_exercises',
+                queryset=PlanExercise.objects.select_related('exercise').order_by('id')
+            )
+        )
+
+    def validate_plan_exercises(self, value):
+        """
+        Mỗi cặp (bài tập, ngày) chỉ được xuất hiện 1 lần trong plan.
+        Với PATCH các trường lồng có thể bị bỏ trống: khi đó sets/reps lấy từ
+        dòng đang có, còn dòng mới thì bắt buộc phải có đủ.
+        """
+        current = set()
+        if self.instance is not None:
+            current = {(row.exercise_id, row.day_number) for row in self.instance.plan_exercises.all()}
+        seen = set()
+        for exercise_data in value:
+            if 'exercise' not in exercise_data:
+                raise serializers.ValidationError("Mỗi bài tập phải có exercise_id.")
+            key = (exercise_data['exercise'].pk, exercise_data.get('day_number', 1))
+            if key in seen:
+                raise serializers.ValidationError(
+                    f"Bài tập {key[0]} bị lặp lại trong ngày {key[1]}."
+                )
+            missing = [field for field in ('sets', 'reps') if field not in exercise_data]
+            if missing and key not in current:
+                raise serializers.ValidationError(
+                    f"Bài tập {key[0]} (ngày {key[1]}) chưa có trong plan nên phải gửi: {', '.join(missing)}."
+                )
+            seen.add(key)
+        return value
+
     def create(self, validated_data):
         # Tách dữ liệu lồng (nested data) ra
         exercises_data = validated_data.pop('plan_exercises')
         
-        # 1. Tạo đối tượng cha (WorkoutPlan)
-        plan = WorkoutPlan.objects.create(**validated_data)
-        
-        # 2. Tạo các đối tượng con (PlanExercise)
-        for exercise_data in exercises_data:
-            PlanExercise.objects.create(plan=plan, **exercise_data)
-        return plan
+        with transaction.atomic():
+            # 1. Tạo đối tượng cha (WorkoutPlan)
+            plan = WorkoutPlan.objects.create(**validated_data)
+            
+            # 2. Tạo các đối tượng con (PlanExercise) bằng 1 bulk INSERT
+            PlanExercise.objects.bulk_create([
+                PlanExercise(plan=plan, **exercise_data) for exercise_data in exercises_data
+            ])
+
+        # Nạp lại (2 query) để response không bị N+1 khi đọc exercise.*
+        return self.setup_eager_loading(WorkoutPlan.objects.filter(pk=plan.pk)).get()
 
     def update(self, instance, validated_data):
-        # (Logic update phức tạp hơn, tạm thời bỏ qua cho dự án 2 tuần)
-        # (Nếu bạn muốn, logic là: Xóa hết PlanExercise cũ, tạo lại cái mới)
-        instance.name = validated_data.get('name', instance.name)
-        instance.description = validated_data.get('description', instance.description)
-        instance.schedule = validated_data.get('schedule', instance.schedule)
-        instance.save()
-        
-        # (Đây là logic update đơn giản)
-        if 'plan_exercises' in validated_data:
-            exercises_data = validated_data.pop('plan_exercises')
-            instance.plan_exercises.all().delete() # Xóa cũ
-            for exercise_data in exercises_data: # Tạo mới
-                PlanExercise.objects.create(plan=instance, **exercise_data)
-                
-        return instance
+        """
+        Cập nhật plan. Với 'plan_exercises', so sánh danh sách gửi lên với các
+        dòng hiện có theo khóa (exercise, day_number) và chỉ ghi phần thay đổi:
+        - Có ở cả hai: giữ nguyên ID, chỉ UPDATE nếu sets/reps khác.
+        - Chỉ có trong request: INSERT.
+        - Chỉ có trong DB: DELETE.
+        """
+        exercises_data = validated_data.pop('plan_exercises', None)
+
+        with transaction.atomic():
+            instance.name = validated_data.get('name', instance.name)
+            instance.description = validated_data.get('description', instance.description)
+            instance.schedule = validated_data.get('schedule', instance.schedule)
+            instance.save()
+
+            if exercises_data is not None:
+                self._apply_plan_exercises_diff(instance, exercises_data)
+
+        # Nạp lại (2 query) để response không bị N+1 khi đọc exercise.*
+        return self.setup_eager_loading(WorkoutPlan.objects.filter(pk=instance.pk)).get()
+
+    def _apply_plan_exercises_diff(self, plan, exercises_data):
+        # (plan_exercises thường đã được prefetch sẵn trong get_queryset)
+        existing = {
+            (row.exercise_id, row.day_number): row
+            for row in plan.plan_exercises.all()
+        }
+        to_create = []
+        to_update = []
+        for exercise_data in exercises_data:
+            key = (exercise_data['exercise'].pk, exercise_data.get('day_number', 1))
+            row = existing.pop(key, None)
+            if row is None:
+                to_create.append(PlanExercise(plan=plan, **exercise_data))
+                continue
+            # PATCH có thể chỉ gửi sets hoặc reps: giữ giá trị đang có cho trường còn lại
+            sets = exercise_data.get('sets', row.sets)
+            reps = exercise_data.get('reps', row.reps)
+            if (row.sets, row.reps) != (sets, reps):
+                row.sets = sets
+                row.reps = reps
+                to_update.append(row)
+
+        # Những dòng còn lại trong `existing` không còn trong request
+        if existing:
+            PlanExercise.objects.filter(pk__in=[row.pk for row in existing.values()]).delete()
+        if to_update:
+            PlanExercise.objects.bulk_update(to_update, ['sets', 'reps'])
+        if to_create:
+            PlanExercise.objects.bulk_create(to_create)
 
 # --- NHÓM 3: WORKOUT SESSION (Quan trọng nhất) ---
 
+SET_FIELDS = ('set_number', 'reps', 'duration_seconds', 'weight_kg')
+
+
+class ExerciseSetSerializer(serializers.ModelSerializer):
+    """ Một set: số reps (hoặc số giây giữ) và mức tạ """
+    class Meta:
+        model = ExerciseSet
+        fields = list(SET_FIELDS)
+        # Không gửi thì đánh số theo thứ tự trong mảng
+        extra_kwargs = {'set_number': {'required': False}}
+
+class ExerciseLogListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Nạp sets của mọi log trong 1 query (bỏ qua nếu view đã prefetch 'logs__sets')
+        logs = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_related_objects(logs, 'sets')
+        return super().to_representation(logs)
+
 class ExerciseLogSerializer(serializers.ModelSerializer):
-    """ Dịch chi tiết log của TỪNG bài tập (UC09, UC10) """
+    """
+    Dịch chi tiết log của TỪNG bài tập (UC09, UC10).
+    Client có thể gửi chuỗi (reps_completed "12, 10, 8", weight_kg "60, 60, 70")
+    hoặc mảng 'sets'; cả hai đều được lưu thành các dòng ExerciseSet.
+    exercise_id (chỉ đọc) được tra từ exercise_name trong thư viện bài tập.
+    """
+    sets = ExerciseSetSerializer(many=True, required=False)
+    exercise_id = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = ExerciseLog
         # Đây là các trường Frontend gửi lên (từ Hợp đồng API)
         fields = [
-            'exercise_name', 'sets_completed', 'reps_completed', 
-            'weight_kg', 'posture_feedback'
+            'exercise_name', 'exercise_id', 'sets_completed', 'reps_completed', 
+            'weight_kg', 'posture_feedback', 'sets'
         ]
+        extra_kwargs = {
+            'sets_completed': {'required': False},
+            'reps_completed': {'required': False},
+        }
+        list_serializer_class = ExerciseLogListSerializer
+
+    def validate(self, attrs):
+        sets = attrs.get('sets')
+        if not sets:
+            if 'sets_completed' not in attrs or 'reps_completed' not in attrs:
+                raise serializers.ValidationError("Cần gửi 'sets' hoặc 'sets_completed' + 'reps_completed'.")
+            return attrs
+
+        if len(sets) > MAX_SETS_PER_LOG:
+            raise serializers.ValidationError({'sets': f"Tối đa {MAX_SETS_PER_LOG} set."})
+        for number, set_data in enumerate(sets, 1):
+            set_data.setdefault('set_number', number)
+        if len({set_data['set_number'] for set_data in sets}) != len(sets):
+            raise serializers.ValidationError({'sets': "set_number bị trùng."})
+
+        # Giữ các trường dạng chuỗi cho client cũ
+        attrs.setdefault('sets_completed', len(sets))
+        attrs.setdefault('reps_completed', ', '.join(_reps_text(set_data) for set_data in sets))
+        if 'weight_kg' not in attrs and any(set_data.get('weight_kg') is not None for set_data in sets):
+            attrs['weight_kg'] = ', '.join(_weight_text(set_data.get('weight_kg')) for set_data in sets)
+        return attrs
+
+def _reps_text(set_data):
+    if set_data.get('reps') is not None:
+        return str(set_data['reps'])
+    if set_data.get('duration_seconds') is not None:
+        return f"{set_data['duration_seconds']}s"
+    return '-'
+
+def _weight_text(weight):
+    return '-' if weight is None else f'{weight:g}'
+
+def build_logs(session, logs_data):
+    """
+    [(ExerciseLog, [dữ liệu set])] cho các log của `session` (chưa lưu).
+    Không gửi 'sets' => tách từ reps_completed/weight_kg.
+    exercise (và nhóm cơ) được gắn theo tên, tra trong thư viện bài tập đã nạp sẵn (0 query).
+    """
+    exercises = get_exercises_by_id()
+    exercise_ids = get_exercise_ids_by_name()
+    built = []
+    for log_data in logs_data:
+        sets_data = log_data.pop('sets', None)
+        log = ExerciseLog(session=session, **log_data)
+        exercise = exercises.get(exercise_ids.get(normalize_exercise_name(log.exercise_name)))
+        if exercise is not None:
+            log.exercise_id = exercise.pk
+            log.muscle_group = exercise.muscle_group
+        if not sets_data:
+            sets_data = [
+                dict(zip(SET_FIELDS, row))
+                for row in parse_sets(log.sets_completed, log.reps_completed, log.weight_kg)
+            ]
+        built.append((log, sets_data))
+    return built
+
+def save_logs(built):
+    """ Lưu kết quả của `build_logs`: 1 bulk INSERT cho log, 1 cho set """
+    ExerciseLog.objects.bulk_create([log for log, _sets in built])
+    ExerciseSet.objects.bulk_create([
+        ExerciseSet(log=log, **set_data) for log, sets_data in built for set_data in sets_data
+    ])
+
+def create_sessions(user, sessions_data):
+    """
+    Lưu một hoặc nhiều buổi tập (kèm logs) trong 1 transaction:
+    mỗi session 1 INSERT, toàn bộ ExerciseLog (và ExerciseSet) chỉ 1 bulk INSERT.
+    Lỗi ở bất kỳ đâu => không để lại session dở dang.
+    """
+    with transaction.atomic():
+        sessions = []
+        logs = []
+        for session_data in sessions_data:
+            # Tách dữ liệu lồng
+            logs_data = session_data.pop('logs')
+
+            # 1. Tạo đối tượng cha (WorkoutSession)
+            session = WorkoutSession.objects.create(user=user, **session_data)
+            sessions.append(session)
+
+            # 2. Gom các đối tượng con (ExerciseLog) để insert 1 lần
+            logs.extend(build_logs(session, logs_data))
+
+        save_logs(logs)
+
+        # 3. Cập nhật bảng tổng hợp cho Dashboard (UC12), kỷ lục cá nhân và lịch sử gần đây
+        new_records = record_sets(user.pk, logs)
+        record_history(user.pk, logs)
+        for session in sessions:
+            record_session(session)
+            session.new_records = new_records.get(session, [])
+
+    return sessions
+
+class WorkoutSessionListSerializer(serializers.ListSerializer):
+    """ Nhận MẢNG session (đồng bộ offline, xem WorkoutSessionViewSet.sync) """
+
+    def create(self, validated_data):
+        return create_sessions(self.context['request'].user, validated_data)
 
 class WorkoutSessionSerializer(serializers.ModelSerializer):
     """ Dịch TOÀN BỘ buổi tập (UC11) """
@@ -131,29 +366,83 @@ class WorkoutSessionSerializer(serializers.ModelSerializer):
     # 'logs' là `related_name` trong model WorkoutSession
     # Đây là nơi nhận mảng JSON 'logs' từ Hợp đồng API
     logs = ExerciseLogSerializer(many=True)
+    # Kỷ lục cá nhân vừa bị phá (xem api/records.py); chỉ có trong response khi tạo session
+    new_records = serializers.ListField(read_only=True)
 
     class Meta:
         model = WorkoutSession
         fields = [
             'id', 'plan', 'start_time', 'end_time', 
-            'total_calories', 'posture_score_avg', 'logs'
+            'total_calories', 'posture_score_avg', 'logs', 'new_records'
         ]
+        list_serializer_class = WorkoutSessionListSerializer
 
     def create(self, validated_data):
         # Lấy user từ context (sẽ được inject từ View)
         user = self.context['request'].user
-        
-        # Tách dữ liệu lồng
-        logs_data = validated_data.pop('logs')
-        
-        # 1. Tạo đối tượng cha (WorkoutSession)
-        session = WorkoutSession.objects.create(user=user, **validated_data)
-        
-        # 2. Tạo các đối tượng con (ExerciseLog)
-        for log_data in logs_data:
-            ExerciseLog.objects.create(session=session, **log_data)
-            
-        return session  
+        return create_sessions(user, [validated_data])[0]
+
+    def update(self, instance, validated_data):
+        """
+        Sửa buổi tập. Nếu có gửi 'logs' thì thay toàn bộ logs cũ
+        (DELETE + bulk INSERT, không phụ thuộc số bài tập).
+        Đổi logs/start_time => kỷ lục và lịch sử gần đây có chứa bản cũ được
+        tính lại, rồi gộp logs mới vào.
+        """
+        logs_data = validated_data.pop('logs', None)
+        touches_logs = logs_data is not None or validated_data.get('start_time', instance.start_time) != instance.start_time
+
+        with transaction.atomic():
+            stale_records = records_set_in(instance) if touches_logs else set()
+            stale_histories = histories_with(instance) if touches_logs else set()
+            instance = super().update(instance, validated_data)
+            built = []
+            if logs_data is not None:
+                instance.logs.all().delete()
+                built = build_logs(instance, logs_data)
+                save_logs(built)
+            recompute_records(instance.user_id, stale_records)
+            record_sets(instance.user_id, built)
+            recompute_history(instance.user_id, stale_histories)
+            record_history(instance.user_id, built)
+        return instance
+
+class WorkoutSessionSummarySerializer(serializers.ModelSerializer):
+    """
+    Bản tóm tắt buổi tập cho màn hình lịch sử (UC13).
+    Không trả mảng 'logs'; các số liệu tổng hợp được tính sẵn bằng
+    annotate() trong `WorkoutSessionViewSet.get_queryset`.
+    """
+    exercise_count = serializers.IntegerField(read_only=True)
+    total_sets = serializers.IntegerField(read_only=True)
+    duration_minutes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WorkoutSession
+        fields = [
+            'id', 'plan', 'start_time', 'end_time',
+            'total_calories', 'posture_score_avg',
+            'exercise_count', 'total_sets', 'duration_minutes'
+        ]
+
+    def get_duration_minutes(self, obj):
+        return round((obj.end_time - obj.start_time).total_seconds() / 60)
+
+# --- NHÓM 4: PROGRESS VISUALIZATION ---
+
+class PersonalRecordSerializer(serializers.ModelSerializer):
+    """ Kỷ lục cá nhân cho 1 bài tập (GET /records/) """
+    exercise_id = serializers.IntegerField(read_only=True)
+    exercise_name = serializers.CharField(source='exercise.name', read_only=True)
+    muscle_group = serializers.CharField(source='exercise.muscle_group', read_only=True)
+
+    class Meta:
+        model = PersonalRecord
+        fields = [
+            'exercise_id', 'exercise_name', 'muscle_group',
+            'max_weight_kg', 'max_weight_at', 'max_reps', 'max_reps_at',
+            'estimated_1rm_kg', 'estimated_1rm_at'
+        ]
 
 # --- NHÓM 6: NUTRITION & HYDRATION ---
 
@@ -164,7 +453,7 @@ class NutritionLogSerializer(serializers.ModelSerializer):
     """
     
     # Hiển thị user_id khi GET, nhưng không cho phép ghi đè khi POST
-    user_id = serializers.IntegerField(source='user.id', read_only=True)
+    user_id = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = NutritionLog
@@ -179,7 +468,7 @@ class HydrationLogSerializer(serializers.ModelSerializer):
     """
     Dịch HydrationLog (UC20)
     """
-    user_id = serializers.IntegerField(source='user.id', read_only=True)
+    user_id = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = HydrationLog
@@ -0,0 +1,258 @@
+# api/stats.py
+"""
+Các bảng tổng hợp (rollup) được cập nhật dần mỗi khi thêm/sửa/xóa
+WorkoutSession, để Dashboard không phải quét toàn bộ lịch sử.
+
+Nếu dữ liệu bị lệch (sửa tay trong Admin, lỗi giữa chừng...), chạy:
+    python manage.py rebuild_stats
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum, Count, F, ExpressionWrapper, FloatField, DateField
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from .models import WorkoutSession, ExerciseSet, UserStats, DailyActivity, WeeklyMuscleVolume
+from .progression import histories_with, recompute_history, rebuild_exercise_history
+from .records import records_set_in, recompute_records, rebuild_personal_records
+
+# Streak dài nhất có thể hiển thị; giới hạn số dòng DailyActivity phải đọc
+STREAK_WINDOW_DAYS = 366
+# Adherence = số ngày đã tập / số ngày dự kiến trong N tuần gần nhất
+ADHERENCE_WEEKS = 4
+
+# Tonnage của 1 set (rep x kg); set không có tạ => NULL, bị Sum bỏ qua
+SET_VOLUME = ExpressionWrapper(F('reps') * F('weight_kg'), output_field=FloatField())
+
+
+def apply_session(session, sign=1, muscle_volume=True):
+    """
+    Cộng (sign=1) hoặc trừ (sign=-1) một session vào các bảng tổng hợp.
+    `muscle_volume=False`: bỏ qua WeeklyMuscleVolume (sửa session mà không
+    đổi logs/start_time thì khối lượng theo tuần không đổi).
+    Phải được gọi bên trong transaction của thao tác ghi session.
+    """
+    has_posture = session.posture_score_avg is not None
+
+    UserStats.objects.get_or_create(user_id=session.user_id)
+    UserStats.objects.filter(pk=session.user_id).update(
+        total_calories=F('total_calories') + sign * session.total_calories,
+        workout_count=F('workout_count') + sign,
+        posture_score_sum=F('posture_score_sum') + sign * (session.posture_score_avg or 0),
+        posture_score_count=F('posture_score_count') + (sign if has_posture else 0),
+    )
+
+    day = timezone.localdate(session.start_time)
+    if sign > 0:
+        DailyActivity.objects.get_or_create(user_id=session.user_id, date=day)
+    activity_days = DailyActivity.objects.filter(user_id=session.user_id, date=day)
+    activity_days.update(session_count=F('session_count') + sign)
+    if sign < 0:
+        activity_days.filter(session_count__lte=0).delete()
+
+    if muscle_volume:
+        apply_muscle_volume(session, sign)
+
+
+def week_start(day):
+    """ Thứ Hai của tuần chứa `day` """
+    return day - timedelta(days=day.weekday())
+
+
+def apply_muscle_volume(session, sign=1):
+    """
+    Cộng/trừ số set, rep, tonnage của session vào WeeklyMuscleVolume.
+    Đọc các set đang lưu của session, nên khi sửa phải trừ trước khi thay logs.
+    Nhóm theo ExerciseLog.muscle_group (lưu lúc ghi log), không theo Exercise
+    hiện tại: sửa nhóm cơ hoặc xóa bài tập không làm lệch các lần trừ sau.
+    Log không có nhóm cơ (không gắn được bài tập) được bỏ qua.
+    """
+    volumes = ExerciseSet.objects.filter(log__session=session, log__muscle_group__isnull=False).values(
+        'log__muscle_group',
+    ).annotate(set_count=Count('id'), total_reps=Sum('reps'), volume_kg=Sum(SET_VOLUME)).order_by()
+    volumes = {row.pop('log__muscle_group'): row for row in volumes}
+    if not volumes:
+        return
+
+    week = week_start(timezone.localdate(session.start_time))
+    rows = {
+        row.muscle_group: row
+        for row in WeeklyMuscleVolume.objects.select_for_update().filter(
+            user_id=session.user_id, week_start=week, muscle_group__in=volumes,
+        )
+    }
+    created = []
+    for muscle_group, volume in volumes.items():
+        row = rows.get(muscle_group)
+        if row is None:
+            row = WeeklyMuscleVolume(user_id=session.user_id, week_start=week, muscle_group=muscle_group)
+            created.append(row)
+        row.set_count += sign * volume['set_count']
+        row.total_reps += sign * (volume['total_reps'] or 0)
+        # Làm tròn để cộng/trừ nhiều lần không để lại sai số kiểu 1e-12
+        row.volume_kg = round(row.volume_kg + sign * (volume['volume_kg'] or 0), 2)
+
+    WeeklyMuscleVolume.objects.bulk_create([row for row in created if row.set_count > 0])
+    if rows:
+        WeeklyMuscleVolume.objects.bulk_update(rows.values(), ['set_count', 'total_reps', 'volume_kg'])
+    if sign < 0:
+        WeeklyMuscleVolume.objects.filter(user_id=session.user_id, week_start=week, set_count__lte=0).delete()
+
+
+def record_session(session):
+    """ Gọi sau khi đã tạo session (và các ExerciseLog của nó). """
+    apply_session(session, sign=1)
+
+
+def remove_session(session):
+    """ Xóa session và trừ nó khỏi các bảng tổng hợp trong cùng 1 transaction. """
+    with transaction.atomic():
+        apply_session(session, sign=-1)
+        stale_records = records_set_in(session)
+        stale_histories = histories_with(session)
+        session.delete()
+        recompute_records(session.user_id, stale_records)
+        recompute_history(session.user_id, stale_histories)
+
+
+def get_streak_and_adherence(user, days_per_week, today=None):
+    """
+    Tính (streak, adherence_percent) từ DailyActivity.
+    Chỉ đọc tối đa STREAK_WINDOW_DAYS dòng, không phụ thuộc độ dài lịch sử.
+
+    - streak: số ngày tập liên tiếp tính đến hôm nay (nếu hôm nay chưa tập
+      thì tính đến hôm qua, chuỗi vẫn chưa bị đứt).
+    - adherence: số ngày đã tập trong ADHERENCE_WEEKS tuần gần nhất so với
+      `days_per_week` * ADHERENCE_WEEKS, tối đa 100%.
+    """
+    today = today or timezone.localdate()
+    active_dates = list(_active_dates(user, today))
+    return _streak_and_adherence(active_dates, days_per_week, today)
+
+
+async def aget_streak_and_adherence(user, days_per_week, today=None):
+    """ Bản async của `get_streak_and_adherence` (dùng async ORM) """
+    today = today or timezone.localdate()
+    active_dates = [active_date async for active_date in _active_dates(user, today)]
+    return _streak_and_adherence(active_dates, days_per_week, today)
+
+
+def _active_dates(user, today):
+    return DailyActivity.objects.filter(
+        user=user,
+        date__lte=today,
+        date__gt=today - timedelta(days=STREAK_WINDOW_DAYS),
+    ).order_by('-date').values_list('date', flat=True)
+
+
+def _streak_and_adherence(active_dates, days_per_week, today):
+    """ active_dates: các ngày có tập, mới nhất trước """
+    streak = 0
+    expected = today
+    if active_dates and active_dates[0] != today:
+        expected = today - timedelta(days=1)
+    for active_date in active_dates:
+        if active_date != expected:
+            break
+        streak += 1
+        expected -= timedelta(days=1)
+
+    adherence = 0
+    if days_per_week:
+        window_start = today - timedelta(weeks=ADHERENCE_WEEKS)
+        active_in_window = sum(1 for d in active_dates if d > window_start)
+        planned = days_per_week * ADHERENCE_WEEKS
+        adherence = min(100, round(active_in_window * 100 / planned))
+
+    return streak, adherence
+
+
+def rebuild_user_stats(user_ids=None):
+    """
+    Tính lại UserStats từ đầu bằng 1 câu GROUP BY trên WorkoutSession.
+    `user_ids=None` nghĩa là tính lại cho tất cả user.
+    """
+    sessions = WorkoutSession.objects.all()
+    existing = UserStats.objects.all()
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    rows = sessions.values('user_id').annotate(
+        total_calories=Sum('total_calories'),
+        workout_count=Count('id'),
+        posture_score_sum=Sum('posture_score_avg'),
+        posture_score_count=Count('posture_score_avg'),
+    ).order_by()
+
+    with transaction.atomic():
+        existing.delete()
+        UserStats.objects.bulk_create([
+            UserStats(
+                user_id=row['user_id'],
+                total_calories=row['total_calories'] or 0,
+                workout_count=row['workout_count'],
+                posture_score_sum=row['posture_score_sum'] or 0,
+                posture_score_count=row['posture_score_count'],
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+def rebuild_daily_activity(user_ids=None):
+    """ Tính lại DailyActivity (số session mỗi ngày) từ WorkoutSession. """
+    sessions = WorkoutSession.objects.all()
+    existing = DailyActivity.objects.all()
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    rows = sessions.annotate(day=TruncDate('start_time')).values('user_id', 'day').annotate(
+        session_count=Count('id'),
+    ).order_by()
+
+    with transaction.atomic():
+        existing.delete()
+        DailyActivity.objects.bulk_create([
+            DailyActivity(user_id=row['user_id'], date=row['day'], session_count=row['session_count'])
+            for row in rows
+        ], batch_size=1000)
+
+
+def rebuild_weekly_muscle_volume(user_ids=None):
+    """ Tính lại WeeklyMuscleVolume bằng 1 câu GROUP BY (user, tuần, nhóm cơ) trên ExerciseSet. """
+    sets = ExerciseSet.objects.filter(log__muscle_group__isnull=False)
+    existing = WeeklyMuscleVolume.objects.all()
+    if user_ids is not None:
+        sets = sets.filter(log__session__user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    rows = sets.annotate(
+        week=TruncWeek('log__session__start_time', output_field=DateField()),
+    ).values('log__session__user_id', 'week', 'log__muscle_group').annotate(
+        set_count=Count('id'), total_reps=Sum('reps'), volume_kg=Sum(SET_VOLUME),
+    ).order_by()
+
+    with transaction.atomic():
+        existing.delete()
+        WeeklyMuscleVolume.objects.bulk_create([
+            WeeklyMuscleVolume(
+                user_id=row['log__session__user_id'],
+                week_start=row['week'],
+                muscle_group=row['log__muscle_group'],
+                set_count=row['set_count'],
+                total_reps=row['total_reps'] or 0,
+                volume_kg=round(row['volume_kg'] or 0, 2),
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+def rebuild_all(user_ids=None):
+    """ Tính lại toàn bộ các bảng tổng hợp. """
+    rebuild_user_stats(user_ids)
+    rebuild_daily_activity(user_ids)
+    rebuild_weekly_muscle_volume(user_ids)
+    rebuild_personal_records(user_ids)
+    rebuild_exercise_history(user_ids)
@@ -1,3 +1,1611 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib
+import json
+from datetime import datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.apps import apps as django_apps
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
 
 # Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, resolve
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .authentication import AUTH_USER_FIELDS, CachedTokenAuthentication, token_cache_key
+from .catalog import get_exercise_ids_by_name, get_suggested_plan
+from .fake_data import FakeDataGenerator, delete_fake_data
+from .export import EXPORT_DATASETS
+from .metrics import DB_QUERIES, REQUESTS, PoolStatsCollector
+from .models import (
+    Exercise, WorkoutPlan, PlanExercise, WorkoutSession, ExerciseLog, ExerciseSet, UserStats, NutritionLog,
+    HydrationLog, PersonalRecord, ExerciseHistory, WeeklyMuscleVolume,
+)
+from .progression import RECENT_LOGS_PER_EXERCISE, parse_rep_range, rebuild_exercise_history
+from .records import estimate_one_rep_max, rebuild_personal_records
+from .replicas import PrimaryReplicaRouter, ReplicaPinningMiddleware
+from .search import fold, get_search_index
+from .stats import record_session, remove_session, get_streak_and_adherence, rebuild_weekly_muscle_volume, week_start
+from .utils import MAX_SETS_PER_LOG, normalize_exercise_name, parse_sets
+
+
+class WorkoutPlanQueryCountTests(TestCase):
+    """ Số query của GET /plans/ phải cố định, không phụ thuộc kích thước plan """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # 25 bài tập đã được seed sẵn bởi migration 0003
+        self.exercises = list(Exercise.objects.order_by('id'))
+
+    def _make_plans(self, plan_count, exercises_per_plan):
+        for i in range(plan_count):
+            plan = WorkoutPlan.objects.create(user=self.user, name=f'Plan {i}')
+            PlanExercise.objects.bulk_create([
+                PlanExercise(plan=plan, exercise=exercise, sets=3, reps='8-12', day_number=1)
+                for exercise in self.exercises[:exercises_per_plan]
+            ])
+        return plan
+
+    def test_list_query_count_is_constant(self):
+        self._make_plans(plan_count=1, exercises_per_plan=1)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/plans/')
+        self.assertEqual(response.status_code, 200)
+
+        self._make_plans(plan_count=19, exercises_per_plan=25)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/plans/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(len(response.data[-1]['plan_exercises']), 25)
+
+    def test_detail_query_count_is_constant(self):
+        plan = self._make_plans(plan_count=1, exercises_per_plan=25)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/plans/{plan.id}/')
+        self.assertEqual(response.status_code, 200)
+        first = response.data['plan_exercises'][0]
+        self.assertEqual(first['exercise_name'], self.exercises[0].name)
+        self.assertEqual(first['description'], self.exercises[0].description)
+
+
+class WorkoutSessionListTests(TestCase):
+    """ GET /sessions/ trả bản tóm tắt, không nạp từng ExerciseLog """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='lifter', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _make_sessions(self, count, logs_per_session=3):
+        start = timezone.now()
+        for i in range(count):
+            session = WorkoutSession.objects.create(
+                user=self.user,
+                start_time=start - timedelta(days=i, minutes=45),
+                end_time=start - timedelta(days=i),
+            )
+            ExerciseLog.objects.bulk_create([
+                ExerciseLog(session=session, exercise_name=f'Ex {j}', sets_completed=3, reps_completed='10, 10, 8')
+                for j in range(logs_per_session)
+            ])
+
+    def test_list_returns_summary(self):
+        self._make_sessions(1)
+        response = self.client.get('/api/v1/sessions/')
+        self.assertEqual(response.status_code, 200)
+        row = response.data['results'][0]
+        self.assertNotIn('logs', row)
+        self.assertEqual(row['exercise_count'], 3)
+        self.assertEqual(row['total_sets'], 9)
+        self.assertEqual(row['duration_minutes'], 45)
+
+    def test_list_query_count_is_constant(self):
+        self._make_sessions(1)
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/sessions/')
+        # session + logs + sets
+        with self.assertNumQueries(3):
+            self.client.get('/api/v1/sessions/?expand=logs')
+
+        self._make_sessions(10)
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/sessions/')
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/sessions/?expand=logs')
+        self.assertEqual(len(response.data['results'][0]['logs']), 3)
+
+    def test_list_is_cursor_paginated(self):
+        self._make_sessions(5, logs_per_session=1)
+        response = self.client.get('/api/v1/sessions/?page_size=2')
+        first_page = response.data['results']
+        self.assertEqual(len(first_page), 2)
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        second_page = response.data['results']
+        self.assertEqual(len(second_page), 2)
+        self.assertGreater(first_page[-1]['start_time'], second_page[0]['start_time'])
+
+    def test_summary_is_computed_per_page_not_over_history(self):
+        self._make_sessions(60, logs_per_session=2)
+        # Session không có log nào: 0 chứ không phải null
+        now = timezone.now()
+        WorkoutSession.objects.create(user=self.user, start_time=now, end_time=now + timedelta(minutes=20))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/sessions/?page_size=5')
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql'].upper()
+        # Không JOIN + GROUP BY toàn bộ lịch sử trước khi cắt trang
+        self.assertNotIn('GROUP BY', sql)
+        self.assertNotIn('JOIN', sql)
+        rows = response.data['results']
+        self.assertEqual(len(rows), 5)
+        self.assertEqual((rows[0]['exercise_count'], rows[0]['total_sets']), (0, 0))
+        self.assertEqual({(row['exercise_count'], row['total_sets']) for row in rows[1:]}, {(2, 6)})
+
+
+class DashboardStatsTests(TestCase):
+    """ UserStats được cập nhật khi tạo/xóa session; Dashboard chỉ đọc 1 dòng """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='dash', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _post_session(self, calories, posture):
+        response = self.client.post('/api/v1/sessions/', {
+            'start_time': '2025-10-27T13:00:00Z',
+            'end_time': '2025-10-27T13:45:00Z',
+            'total_calories': calories,
+            'posture_score_avg': posture,
+            'logs': [{'exercise_name': 'Bodyweight Squat', 'sets_completed': 3, 'reps_completed': '12, 12, 10'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_dashboard_tracks_create_and_delete(self):
+        self._post_session(300, 80)
+        second = self._post_session(200, None)
+        third = self._post_session(100, 90)
+        self.client.delete(f'/api/v1/sessions/{third}/')
+
+        data = self.client.get('/api/v1/dashboard/').data
+        self.assertEqual(data['total_calories_burnt'], 500)
+        self.assertEqual(data['total_workouts'], 2)
+        self.assertEqual(data['average_posture_score'], 80)
+
+        self.client.patch(f'/api/v1/sessions/{second}/', {'total_calories': 250}, format='json')
+        self.assertEqual(self.client.get('/api/v1/dashboard/').data['total_calories_burnt'], 550)
+
+    def test_rebuild_stats_command_fixes_drift(self):
+        self._post_session(300, 80)
+        UserStats.objects.filter(pk=self.user.pk).update(total_calories=0, workout_count=7)
+
+        call_command('rebuild_stats', stdout=StringIO())
+
+        stats = UserStats.objects.get(pk=self.user.pk)
+        self.assertEqual((stats.total_calories, stats.workout_count), (300, 1))
+
+
+class StreakAdherenceTests(TestCase):
+    """ Streak/Adherence được tính từ chỉ mục DailyActivity """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='streaky', password='x')
+        self.user.profile.days_per_week = 3
+        self.user.profile.save()
+        self.today = timezone.localdate()
+
+    def _train_on(self, *days_ago):
+        for n in days_ago:
+            start = timezone.now() - timedelta(days=n)
+            session = WorkoutSession.objects.create(user=self.user, start_time=start, end_time=start)
+            record_session(session)
+
+    def test_streak_counts_consecutive_days(self):
+        self._train_on(1, 2, 2, 3, 5)
+        streak, _ = get_streak_and_adherence(self.user, 3, today=self.today)
+        # Hôm nay chưa tập nhưng chuỗi 1-2-3 ngày trước vẫn còn
+        self.assertEqual(streak, 3)
+
+        self._train_on(0)
+        streak, _ = get_streak_and_adherence(self.user, 3, today=self.today)
+        self.assertEqual(streak, 4)
+
+    def test_deleting_last_session_of_a_day_breaks_streak(self):
+        self._train_on(0, 1, 2)
+        session = WorkoutSession.objects.filter(user=self.user).order_by('start_time')[1]
+        remove_session(session)
+        streak, _ = get_streak_and_adherence(self.user, 3, today=self.today)
+        self.assertEqual(streak, 1)
+
+    def test_adherence_against_days_per_week(self):
+        self._train_on(0, 3, 6, 9, 12, 15)
+        _, adherence = get_streak_and_adherence(self.user, 3, today=self.today)
+        self.assertEqual(adherence, 50)
+        _, adherence = get_streak_and_adherence(self.user, None, today=self.today)
+        self.assertEqual(adherence, 0)
+
+
+class GeneratePlanCatalogTests(TestCase):
+    """ GET /plans/generate/ đọc từ catalog tính sẵn, tự làm mới khi Exercise đổi """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='newbie', password='x')
+        profile = self.user.profile
+        profile.main_goal = 'build_muscle'
+        profile.experience_level = 'beginner'
+        profile.days_per_week = 3
+        profile.equipment_available = 'bodyweight'
+        profile.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_generate_uses_no_exercise_queries(self):
+        self.client.get('/api/v1/plans/generate/')  # Lần đầu: tính catalog
+        # (profile đã nằm sẵn trên self.user)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/plans/generate/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Gợi ý: build_muscle - 3 ngày')
+        self.assertEqual({e['day_number'] for e in response.data['plan_exercises']}, {1, 2, 3})
+
+    def test_catalog_is_rebuilt_when_exercises_change(self):
+        first = self.client.get('/api/v1/plans/generate/').data['plan_exercises'][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Exercise.objects.filter(pk=first['exercise_id']).get().delete()
+
+        plan = self.client.get('/api/v1/plans/generate/').data
+        self.assertNotIn(first['exercise_id'], [e['exercise_id'] for e in plan['plan_exercises']])
+
+
+class ExerciseSetTests(TestCase):
+    """ Mỗi ExerciseLog được lưu kèm từng set dạng số (ExerciseSet) """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='lifter', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.session_body = {
+            'start_time': (now - timedelta(hours=1)).isoformat(),
+            'end_time': now.isoformat(),
+            'total_calories': 300,
+        }
+
+    def _post(self, log):
+        return self.client.post('/api/v1/sessions/', {**self.session_body, 'logs': [log]}, format='json')
+
+    def test_parse_sets(self):
+        self.assertEqual(
+            parse_sets(3, '12, 10, 8', '60, 60, 70'),
+            [(1, 12, None, 60.0), (2, 10, None, 60.0), (3, 8, None, 70.0)],
+        )
+        # 1 giá trị cho mọi set; "30s" là thời gian giữ
+        self.assertEqual(parse_sets(2, '30s', '5kg'), [(1, None, 30, 5.0), (2, None, 30, 5.0)])
+        self.assertEqual(parse_sets(2, 'abc', None), [(1, None, None, None), (2, None, None, None)])
+        self.assertEqual(len(parse_sets(10 ** 9, '10', None)), MAX_SETS_PER_LOG)
+
+    def test_sets_parsed_from_strings(self):
+        response = self._post({
+            'exercise_name': 'Squat', 'sets_completed': 3, 'reps_completed': '12, 10, 8', 'weight_kg': '60, 60, 70',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(s['set_number'], s['reps'], s['weight_kg']) for s in response.data['logs'][0]['sets']],
+            [(1, 12, 60.0), (2, 10, 60.0), (3, 8, 70.0)],
+        )
+        self.assertEqual(ExerciseSet.objects.filter(log__session__user=self.user).count(), 3)
+
+    def test_sets_sent_directly(self):
+        response = self._post({
+            'exercise_name': 'Plank', 'sets': [{'duration_seconds': 30}, {'duration_seconds': 45, 'weight_kg': 5}],
+        })
+        self.assertEqual(response.status_code, 201)
+        log = response.data['logs'][0]
+        # Các trường dạng chuỗi vẫn được điền cho client cũ
+        self.assertEqual((log['sets_completed'], log['reps_completed'], log['weight_kg']), (2, '30s, 45s', '-, 5'))
+        self.assertEqual([s['set_number'] for s in log['sets']], [1, 2])
+
+    def test_invalid_logs_rejected(self):
+        self.assertEqual(self._post({'exercise_name': 'Squat'}).status_code, 400)
+        response = self._post({'exercise_name': 'Squat', 'sets': [{'set_number': 1, 'reps': 5}, {'set_number': 1, 'reps': 5}]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_replacing_logs_replaces_sets(self):
+        session_id = self._post({'exercise_name': 'Squat', 'sets_completed': 3, 'reps_completed': '5'}).data['id']
+        response = self.client.patch(
+            f'/api/v1/sessions/{session_id}/',
+            {'logs': [{'exercise_name': 'Row', 'sets_completed': 2, 'reps_completed': '8, 8'}]}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(ExerciseSet.objects.filter(log__session_id=session_id).values_list('log__exercise_name', 'reps')),
+            [('Row', 8), ('Row', 8)],
+        )
+
+
+class ExerciseLogExerciseLinkTests(TestCase):
+    """ ExerciseLog.exercise được gắn theo exercise_name (khi ghi log và khi migrate) """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='linker', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exercise = Exercise.objects.create(name='Goblet Squat', description='x', muscle_group='legs')
+        now = timezone.now()
+        self.session_body = {
+            'start_time': (now - timedelta(hours=1)).isoformat(),
+            'end_time': now.isoformat(),
+            'total_calories': 300,
+        }
+
+    def _post(self, *names):
+        logs = [{'exercise_name': name, 'sets_completed': 1, 'reps_completed': '10'} for name in names]
+        return self.client.post('/api/v1/sessions/', {**self.session_body, 'logs': logs}, format='json')
+
+    def test_exercise_resolved_by_name(self):
+        response = self._post('  goblet   SQUAT ', 'Không có trong thư viện')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([log['exercise_id'] for log in response.data['logs']], [self.exercise.id, None])
+        # Giữ nguyên tên client gửi
+        self.assertEqual(response.data['logs'][0]['exercise_name'], 'goblet   SQUAT')
+
+    def test_new_exercise_resolved_after_catalog_change(self):
+        self._post('Cable Fly')
+        with self.captureOnCommitCallbacks(execute=True):
+            fly = Exercise.objects.create(name='Cable Fly', description='x', muscle_group='chest')
+        response = self._post('Cable Fly')
+        self.assertEqual(response.data['logs'][0]['exercise_id'], fly.id)
+
+    def test_deleted_exercise_keeps_name(self):
+        session_id = self._post('Goblet Squat').data['id']
+        self.exercise.delete()
+        log = ExerciseLog.objects.get(session_id=session_id)
+        self.assertEqual((log.exercise_id, log.exercise_name), (None, 'Goblet Squat'))
+
+    def test_backfill_migration(self):
+        now = timezone.now()
+        session = WorkoutSession.objects.create(user=self.user, start_time=now, end_time=now, total_calories=0)
+        logs = ExerciseLog.objects.bulk_create([
+            ExerciseLog(session=session, exercise_name=name, sets_completed=1, reps_completed='5')
+            for name in ('Goblet Squat', 'goblet squat', 'Unknown')
+        ])
+        migration = importlib.import_module('api.migrations.0013_backfill_exerciselog_exercise')
+        migration.backfill_exerciselog_exercise(django_apps, None)
+        self.assertEqual(
+            list(ExerciseLog.objects.filter(pk__in=[log.pk for log in logs]).order_by('id').values_list('exercise_id', flat=True)),
+            [self.exercise.id, self.exercise.id, None],
+        )
+
+
+class PersonalRecordTests(TestCase):
+    """ Kỷ lục cá nhân được cập nhật khi thêm/sửa/xóa session (api/records.py) """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pr', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.bench = Exercise.objects.create(name='Bench Press', description='x', muscle_group='chest')
+        self.now = timezone.now()
+
+    def _post(self, reps, weight, days_ago=0, name='Bench Press'):
+        start = self.now - timedelta(days=days_ago, hours=1)
+        return self.client.post('/api/v1/sessions/', {
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=45)).isoformat(),
+            'total_calories': 300,
+            'logs': [{'exercise_name': name, 'sets_completed': len(reps.split(',')), 'reps_completed': reps, 'weight_kg': weight}],
+        }, format='json')
+
+    def _records(self):
+        response = self.client.get('/api/v1/records/')
+        self.assertEqual(response.status_code, 200)
+        return {
+            row['exercise_name']: (row['max_weight_kg'], row['max_reps'], row['estimated_1rm_kg'])
+            for row in response.data
+        }
+
+    def _snapshot(self):
+        return list(PersonalRecord.objects.order_by('exercise_id').values_list(
+            'exercise_id', 'max_weight_kg', 'max_weight_at', 'max_reps', 'max_reps_at', 'estimated_1rm_kg', 'estimated_1rm_at',
+        ))
+
+    def test_estimate_one_rep_max(self):
+        self.assertEqual(estimate_one_rep_max(5, 100), 116.7)
+        self.assertEqual(estimate_one_rep_max(1, 100), 100)
+        self.assertIsNone(estimate_one_rep_max(20, 100))
+        self.assertIsNone(estimate_one_rep_max(10, None))
+
+    def test_new_records_flagged_on_create(self):
+        first = self._post('5, 5', '100', days_ago=1)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(
+            {(flag['metric'], flag['value'], flag['previous']) for flag in first.data['new_records']},
+            {('max_weight_kg', 100, None), ('max_reps', 5, None), ('estimated_1rm_kg', 116.7, None)},
+        )
+        # Chỉ phá kỷ lục tạ (và 1RM), số rep không vượt
+        second = self._post('3', '110')
+        self.assertEqual(
+            {(flag['metric'], flag['value'], flag['previous']) for flag in second.data['new_records']},
+            {('max_weight_kg', 110, 100), ('estimated_1rm_kg', 121.0, 116.7)},
+        )
+        self.assertEqual(self._records(), {'Bench Press': (110, 5, 121.0)})
+        # GET chi tiết không có new_records
+        self.assertNotIn('new_records', self.client.get(f"/api/v1/sessions/{second.data['id']}/").data)
+
+    def test_unknown_exercise_has_no_record(self):
+        response = self._post('10', '50', name='Bài tự chế')
+        self.assertEqual(response.data['new_records'], [])
+        self.assertEqual(self._records(), {})
+
+    def test_delete_and_edit_recompute_affected_records(self):
+        self._post('5', '100', days_ago=2)
+        best = self._post('5', '120', days_ago=1).data['id']
+        self.assertEqual(self._records(), {'Bench Press': (120, 5, 140.0)})
+
+        self.client.patch(f'/api/v1/sessions/{best}/', {
+            'logs': [{'exercise_name': 'Bench Press', 'sets_completed': 1, 'reps_completed': '8', 'weight_kg': '90'}],
+        }, format='json')
+        self.assertEqual(self._records(), {'Bench Press': (100, 8, 116.7)})
+
+        self.assertEqual(self.client.delete(f'/api/v1/sessions/{best}/').status_code, 204)
+        self.assertEqual(self._records(), {'Bench Press': (100, 5, 116.7)})
+
+    def test_sync_flags_each_session_and_matches_rebuild(self):
+        sessions = [
+            {
+                'start_time': (self.now - timedelta(days=days_ago, hours=1)).isoformat(),
+                'end_time': (self.now - timedelta(days=days_ago)).isoformat(),
+                'total_calories': 300,
+                'logs': [{'exercise_name': 'Bench Press', 'sets_completed': 1, 'reps_completed': '5', 'weight_kg': weight}],
+            }
+            # Gửi không theo thứ tự thời gian: session cũ hơn vẫn được xét trước
+            for days_ago, weight in ((1, '90'), (3, '80'), (2, '70'))
+        ]
+        response = self.client.post('/api/v1/sessions/sync/', sessions, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [[flag['value'] for flag in flags if flag['metric'] == 'max_weight_kg'] for flags in response.data['new_records']],
+            [[90], [80], []],
+        )
+
+        incremental = self._snapshot()
+        rebuild_personal_records()
+        self.assertEqual(self._snapshot(), incremental)
+
+
+class NextSessionTests(TestCase):
+    """ GET /plans/<id>/next-session/: gợi ý tạ/rep từ ExerciseHistory (api/progression.py) """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='progress', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.bench = Exercise.objects.create(name='Bench Press', description='x', muscle_group='chest')
+        self.plank = Exercise.objects.create(name='Plank Hold', description='x', muscle_group='core')
+        self.plan = WorkoutPlan.objects.create(user=self.user, name='PPL')
+        PlanExercise.objects.create(plan=self.plan, exercise=self.bench, sets=3, reps='8-12', day_number=1)
+        PlanExercise.objects.create(plan=self.plan, exercise=self.plank, sets=2, reps='30s', day_number=2)
+        self.now = timezone.now()
+
+    def _post(self, days_ago, logs):
+        start = self.now - timedelta(days=days_ago, hours=1)
+        response = self.client.post('/api/v1/sessions/', {
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=45)).isoformat(),
+            'total_calories': 300,
+            'logs': logs,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def _bench(self, days_ago, reps, weight):
+        return self._post(days_ago, [{
+            'exercise_name': 'Bench Press', 'sets_completed': len(reps.split(',')), 'reps_completed': reps, 'weight_kg': weight,
+        }])
+
+    def _suggestions(self, day=None):
+        query = f'?day={day}' if day else ''
+        response = self.client.get(f'/api/v1/plans/{self.plan.id}/next-session/{query}')
+        self.assertEqual(response.status_code, 200)
+        return {
+            row['exercise_name']: (row['target_weight_kg'], row['target_reps'] or row['target_duration_seconds'], row['reason'])
+            for row in response.data['exercises']
+        }
+
+    def test_parse_rep_range(self):
+        self.assertEqual(parse_rep_range('8-12'), (8, 12, False))
+        self.assertEqual(parse_rep_range('5'), (5, 5, False))
+        self.assertEqual(parse_rep_range('30s'), (30, 30, True))
+        self.assertIsNone(parse_rep_range('AMRAP'))
+
+    def test_no_history(self):
+        self.assertEqual(self._suggestions(), {
+            'Bench Press': (None, 8, 'no_history'),
+            'Plank Hold': (None, 30, 'no_history'),
+        })
+
+    def test_double_progression(self):
+        self._bench(3, '10, 9, 8', '60')
+        self.assertEqual(self._suggestions(day=1), {'Bench Press': (60, 11, 'repeat')})
+        # Mọi set đạt 12 rep => tăng tạ, quay về 8 rep
+        self._bench(2, '12, 12, 12', '60')
+        self.assertEqual(self._suggestions(day=1), {'Bench Press': (62.5, 8, 'increase_weight')})
+        # Bài giữ tư thế: đạt đủ thời gian => tăng thời gian
+        self._post(1, [{'exercise_name': 'Plank Hold', 'sets': [{'duration_seconds': 30}, {'duration_seconds': 35}]}])
+        self.assertEqual(self._suggestions(day=2), {'Plank Hold': (None, 40, 'increase_reps')})
+
+    def test_deload_after_stall(self):
+        for days_ago in (3, 2, 1):
+            self._bench(days_ago, '7, 6, 5', '100')
+        self.assertEqual(self._suggestions(day=1), {'Bench Press': (90, 12, 'deload')})
+
+    def test_history_recomputed_on_delete_and_matches_rebuild(self):
+        self._bench(3, '10, 9, 8', '60')
+        latest = self._bench(1, '12, 12, 12', '60')
+        self.assertEqual(self.client.delete(f'/api/v1/sessions/{latest}/').status_code, 204)
+        self.assertEqual(self._suggestions(day=1), {'Bench Press': (60, 11, 'repeat')})
+
+        incremental = list(ExerciseHistory.objects.order_by('exercise_id').values_list('exercise_id', 'recent'))
+        rebuild_exercise_history()
+        self.assertEqual(list(ExerciseHistory.objects.order_by('exercise_id').values_list('exercise_id', 'recent')), incremental)
+
+    def test_history_keeps_latest_sessions(self):
+        for days_ago in range(RECENT_LOGS_PER_EXERCISE + 2, 0, -1):
+            self._bench(days_ago, '10', '60')
+        recent = ExerciseHistory.objects.get(user=self.user, exercise=self.bench).recent
+        self.assertEqual(len(recent), RECENT_LOGS_PER_EXERCISE)
+        self.assertEqual(recent, sorted(recent, key=lambda entry: entry['at'], reverse=True))
+
+    def test_invalid_day_and_other_users_plan(self):
+        self.assertEqual(self.client.get(f'/api/v1/plans/{self.plan.id}/next-session/?day=abc').status_code, 400)
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='other', password='x'))
+        self.assertEqual(other.get(f'/api/v1/plans/{self.plan.id}/next-session/').status_code, 404)
+
+
+class WeeklyMuscleVolumeTests(TestCase):
+    """ WeeklyMuscleVolume được cập nhật khi ghi session + GET /analytics/muscle-volume/ """
+
+    def setUp(self):
+        # Catalog version mới => index bài tập trong bộ nhớ được nạp lại
+        cache.clear()
+        self.user = User.objects.create_user(username='volume', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Exercise.objects.create(name='Back Squat', description='x', muscle_group='legs')
+        Exercise.objects.create(name='Bench Press', description='x', muscle_group='chest')
+        self.this_week = week_start(timezone.localdate())
+        self.last_week = self.this_week - timedelta(weeks=1)
+
+    def _at(self, week, days=0):
+        """ 12h trưa của ngày thứ `days` trong tuần bắt đầu từ `week` """
+        return timezone.make_aware(datetime.combine(week + timedelta(days=days), time(12)))
+
+    def _post(self, start, logs):
+        response = self.client.post('/api/v1/sessions/', {
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=45)).isoformat(),
+            'total_calories': 300,
+            'logs': logs,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def _buckets(self):
+        return {
+            (week, muscle_group): (set_count, total_reps, volume_kg)
+            for week, muscle_group, set_count, total_reps, volume_kg in WeeklyMuscleVolume.objects.filter(
+                user=self.user,
+            ).values_list('week_start', 'muscle_group', 'set_count', 'total_reps', 'volume_kg')
+        }
+
+    def _squat(self, start, reps='10, 8', weight='100'):
+        return self._post(start, [{
+            'exercise_name': 'back squat', 'sets_completed': len(reps.split(',')), 'reps_completed': reps, 'weight_kg': weight,
+        }])
+
+    def test_buckets_follow_create_edit_delete(self):
+        first = self._squat(self._at(self.last_week, 1))
+        self._post(self._at(self.last_week, 3), [
+            {'exercise_name': 'Back Squat', 'sets_completed': 1, 'reps_completed': '5', 'weight_kg': '120'},
+            {'exercise_name': 'Bench Press', 'sets_completed': 2, 'reps_completed': '8', 'weight_kg': '60'},
+            # Không có trong thư viện => không biết nhóm cơ, bỏ qua
+            {'exercise_name': 'Mystery Move', 'sets_completed': 3, 'reps_completed': '10'},
+        ])
+        self.assertEqual(self._buckets(), {
+            (self.last_week, 'legs'): (3, 23, 2400.0),
+            (self.last_week, 'chest'): (2, 16, 960.0),
+        })
+
+        # Dời session sang tuần trước nữa
+        two_weeks_ago = self.last_week - timedelta(weeks=1)
+        response = self.client.patch(f'/api/v1/sessions/{first}/', {
+            'start_time': self._at(two_weeks_ago).isoformat(),
+            'end_time': (self._at(two_weeks_ago) + timedelta(minutes=45)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._buckets(), {
+            (two_weeks_ago, 'legs'): (2, 18, 1800.0),
+            (self.last_week, 'legs'): (1, 5, 600.0),
+            (self.last_week, 'chest'): (2, 16, 960.0),
+        })
+
+        self._assert_matches_rebuild()
+
+        # Xóa session => dòng về 0 bị xóa
+        self.assertEqual(self.client.delete(f'/api/v1/sessions/{first}/').status_code, 204)
+        self.assertNotIn((two_weeks_ago, 'legs'), self._buckets())
+
+    def _assert_matches_rebuild(self):
+        incremental = self._buckets()
+        rebuild_weekly_muscle_volume()
+        self.assertEqual(self._buckets(), incremental)
+
+    def test_changing_exercise_muscle_group_keeps_logged_group(self):
+        session = self._squat(self._at(self.last_week))
+        squat = Exercise.objects.get(name='Back Squat')
+        with self.captureOnCommitCallbacks(execute=True):
+            squat.muscle_group = 'core'
+            squat.save()
+        # Sửa rồi xóa session: trừ đúng nhóm cơ lúc ghi log, không phải nhóm cơ mới
+        response = self.client.patch(f'/api/v1/sessions/{session}/', {'logs': [
+            {'exercise_name': 'Bench Press', 'sets_completed': 1, 'reps_completed': '10', 'weight_kg': '50'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._buckets(), {(self.last_week, 'chest'): (1, 10, 500.0)})
+        self._assert_matches_rebuild()
+
+        self._squat(self._at(self.last_week, 1))
+        self.assertEqual(self._buckets()[(self.last_week, 'core')], (2, 18, 1800.0))
+        self._assert_matches_rebuild()
+
+    def test_deleting_exercise_keeps_logged_group(self):
+        session = self._squat(self._at(self.last_week))
+        Exercise.objects.get(name='Back Squat').delete()
+        self._assert_matches_rebuild()
+        self.assertEqual(self.client.delete(f'/api/v1/sessions/{session}/').status_code, 204)
+        self.assertEqual(self._buckets(), {})
+        self._assert_matches_rebuild()
+
+    def test_endpoint_fills_empty_weeks(self):
+        self._squat(self._at(self.last_week))
+        self._squat(self._at(self.last_week - timedelta(weeks=5)))
+
+        response = self.client.get('/api/v1/analytics/muscle-volume/?weeks=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([week['week_start'] for week in response.data['weeks']], [
+            self.last_week - timedelta(weeks=1), self.last_week, self.this_week,
+        ])
+        self.assertEqual([week['muscle_groups'] for week in response.data['weeks']], [
+            {}, {'legs': {'sets': 2, 'reps': 18, 'volume_kg': 1800.0}}, {},
+        ])
+        # Buổi tập 5 tuần trước nằm ngoài khoảng
+        self.assertEqual(response.data['totals'], {'legs': {'sets': 2, 'reps': 18, 'volume_kg': 1800.0}})
+
+        response = self.client.get('/api/v1/analytics/muscle-volume/')
+        self.assertEqual(len(response.data['weeks']), 8)
+        self.assertEqual(response.data['totals']['legs']['sets'], 4)
+
+    def test_invalid_weeks(self):
+        for weeks in ('0', '53', 'abc', '-1'):
+            response = self.client.get(f'/api/v1/analytics/muscle-volume/?weeks={weeks}')
+            self.assertEqual(response.status_code, 400, weeks)
+
+
+class WorkoutSessionSyncTests(TestCase):
+    """ POST /sessions/sync/ lưu nhiều session offline trong 1 request """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='offline', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _session(self, day, calories=100, logs=2):
+        return {
+            'start_time': f'2025-10-{day:02d}T13:00:00Z',
+            'end_time': f'2025-10-{day:02d}T13:45:00Z',
+            'total_calories': calories,
+            'logs': [
+                {'exercise_name': f'Ex {i}', 'sets_completed': 3, 'reps_completed': '10, 10, 10'}
+                for i in range(logs)
+            ],
+        }
+
+    def test_sync_stores_all_sessions(self):
+        response = self.client.post('/api/v1/sessions/sync/', [self._session(d) for d in (1, 2, 3)], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(ExerciseLog.objects.filter(session__user=self.user).count(), 6)
+        self.assertEqual(UserStats.objects.get(pk=self.user.pk).total_calories, 300)
+
+    def test_sync_is_all_or_nothing(self):
+        broken = self._session(2)
+        del broken['end_time']
+        response = self.client.post('/api/v1/sessions/sync/', [self._session(1), broken], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WorkoutSession.objects.filter(user=self.user).exists())
+
+
+class WorkoutPlanUpdateTests(TestCase):
+    """ PUT /plans/<id>/ chỉ ghi phần thay đổi của plan_exercises """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='editor', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ex1, self.ex2, self.ex3 = Exercise.objects.order_by('id')[:3]
+        self.plan = WorkoutPlan.objects.create(user=self.user, name='Plan')
+        self.row1 = PlanExercise.objects.create(plan=self.plan, exercise=self.ex1, sets=3, reps='8-12', day_number=1)
+        self.row2 = PlanExercise.objects.create(plan=self.plan, exercise=self.ex2, sets=3, reps='8-12', day_number=1)
+
+    def _put(self, plan_exercises):
+        return self.client.put(f'/api/v1/plans/{self.plan.id}/', {
+            'name': 'Plan', 'plan_exercises': plan_exercises,
+        }, format='json')
+
+    def test_update_keeps_ids_and_applies_diff(self):
+        response = self._put([
+            {'exercise_id': self.ex1.id, 'sets': 3, 'reps': '8-12', 'day_number': 1},
+            {'exercise_id': self.ex2.id, 'sets': 4, 'reps': '6-8', 'day_number': 1},
+            {'exercise_id': self.ex3.id, 'sets': 3, 'reps': '10', 'day_number': 2},
+        ])
+        self.assertEqual(response.status_code, 200)
+        rows = {row['exercise_id']: row for row in response.data['plan_exercises']}
+        self.assertEqual(rows[self.ex1.id]['id'], self.row1.id)
+        self.assertEqual(rows[self.ex2.id]['id'], self.row2.id)
+        self.assertEqual((rows[self.ex2.id]['sets'], rows[self.ex2.id]['reps']), (4, '6-8'))
+        self.assertEqual(rows[self.ex3.id]['exercise_name'], self.ex3.name)
+
+        self._put([{'exercise_id': self.ex2.id, 'sets': 4, 'reps': '6-8', 'day_number': 1}])
+        self.assertEqual(list(self.plan.plan_exercises.values_list('id', flat=True)), [self.row2.id])
+
+    def test_duplicate_exercise_on_same_day_is_rejected(self):
+        row = {'exercise_id': self.ex1.id, 'sets': 3, 'reps': '8-12', 'day_number': 1}
+        response = self._put([row, row])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.plan.plan_exercises.count(), 2)
+
+    def test_unknown_exercise_is_rejected(self):
+        response = self._put([{'exercise_id': 999999, 'sets': 3, 'reps': '8-12', 'day_number': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('exercise_id', response.data['plan_exercises'][0])
+
+    def test_partial_patch_keeps_stored_sets_and_reps(self):
+        response = self.client.patch(f'/api/v1/plans/{self.plan.id}/', {'plan_exercises': [
+            {'exercise_id': self.ex1.id, 'reps': '5'},
+            {'exercise_id': self.ex2.id, 'sets': 5},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(self.plan.plan_exercises.order_by('id').values_list('id', 'sets', 'reps')),
+            [(self.row1.id, 3, '5'), (self.row2.id, 5, '8-12')],
+        )
+
+    def test_partial_patch_of_new_row_requires_sets_and_reps(self):
+        for row in ({'exercise_id': self.ex3.id, 'reps': '5'}, {'exercise_id': self.ex3.id, 'sets': 3}, {'sets': 3}):
+            with self.subTest(row=row):
+                response = self.client.patch(
+                    f'/api/v1/plans/{self.plan.id}/', {'plan_exercises': [row]}, format='json',
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('plan_exercises', response.data)
+        self.assertEqual(self.plan.plan_exercises.count(), 2)
+
+
+class ExerciseListCacheTests(TestCase):
+    """ GET /exercises/ được cache theo bộ lọc, tự làm mới khi Exercise đổi """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='browser', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_skips_database(self):
+        url = '/api/v1/exercises/?equipment=full_gym&muscle_group=legs'
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/v1/exercises/?muscle_group=legs&equipment=full_gym')
+        self.assertEqual(first.data, second.data)
+
+    def test_create_invalidates_cache(self):
+        before = len(self.client.get('/api/v1/exercises/?muscle_group=core').data)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/v1/exercises/', {
+                'name': 'Dead Bug', 'description': 'Nằm ngửa, duỗi tay chân đối bên.',
+                'muscle_group': 'core', 'equipment': 'bodyweight',
+            }, format='json')
+        after = self.client.get('/api/v1/exercises/?muscle_group=core').data
+        self.assertEqual(len(after), before + 1)
+
+
+class ExerciseConditionalGetTests(TestCase):
+    """ ETag + If-None-Match cho thư viện bài tập """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='mobile', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exercise = Exercise.objects.order_by('id').first()
+
+    def test_unchanged_resources_return_304(self):
+        for url in ('/api/v1/exercises/?muscle_group=legs',
+                    f'/api/v1/exercises/{self.exercise.id}/',
+                    f'/api/v1/exercises/{self.exercise.id}/guide/'):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_after_exercise_write(self):
+        url = f'/api/v1/exercises/{self.exercise.id}/guide/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exercise.description = 'Mô tả mới'
+            self.exercise.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['description'], 'Mô tả mới')
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ExerciseSearchTests(TestCase):
+    """ GET /exercises/?q= : tìm kiếm không dấu, có xếp hạng """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='searcher', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fold_removes_vietnamese_diacritics(self):
+        self.assertEqual(fold('Gập Hông Đứng'), 'gap hong dung')
+
+    def test_search_matches_without_accents(self):
+        names = [e['name'] for e in self.client.get('/api/v1/exercises/', {'q': 'gap hong'}).data]
+        self.assertIn('Dumbbell Romanian Deadlift (RDL)', names)
+
+    def test_name_matches_rank_first_and_filters_apply(self):
+        results = self.client.get('/api/v1/exercises/', {'q': 'squ'}).data
+        self.assertTrue(results)
+        self.assertTrue(all('squat' in fold(e['name'] + ' ' + e['description']) for e in results))
+        self.assertIn('Squat', results[0]['name'])
+
+        results = self.client.get('/api/v1/exercises/', {'q': 'squat', 'equipment': 'bodyweight'}).data
+        self.assertEqual({e['equipment'] for e in results}, {'bodyweight'})
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """ Token/User được cache, và bị xóa ngay khi logout/đổi mật khẩu """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='OldPassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_requests_skip_auth_queries(self):
+        self.client.get('/api/v1/profile/')
+        # Chỉ còn query đọc Profile
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/profile/')
+        self.assertEqual(response.data['username'], 'cached')
+
+    def test_cache_holds_no_password_or_personal_data(self):
+        self.user.email = 'cached@example.com'
+        self.user.save()
+        self.client.get('/api/v1/profile/')
+        cached = cache.get(token_cache_key(self.token.key))
+        self.assertEqual(cached['id'], self.user.id)
+        self.assertNotIn('password', cached)
+        self.assertNotIn('email', cached)
+        self.assertNotIn(self.user.password, repr(cached))
+        self.assertNotIn('profile', repr(cached))
+
+    def test_cached_user_loads_other_fields_on_demand(self):
+        self.client.get('/api/v1/profile/')
+        user, token = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual((user.pk, token.key), (self.user.pk, self.token.key))
+        self.assertEqual(user.get_deferred_fields(), {
+            f.attname for f in User._meta.concrete_fields
+        } - set(AUTH_USER_FIELDS))
+        self.assertTrue(user.check_password('OldPassword123'))
+
+    def test_profile_update_is_visible_immediately(self):
+        self.client.get('/api/v1/profile/')
+        self.client.patch('/api/v1/profile/', {'weight_kg': 70}, format='json')
+        self.assertEqual(self.client.get('/api/v1/profile/').data['weight_kg'], 70)
+
+    def test_logout_invalidates_token(self):
+        self.client.get('/api/v1/profile/')
+        self.assertEqual(self.client.post('/api/v1/auth/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/profile/').status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/api/v1/profile/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/v1/profile/').status_code, 401)
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsEndpointTests(TestCase):
+    """ /metrics xuất số liệu theo route, định dạng Prometheus """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='observed', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_metrics_require_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+    def test_metrics_record_route_latency_and_queries(self):
+        self.client.get('/api/v1/dashboard/')
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('fitform_http_requests_total{route="dashboard",method="GET",status="200"}', body)
+        self.assertIn('fitform_http_request_duration_seconds_bucket{route="dashboard",method="GET",le="+Inf"}', body)
+        self.assertIn('fitform_http_db_queries_count{route="dashboard",method="GET"}', body)
+
+    def test_unknown_methods_share_one_label(self):
+        labels = ('exercise-list', 'other', '401')
+        before = REQUESTS._values.get(labels, 0)
+        for method in ('BOGUS1', 'BOGUS2', 'XYZ'):
+            APIClient().generic(method, '/api/v1/exercises/')
+        self.assertEqual(REQUESTS._values.get(labels, 0), before + 3)
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').content.decode()
+        self.assertIn('method="other"', body)
+        self.assertNotIn('BOGUS', body)
+        self.assertNotIn('method="XYZ"', body)
+
+    def _export_queries(self):
+        """ (số request, tổng số câu SQL) đã ghi cho GET /export/ """
+        state = DB_QUERIES._values.get(('export', 'GET'), [0, 0])
+        return state[-1], state[-2]
+
+    def test_streamed_response_recorded_when_body_finishes(self):
+        HydrationLog.objects.create(user=self.user, water_ml=250)
+        requests, queries = self._export_queries()
+        response = self.client.get('/api/v1/export/')
+        # Body (các câu SQL đọc dữ liệu) chưa chạy => chưa ghi gì
+        self.assertEqual(self._export_queries(), (requests, queries))
+        self.assertNotIn('Server-Timing', response)
+
+        body = b''.join(response.streaming_content)
+        response.close()
+        self.assertEqual(self._export_queries()[0], requests + 1)
+        # Mỗi bảng được xuất là 1 câu SELECT, chạy trong lúc stream
+        self.assertGreaterEqual(self._export_queries()[1] - queries, len(EXPORT_DATASETS))
+        self.assertIn(b'"water_ml": 250', body)
+
+    async def test_streamed_response_recorded_over_asgi(self):
+        token = await Token.objects.acreate(user=self.user)
+        requests, queries = self._export_queries()
+        response = await AsyncClient().get('/api/v1/export/', headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(self._export_queries(), (requests, queries))
+        [chunk async for chunk in response.streaming_content]
+        self.assertEqual(self._export_queries()[0], requests + 1)
+        self.assertGreaterEqual(self._export_queries()[1] - queries, len(EXPORT_DATASETS))
+
+
+class PoolStatsCollectorTests(TestCase):
+    """ Thống kê connection pool xuất ra /metrics (pool chỉ có trên Postgres) """
+
+    class FakePool:
+        def get_stats(self):
+            return {
+                'pool_min': 2, 'pool_max': 10, 'pool_size': 6, 'pool_available': 2,
+                'requests_waiting': 3, 'requests_num': 120, 'requests_wait_ms': 1500, 'requests_errors': 4,
+            }
+
+    def test_pool_stats_are_exported(self):
+        body = '\n'.join(PoolStatsCollector(lambda: [('default', self.FakePool())]).collect())
+        self.assertIn('# TYPE fitform_db_pool_in_use_connections gauge', body)
+        self.assertIn('fitform_db_pool_in_use_connections{alias="default"} 4', body)
+        self.assertIn('fitform_db_pool_idle_connections{alias="default"} 2', body)
+        self.assertIn('fitform_db_pool_waiting_requests{alias="default"} 3', body)
+        self.assertIn('fitform_db_pool_wait_seconds_total{alias="default"} 1.5', body)
+        self.assertIn('fitform_db_pool_timeouts_total{alias="default"} 4', body)
+        self.assertIn('fitform_db_pool_connections_lost_total{alias="default"} 0', body)
+
+    def test_nothing_exported_without_pool(self):
+        self.assertEqual(list(PoolStatsCollector().collect()), [])
+
+
+@override_settings(DATABASE_ROUTERS=['api.replicas.PrimaryReplicaRouter'], DATABASE_REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    """ GET đọc từ replica; client vừa ghi được ghim vào primary """
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def _read_db(self, method, model=WorkoutSession, **headers):
+        """ CSDL mà router chọn để đọc `model` trong một request """
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(model))
+            return HttpResponse()
+
+        ReplicaPinningMiddleware(view)(getattr(self.factory, method)('/api/v1/sessions/', headers=headers))
+        return seen[0]
+
+    def test_safe_reads_go_to_replica(self):
+        self.assertEqual(self._read_db('get', Authorization='Token a'), 'replica')
+        self.assertEqual(self._read_db('get'), 'replica')
+
+    def test_writer_is_pinned_to_primary(self):
+        self.assertEqual(self._read_db('post', Authorization='Token a'), 'default')
+        self.assertEqual(self._read_db('get', Authorization='Token a'), 'default')
+        # Client khác không bị ảnh hưởng
+        self.assertEqual(self._read_db('get', Authorization='Token b'), 'replica')
+
+    def test_auth_data_and_non_request_reads_use_primary(self):
+        self.assertEqual(self._read_db('get', model=Token, Authorization='Token a'), 'default')
+        self.assertEqual(router.db_for_read(WorkoutSession), 'default')
+        self.assertEqual(router.db_for_write(WorkoutSession), 'default')
+
+    def test_catalog_rebuilt_from_primary_after_bump(self):
+        """
+        Replica còn trễ sau bump_catalog_version: các index theo catalog version
+        được dựng lại trong một GET không ghim, nhưng không được đọc replica
+        (nếu không, dữ liệu cũ bị lưu dưới version mới cho tới lần đổi catalog sau).
+        """
+        exercise = Exercise.objects.create(name='Old Lunge', description='x', muscle_group='legs')
+        get_exercise_ids_by_name()
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise.name = 'Walking Lunge'
+            exercise.save()
+
+        # CSDL test không có alias 'replica': ghi lại model nào bị gửi sang replica rồi đọc 'default'
+        routed_to_replica = []
+        route = PrimaryReplicaRouter.db_for_read
+
+        def spy(router_instance, model, **hints):
+            if route(router_instance, model, **hints) == 'replica':
+                routed_to_replica.append(model)
+            return 'default'
+
+        def view(request):
+            self.assertIn(normalize_exercise_name('Walking Lunge'), get_exercise_ids_by_name())
+            self.assertEqual([hit['name'] for hit in get_search_index().search('walking lunge')[:1]], ['Walking Lunge'])
+            get_suggested_plan('build_muscle', 'beginner', 3, 'full_gym')
+            return HttpResponse()
+
+        with mock.patch.object(PrimaryReplicaRouter, 'db_for_read', spy):
+            ReplicaPinningMiddleware(view)(self.factory.get('/api/v1/exercises/', headers={'Authorization': 'Token a'}))
+
+        self.assertNotIn(Exercise, routed_to_replica)
+        self.assertEqual(self._read_db('get', model=Exercise, Authorization='Token a'), 'default')
+
+    @override_settings(DATABASE_ROUTERS=[])
+    def test_disabled_without_router(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaPinningMiddleware(lambda request: HttpResponse())
+
+
+class AsyncReadPathTests(TestCase):
+    """ profile/dashboard/exercises là view async (adrf), xác thực bằng token thật """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='async_reader', password='x')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_read_endpoints_are_async(self):
+        for url in ('/api/v1/profile/', '/api/v1/dashboard/', '/api/v1/nutrition/suggest/',
+                    '/api/v1/exercises/', '/api/v1/exercises/1/guide/'):
+            with self.subTest(url=url):
+                self.assertTrue(iscoroutinefunction(resolve(url).func))
+
+    def test_authentication_errors_match_drf(self):
+        for credentials in ({}, {'HTTP_AUTHORIZATION': 'Token wrong'}, {'HTTP_AUTHORIZATION': 'Token'}):
+            with self.subTest(credentials=credentials):
+                response = APIClient().get('/api/v1/dashboard/', **credentials)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['WWW-Authenticate'], 'Token')
+                self.assertIn('detail', response.json())
+
+    def test_writes_and_browsable_api(self):
+        response = self.client.patch('/api/v1/profile/', {'weight_kg': 72}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/profile/').data['weight_kg'], 72)
+
+        response = self.client.get('/api/v1/exercises/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/html', response['Content-Type'])
+
+    def test_exercise_list_filters_and_etag(self):
+        response = self.client.get('/api/v1/exercises/', {'muscle_group': 'legs'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['id'] for row in response.data],
+            list(Exercise.objects.filter(muscle_group='legs').values_list('id', flat=True)),
+        )
+        response = self.client.get('/api/v1/exercises/', {'muscle_group': 'legs'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/api/v1/exercises/', {'muscle_group': 'not-a-group'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('muscle_group', response.data)
+
+    def test_missing_exercise_guide_is_404(self):
+        self.assertEqual(self.client.get('/api/v1/exercises/999999/guide/').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/exercises/abc/guide/').status_code, 404)
+
+    async def test_served_over_asgi(self):
+        client = AsyncClient()
+        headers = {'Authorization': f'Token {self.token.key}'}
+        response = await client.get('/api/v1/dashboard/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_workouts'], 0)
+        response = await client.get('/api/v1/profile/', headers=headers)
+        self.assertEqual(response.json()['username'], 'async_reader')
+
+
+class ExportTests(TestCase):
+    """ GET /export/ stream lịch sử của user (NDJSON/CSV, gzip, lọc theo ngày) """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        for days_ago in (40, 2):
+            start = now - timedelta(days=days_ago)
+            session = WorkoutSession.objects.create(
+                user=self.user, start_time=start, end_time=start + timedelta(minutes=30), total_calories=days_ago,
+            )
+            ExerciseLog.objects.create(
+                session=session, exercise_name='Squat', sets_completed=3, reps_completed='10, 10, 8',
+                posture_feedback={'knee_angle': 85},
+            )
+        NutritionLog.objects.create(user=self.user, food_name='Phở, bò', calories=500)
+        HydrationLog.objects.create(user=self.user, water_ml=250)
+        # Dữ liệu của user khác không được xuất
+        other = User.objects.create_user(username='other', password='x')
+        HydrationLog.objects.create(user=other, water_ml=999)
+
+    def _records(self, response):
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    def test_ndjson_contains_every_dataset(self):
+        response = self.client.get('/api/v1/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        self.assertIn('attachment;', response['Content-Disposition'])
+        records = self._records(response)
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['sessions', 'sessions', 'exercise_logs', 'exercise_logs', 'nutrition', 'hydration'],
+        )
+        self.assertEqual(records[2]['posture_feedback'], {'knee_angle': 85})
+        self.assertEqual(records[-1]['water_ml'], 250)
+
+    def test_since_filter_and_gzip(self):
+        since = (timezone.localdate() - timedelta(days=7)).isoformat()
+        response = self.client.get(
+            '/api/v1/export/', {'dataset': ['sessions', 'exercise_logs'], 'since': since},
+            HTTP_ACCEPT_ENCODING='gzip, deflate',
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        records = self._records(response)
+        self.assertEqual([record['type'] for record in records], ['sessions', 'exercise_logs'])
+        self.assertEqual(records[0]['total_calories'], 2)
+
+    def test_gzip_follows_accept_encoding_quality(self):
+        cases = {
+            'gzip;q=0.5, deflate': True,
+            '*': True,
+            'gzip;q=0, deflate': False,
+            'x-gzip': False,
+            '*;q=0': False,
+            '': False,
+        }
+        for accept_encoding, compressed in cases.items():
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.client.get(
+                    '/api/v1/export/', {'dataset': 'hydration'}, HTTP_ACCEPT_ENCODING=accept_encoding,
+                )
+                self.assertEqual(response.get('Content-Encoding') == 'gzip', compressed)
+                # Cache/proxy phải phân biệt bản nén và bản không nén
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(self._records(response)[0]['water_ml'], 250)
+
+    def test_csv_export(self):
+        response = self.client.get('/api/v1/export/', {'format': 'csv', 'dataset': 'nutrition'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], ['id', 'log_date', 'food_name', 'calories', 'protein_g', 'carbs_g', 'fat_g'])
+        self.assertEqual(rows[1][2:4], ['Phở, bò', '500'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/v1/export/', {'format': 'csv'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/export/', {'dataset': 'users'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/export/', {'since': '2025-02-30'}).status_code, 400)
+        self.assertEqual(APIClient().get('/api/v1/export/').status_code, 401)
+
+    async def test_streams_over_asgi(self):
+        token = await Token.objects.acreate(user=self.user)
+        response = await AsyncClient().get(
+            '/api/v1/export/', {'dataset': 'hydration'}, headers={'Authorization': f'Token {token.key}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(json.loads(body)['water_ml'], 250)
+
+
+class BenchCommandTests(TestCase):
+    """ manage.py bench phát lại Postman collection và báo cáo theo endpoint """
+
+    def test_bench_replays_collection_without_errors(self):
+        out = StringIO()
+        call_command(
+            'bench', users=2, sessions=3, iterations=1, warmup=0, concurrency=1,
+            output='/dev/null', stdout=out,
+        )
+        report = out.getvalue()
+        self.assertIn('GET Get Dashboard', report)
+        self.assertIn('POST Save session', report)
+        self.assertIn('0 lỗi', report)
+        self.assertEqual(User.objects.filter(username__startswith='bench_user_').count(), 2)
+
+
+class GenerateFakeDataTests(TestCase):
+    """ manage.py generate_fake_data: đúng số lượng, tất định theo seed """
+
+    def test_generates_requested_volume(self):
+        call_command(
+            'generate_fake_data', users=3, sessions_per_user=4, logs_per_session='2-2',
+            nutrition_per_user=5, hydration_per_user=6, distribution='fixed', stdout=StringIO(),
+        )
+        users = User.objects.filter(username__startswith='fake_user_')
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(users.filter(profile__main_goal__isnull=False).count(), 3)
+        self.assertEqual(WorkoutSession.objects.filter(user__in=users).count(), 12)
+        self.assertEqual(ExerciseLog.objects.filter(session__user__in=users).count(), 24)
+        self.assertEqual(
+            ExerciseSet.objects.filter(log__session__user__in=users).count(),
+            ExerciseLog.objects.filter(session__user__in=users).aggregate(total=Sum('sets_completed'))['total'],
+        )
+        self.assertFalse(ExerciseLog.objects.filter(session__user__in=users, exercise__isnull=True).exists())
+        self.assertTrue(PersonalRecord.objects.filter(user__in=users).exists())
+        self.assertTrue(ExerciseHistory.objects.filter(user__in=users).exists())
+        self.assertEqual(
+            sum(WeeklyMuscleVolume.objects.filter(user__in=users).values_list('set_count', flat=True)),
+            ExerciseSet.objects.filter(log__session__user__in=users, log__exercise__isnull=False).count(),
+        )
+        self.assertEqual(NutritionLog.objects.filter(user__in=users).count(), 15)
+        self.assertEqual(HydrationLog.objects.filter(user__in=users).count(), 18)
+        # Bảng tổng hợp của Dashboard đã được tính lại
+        self.assertEqual(sum(UserStats.objects.filter(user__in=users).values_list('workout_count', flat=True)), 12)
+
+    def test_same_seed_produces_same_data(self):
+        def snapshot():
+            FakeDataGenerator(users=2, sessions_per_user=5, nutrition_per_user=3, hydration_per_user=3,
+                              end_date=timezone.localdate(), seed=42).generate()
+            sessions = list(WorkoutSession.objects.order_by('id').values_list('start_time', 'total_calories'))
+            logs = list(ExerciseLog.objects.order_by('id').values_list('exercise_name', 'reps_completed'))
+            nutrition = list(NutritionLog.objects.order_by('id').values_list('food_name', 'log_date'))
+            delete_fake_data()
+            return sessions, logs, nutrition
+
+        first = snapshot()
+        self.assertTrue(first[0])
+        self.assertEqual(first, snapshot())
+
+
+# -------------------------------------------------------------------
+# NGÂN SÁCH SỐ QUERY CHO MỌI ROUTE TRONG api/urls.py
+# -------------------------------------------------------------------
+
+def api_routes():
+    """ {(url_name, METHOD)} của mọi route đăng ký trong api/urls.py """
+    from . import urls as api_urls
+
+    routes = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+                continue
+            callback = pattern.callback
+            view_class = callback.cls
+            # ViewSet: các method được router ánh xạ tới action; APIView: các handler có sẵn
+            methods = getattr(callback, 'actions', None) or [
+                method for method in view_class.http_method_names if hasattr(view_class, method)
+            ]
+            methods = [
+                method for method in methods
+                if method in view_class.http_method_names and method not in ('head', 'options')
+            ]
+            routes.update((pattern.name, method.upper()) for method in methods)
+
+    walk(api_urls.urlpatterns)
+    return routes
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Mỗi route có một "ngân sách" số câu SQL (QUERY_BUDGETS) và số câu SQL
+    KHÔNG được tăng theo kích thước dữ liệu: mỗi route được gọi với dữ liệu
+    nhỏ và lớn (số plan, bài tập/plan, session, log/session, ... = SIZES),
+    kể cả kích thước body gửi lên (số bài tập của plan, số log của session).
+
+    Số liệu đo với cache rỗng (trừ token đã xác thực), tức là trường hợp xấu
+    nhất của các route có cache (/exercises/, /plans/generate/).
+    Bảng dưới đây cũng là tài liệu về chi phí của từng endpoint.
+    """
+
+    SIZES = (1, 8)
+
+    QUERY_BUDGETS = {
+        ('api-root', 'GET'): 0,
+        # Token lấy từ cache, Profile thì không (cache chỉ giữ các trường để xác thực)
+        ('profile', 'GET'): 1,
+        # SELECT + UPDATE profile
+        ('profile', 'PUT'): 2,
+        ('profile', 'PATCH'): 2,
+        ('dashboard', 'GET'): 3,
+        ('personal-records', 'GET'): 1,
+        # Đọc N dòng WeeklyMuscleVolume, không phụ thuộc số session
+        ('muscle-volume', 'GET'): 1,
+        ('meal-suggestion', 'GET'): 1,
+
+        ('exercise-list', 'GET'): 1,
+        ('exercise-list', 'POST'): 2,
+        ('exercise-detail', 'GET'): 1,
+        ('exercise-detail', 'PUT'): 3,
+        ('exercise-detail', 'PATCH'): 2,
+        # + gỡ exercise khỏi các ExerciseLog (SET_NULL) + xóa PersonalRecord, ExerciseHistory của bài tập
+        ('exercise-detail', 'DELETE'): 6,
+        ('exercise-guide', 'GET'): 1,
+
+        ('plan-list', 'GET'): 2,
+        # Validate ID bài tập bằng catalog trong bộ nhớ, INSERT plan + 1 bulk INSERT, nạp lại 2 query
+        ('plan-list', 'POST'): 5,
+        ('plan-detail', 'GET'): 2,
+        ('plan-detail', 'PUT'): 8,
+        ('plan-detail', 'PATCH'): 5,
+        ('plan-detail', 'DELETE'): 5,
+        ('plan-generate', 'GET'): 2,
+        # plan + plan_exercises (prefetch) + ExerciseHistory của các bài tập trong plan
+        ('plan-next-session', 'GET'): 3,
+
+        ('session-list', 'GET'): 1,
+        # bulk INSERT logs + bulk INSERT sets; response nạp logs + sets;
+        # gắn exercise theo tên bằng catalog trong bộ nhớ (nạp 1 lần sau cache.clear());
+        # kỷ lục cá nhân: SELECT + INSERT kỷ lục mới + UPDATE kỷ lục bị phá; ExerciseHistory: tương tự;
+        # WeeklyMuscleVolume: GROUP BY sets theo nhóm cơ + SELECT dòng của tuần + INSERT/UPDATE
+        ('session-list', 'POST'): 20,
+        ('session-detail', 'GET'): 3,
+        # Trừ bản cũ + cộng bản mới vào UserStats/DailyActivity;
+        # thay logs = SELECT logs + DELETE sets + DELETE logs, rồi bulk INSERT logs + sets;
+        # tính lại kỷ lục đạt trong bản cũ (SELECT sets + DELETE + INSERT) rồi so với logs mới;
+        # tính lại ExerciseHistory có chứa bản cũ (SELECT N log mới nhất + sets + DELETE + INSERT) rồi gộp logs mới;
+        # trừ bản cũ (+ xóa dòng về 0) rồi cộng bản mới vào WeeklyMuscleVolume
+        ('session-detail', 'PUT'): 42,
+        # Không đổi logs/start_time => không đụng tới WeeklyMuscleVolume
+        ('session-detail', 'PATCH'): 15,
+        # Xóa dây chuyền session -> logs -> sets; tính lại kỷ lục và ExerciseHistory có chứa session này;
+        # trừ session khỏi WeeklyMuscleVolume
+        ('session-detail', 'DELETE'): 24,
+        # Body cố định 2 session (mỗi session thêm 1 INSERT + cập nhật bảng tổng hợp)
+        ('session-sync', 'POST'): 27,
+
+        ('nutrition-log-list', 'GET'): 1,
+        ('nutrition-log-list', 'POST'): 1,
+        ('nutrition-log-detail', 'GET'): 1,
+        ('nutrition-log-detail', 'PUT'): 2,
+        ('nutrition-log-detail', 'PATCH'): 2,
+        ('nutrition-log-detail', 'DELETE'): 2,
+        ('hydration-log-list', 'GET'): 1,
+        ('hydration-log-list', 'POST'): 1,
+        ('hydration-log-detail', 'GET'): 1,
+        ('hydration-log-detail', 'DELETE'): 2,
+        # Mỗi bảng 1 câu SELECT (đọc bằng cursor khi stream)
+        ('export', 'GET'): 5,
+    }
+
+    def setUp(self):
+        self.catalog = list(Exercise.objects.order_by('id'))
+
+    def _seed(self, size):
+        """ Tạo 1 user với `size` bản ghi ở mỗi bảng (và `size` con mỗi bản ghi) """
+        user = User.objects.create_user(username=f'budget{size}', password='x')
+        user.profile.height_cm = 175
+        user.profile.weight_kg = 70
+        user.profile.age = 30
+        user.profile.gender = 'male'
+        user.profile.activity_level = 'moderate'
+        user.profile.main_goal = 'build_muscle'
+        user.profile.experience_level = 'beginner'
+        user.profile.days_per_week = 3
+        user.profile.equipment_available = 'full_gym'
+        user.profile.save()
+
+        for i in range(size):
+            Exercise.objects.create(
+                name=f'Custom {size}-{i}', description='x', muscle_group='legs', created_by=user,
+            )
+            plan = WorkoutPlan.objects.create(user=user, name=f'Plan {i}')
+            PlanExercise.objects.bulk_create([
+                PlanExercise(plan=plan, exercise=exercise, sets=3, reps='8-12')
+                for exercise in self.catalog[:size]
+            ])
+            start = timezone.now() - timedelta(days=i, hours=1)
+            session = WorkoutSession.objects.create(
+                user=user, plan=plan, start_time=start, end_time=start + timedelta(minutes=45),
+                total_calories=300, posture_score_avg=80,
+            )
+            # Session đầu tiên (i=0) giữ kỷ lục => sửa/xóa nó phải tính lại kỷ lục
+            self._add_logs(session, f'{20 - i}, 10, 8', size)
+            NutritionLog.objects.create(user=user, food_name='Phở', calories=500)
+            HydrationLog.objects.create(user=user, water_ml=250)
+
+        # Buổi tập cũ hơn cùng các bài tập: xóa session giữ kỷ lục thì vẫn còn kỷ lục để tính lại
+        start = timezone.now() - timedelta(days=size, hours=1)
+        older = WorkoutSession.objects.create(
+            user=user, start_time=start, end_time=start + timedelta(minutes=45), total_calories=300,
+        )
+        self._add_logs(older, '5, 5, 5', size)
+
+        rebuild_personal_records([user.pk])
+        rebuild_exercise_history([user.pk])
+        return user
+
+    def _add_logs(self, session, reps_completed, size):
+        logs = ExerciseLog.objects.bulk_create([
+            ExerciseLog(session=session, exercise=exercise, muscle_group=exercise.muscle_group,
+                        exercise_name=exercise.name, sets_completed=3, reps_completed=reps_completed)
+            for exercise in self.catalog[:size]
+        ])
+        ExerciseSet.objects.bulk_create([
+            ExerciseSet(log=log, set_number=number, reps=reps, duration_seconds=duration, weight_kg=weight)
+            for log in logs
+            for number, reps, duration, weight in parse_sets(log.sets_completed, log.reps_completed, log.weight_kg)
+        ])
+        record_session(session)
+
+    def _requests(self, user, size):
+        """ {(url_name, METHOD): (path, body)} cho dữ liệu của `user` """
+        plan = user.plans.order_by('id').first()
+        session = user.sessions.order_by('id').first()
+        exercise = user.custom_exercises.order_by('id').first()
+        nutrition = user.nutrition_logs.order_by('id').first()
+        hydration = user.hydration_logs.order_by('id').first()
+        now = timezone.now()
+
+        plan_body = {
+            'name': 'Budget plan',
+            'plan_exercises': [
+                {'exercise_id': ex.id, 'sets': 4, 'reps': '6-8', 'day_number': 2}
+                for ex in self.catalog[:size]
+            ],
+        }
+        session_body = {
+            'plan': plan.id,
+            'start_time': (now - timedelta(hours=2)).isoformat(),
+            'end_time': (now - timedelta(hours=1)).isoformat(),
+            'total_calories': 400,
+            'posture_score_avg': 85,
+            # Phá kỷ lục tạ của các bài tập đã có kỷ lục (UPDATE) + 1 bài tập chưa có kỷ lục (INSERT)
+            'logs': [
+                {'exercise_name': ex.name, 'sets_completed': 3, 'reps_completed': '8, 8, 8', 'weight_kg': '60'}
+                for ex in self.catalog[:size + 1]
+            ],
+        }
+        exercise_body = {'name': f'New {size}', 'description': 'x', 'muscle_group': 'core'}
+        nutrition_body = {'food_name': 'Cơm gà', 'calories': 600}
+
+        return {
+            ('api-root', 'GET'): ('/api/v1/', None),
+            ('profile', 'GET'): ('/api/v1/profile/', None),
+            ('profile', 'PUT'): ('/api/v1/profile/', {'weight_kg': 70, 'height_cm': 175}),
+            ('profile', 'PATCH'): ('/api/v1/profile/', {'weight_kg': 71}),
+            ('dashboard', 'GET'): ('/api/v1/dashboard/', None),
+            ('personal-records', 'GET'): ('/api/v1/records/', None),
+            ('muscle-volume', 'GET'): ('/api/v1/analytics/muscle-volume/?weeks=12', None),
+            ('meal-suggestion', 'GET'): ('/api/v1/nutrition/suggest/', None),
+
+            ('exercise-list', 'GET'): ('/api/v1/exercises/?muscle_group=legs', None),
+            ('exercise-list', 'POST'): ('/api/v1/exercises/', exercise_body),
+            ('exercise-detail', 'GET'): (f'/api/v1/exercises/{exercise.id}/', None),
+            ('exercise-detail', 'PUT'): (f'/api/v1/exercises/{exercise.id}/', exercise_body),
+            ('exercise-detail', 'PATCH'): (f'/api/v1/exercises/{exercise.id}/', {'difficulty': 'advanced'}),
+            ('exercise-detail', 'DELETE'): (f'/api/v1/exercises/{self.catalog[0].id}/', None),
+            ('exercise-guide', 'GET'): (f'/api/v1/exercises/{exercise.id}/guide/', None),
+
+            ('plan-list', 'GET'): ('/api/v1/plans/', None),
+            ('plan-list', 'POST'): ('/api/v1/plans/', plan_body),
+            ('plan-detail', 'GET'): (f'/api/v1/plans/{plan.id}/', None),
+            ('plan-detail', 'PUT'): (f'/api/v1/plans/{plan.id}/', plan_body),
+            ('plan-detail', 'PATCH'): (f'/api/v1/plans/{plan.id}/', {'name': 'Renamed'}),
+            ('plan-detail', 'DELETE'): (f'/api/v1/plans/{plan.id}/', None),
+            ('plan-generate', 'GET'): ('/api/v1/plans/generate/', None),
+            ('plan-next-session', 'GET'): (f'/api/v1/plans/{plan.id}/next-session/', None),
+
+            ('session-list', 'GET'): ('/api/v1/sessions/', None),
+            ('session-list', 'POST'): ('/api/v1/sessions/', session_body),
+            ('session-detail', 'GET'): (f'/api/v1/sessions/{session.id}/', None),
+            ('session-detail', 'PUT'): (f'/api/v1/sessions/{session.id}/', session_body),
+            ('session-detail', 'PATCH'): (f'/api/v1/sessions/{session.id}/', {'total_calories': 999}),
+            ('session-detail', 'DELETE'): (f'/api/v1/sessions/{session.id}/', None),
+            ('session-sync', 'POST'): ('/api/v1/sessions/sync/', [session_body, session_body]),
+
+            ('nutrition-log-list', 'GET'): ('/api/v1/nutrition-logs/', None),
+            ('nutrition-log-list', 'POST'): ('/api/v1/nutrition-logs/', nutrition_body),
+            ('nutrition-log-detail', 'GET'): (f'/api/v1/nutrition-logs/{nutrition.id}/', None),
+            ('nutrition-log-detail', 'PUT'): (f'/api/v1/nutrition-logs/{nutrition.id}/', nutrition_body),
+            ('nutrition-log-detail', 'PATCH'): (f'/api/v1/nutrition-logs/{nutrition.id}/', {'calories': 1}),
+            ('nutrition-log-detail', 'DELETE'): (f'/api/v1/nutrition-logs/{nutrition.id}/', None),
+            ('hydration-log-list', 'GET'): ('/api/v1/hydration-logs/', None),
+            ('hydration-log-list', 'POST'): ('/api/v1/hydration-logs/', {'water_ml': 300}),
+            ('hydration-log-detail', 'GET'): (f'/api/v1/hydration-logs/{hydration.id}/', None),
+            ('hydration-log-detail', 'DELETE'): (f'/api/v1/hydration-logs/{hydration.id}/', None),
+            ('export', 'GET'): ('/api/v1/export/', None),
+        }
+
+    def _measure(self, client, method, path, body):
+        """ Số câu SQL của 1 request; mọi thay đổi được rollback sau khi đo """
+        cache.clear()
+        client.get('/api/v1/profile/')  # nạp token vào cache (không tính)
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method.lower())(path, body, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, f"{method} {path}: {response.status_code} {getattr(response, 'data', '')}")
+        # Không tính SAVEPOINT của transaction.atomic() lồng trong transaction của test
+        return sum(1 for query in queries if 'SAVEPOINT' not in query['sql'])
+
+    def test_every_route_has_a_budget(self):
+        self.assertEqual(api_routes(), set(self.QUERY_BUDGETS))
+
+    def test_query_count_within_budget_and_independent_of_data_size(self):
+        counts = {}
+        for size in self.SIZES:
+            user = self._seed(size)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+            for route, (path, body) in self._requests(user, size).items():
+                counts.setdefault(route, []).append(self._measure(client, route[1], path, body))
+
+        for route, per_size in sorted(counts.items()):
+            with self.subTest(route=route, queries=per_size):
+                self.assertEqual(len(set(per_size)), 1, f"{route}: số query tăng theo dữ liệu {per_size}")
+                self.assertLessEqual(per_size[-1], self.QUERY_BUDGETS[route])
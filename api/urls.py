@@ -16,6 +16,8 @@ router.register(r'nutrition-logs', views.NutritionLogViewSet, basename='nutritio
 router.register(r'hydration-logs', views.HydrationLogViewSet, basename='hydration-log')
 
 # urlpatterns là danh sách URL cuối cùng
+# Các endpoint đọc nhiều nhất (profile, dashboard, gợi ý bữa ăn, thư viện bài
+# tập) là view async của adrf: GET chạy trên ORM/cache async dưới ASGI.
 urlpatterns = [
     # Các URL do Router tự động tạo ra
     path('', include(router.urls)),
@@ -26,5 +28,13 @@ urlpatterns = [
 
     # URL cho Dashboard (UC12)
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
-    path('nutrition/suggest/', views.MealSuggestionView.as_view(), name='meal-suggestion')
-]
\ No newline at end of file
+    path('nutrition/suggest/', views.MealSuggestionView.as_view(), name='meal-suggestion'),
+
+    # Kỷ lục cá nhân (PR) theo từng bài tập
+    path('records/', views.PersonalRecordListView.as_view(), name='personal-records'),
+    # Khối lượng tập theo tuần và nhóm cơ (biểu đồ)
+    path('analytics/muscle-volume/', views.MuscleVolumeView.as_view(), name='muscle-volume'),
+
+    # Xuất toàn bộ lịch sử (NDJSON/CSV, stream)
+    path('export/', views.ExportView.as_view(), name='export'),
+]
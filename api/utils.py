@@ -1,4 +1,14 @@
 # api/utils.py (File mới)
+import re
+
+# Giới hạn số set tách ra từ một log (chặn sets_completed bất thường)
+MAX_SETS_PER_LOG = 50
+
+_SET_SEPARATOR = re.compile(r'[,;/]')
+_REPS = re.compile(r'^(\d+)\s*(s|sec|giây)?\b', re.IGNORECASE)
+_WEIGHT = re.compile(r'^(\d+(?:\.\d+)?)')
+
+
 def calculate_tdee(profile):
     """
     Tính TDEE (calo duy trì) dùng công thức Harris-Benedict (đơn giản).
@@ -23,4 +33,56 @@ def calculate_tdee(profile):
     multiplier = activity_multipliers.get(profile.activity_level, 1.2)
     tdee = bmr * multiplier
 
-    return int(tdee)
\ No newline at end of file
+    return int(tdee)
+
+
+def _split_values(text):
+    return [value.strip() for value in _SET_SEPARATOR.split(str(text or '')) if value.strip()]
+
+
+def parse_reps(value):
+    """ "12" -> (12, None); "30s" -> (None, 30); không đọc được -> (None, None) """
+    match = _REPS.match(value)
+    if not match:
+        return None, None
+    number = int(match.group(1))
+    return (None, number) if match.group(2) else (number, None)
+
+
+def parse_weight(value):
+    """ "60" / "62.5kg" -> 60.0 / 62.5; không đọc được -> None """
+    match = _WEIGHT.match(value)
+    return float(match.group(1)) if match else None
+
+
+def parse_sets(sets_completed, reps_completed, weight_kg):
+    """
+    Tách chuỗi của ExerciseLog thành từng set:
+    (3, "12, 10, 8", "60, 60, 70") -> [(1, 12, None, 60.0), (2, 10, None, 60.0), (3, 8, None, 70.0)]
+    Mỗi phần tử: (set_number, reps, duration_seconds, weight_kg).
+    Chỉ có 1 giá trị (vd. reps "10" với 3 set) => dùng cho mọi set.
+    """
+    reps = _split_values(reps_completed)
+    weights = _split_values(weight_kg)
+    count = max(len(reps), len(weights), sets_completed or 0)
+    count = min(count, MAX_SETS_PER_LOG)
+
+    def value_at(values, index):
+        if not values:
+            return None
+        if len(values) == 1:
+            return values[0]
+        return values[index] if index < len(values) else None
+
+    sets = []
+    for index in range(count):
+        rep_value = value_at(reps, index)
+        weight_value = value_at(weights, index)
+        set_reps, duration = parse_reps(rep_value) if rep_value else (None, None)
+        sets.append((index + 1, set_reps, duration, parse_weight(weight_value) if weight_value else None))
+    return sets
+
+
+def normalize_exercise_name(name):
+    """ Khóa so khớp tên bài tập: bỏ khoảng trắng thừa, không phân biệt hoa/thường """
+    return ' '.join(str(name or '').split()).casefold()
@@ -1,28 +1,76 @@
 from django.shortcuts import render
 
 # api/views.py
+from adrf import generics as async_generics, mixins as async_mixins
+from adrf.viewsets import GenericViewSet as AsyncGenericViewSet
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
-from rest_framework import viewsets, permissions, generics
+from rest_framework import viewsets, permissions, generics, mixins
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Avg
+import copy
+import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_date
+from django.db.models import Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django_filters import rest_framework as filters
-from .models import Profile, Exercise, WorkoutPlan, WorkoutSession, NutritionLog, HydrationLog
+from .models import Profile, Exercise, WorkoutPlan, WorkoutSession, ExerciseLog, NutritionLog, HydrationLog, UserStats, PersonalRecord, WeeklyMuscleVolume
 from .serializers import (
     ProfileSerializer, 
     ExerciseSerializer, 
     WorkoutPlanSerializer, 
     WorkoutSessionSerializer,
+    WorkoutSessionSummarySerializer,
+    PersonalRecordSerializer,
     NutritionLogSerializer,
     HydrationLogSerializer,
     ExcersiseGuideSerializer
 )
+from .catalog import (
+    aget_catalog_version,
+    get_suggested_plan,
+    exercise_list_cache_key,
+    exercise_filter_signature,
+    exercise_etag,
+    EXERCISE_FILTER_FIELDS,
+    EXERCISE_LIST_CACHE_TIMEOUT,
+)
+from .export import EXPORT_DATASETS, NDJSONRenderer, CSVRenderer, csv_lines, ndjson_lines, export_stream, accepts_gzip
+from .search import search_exercises
+from .progression import next_session
+from .pagination import WorkoutSessionPagination, NutritionLogPagination, HydrationLogPagination
+from .stats import apply_session, remove_session, aget_streak_and_adherence, week_start
 from .utils import calculate_tdee
 
+
+def mark_revalidate(response, etag):
+    """ Gắn ETag cho response 200 """
+    if response.status_code == 200:
+        response['ETag'] = etag
+        # Cho phép client lưu lại nhưng phải hỏi lại server trước khi dùng
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+async def aget_profile(user):
+    """ Profile của user cho các view async (1 query nếu chưa được nạp) """
+    if type(user).profile.related.is_cached(user):
+        return user.profile
+    return await Profile.objects.select_related('user').aget(user=user)
+
+
 # --- NHÓM 1: USER & PROFILE (UC03, UC04) ---
 # Dùng `RetrieveUpdateAPIView` vì mỗi user chỉ có 1 profile
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(async_generics.RetrieveUpdateAPIView):
     """
     API endpoint cho phép xem (GET) và cập nhật (PUT/PATCH) 
     profile của user đang đăng nhập.
@@ -30,16 +78,24 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = ProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_object(self):
+    async def aget_object(self):
         # Trả về đối tượng profile của user đang gọi API
-        return self.request.user.profile
+        return await aget_profile(self.request.user)
+
+    async def perform_aupdate(self, serializer):
+        # ProfileSerializer là serializer DRF thường (không có asave)
+        await sync_to_async(serializer.save)()
 
 # --- NHÓM 5: EXERCISE LIBRARY (NÂNG CẤP) ---
-class ExerciseViewSet(viewsets.ModelViewSet): # <-- 1. ĐỔI THÀNH ModelViewSet
+class ExerciseViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.DestroyModelMixin,
+                      async_mixins.ListModelMixin, async_mixins.RetrieveModelMixin,
+                      AsyncGenericViewSet): # <-- 1. ĐỔI THÀNH ModelViewSet
     """
     API endpoint cho phép:
     - UC15 (GET): Xem, Lọc, Tìm kiếm Bài tập
     - UC17 (POST): Tạo Bài tập tùy chỉnh
+    Các action đọc (list/retrieve/guide) là async (chạy ORM/cache async dưới
+    ASGI); các action ghi vẫn là action DRF thường, adrf chạy chúng trong thread.
     """
     queryset = Exercise.objects.all()
     serializer_class = ExerciseSerializer
@@ -47,27 +103,79 @@ class ExerciseViewSet(viewsets.ModelViewSet): # <-- 1. ĐỔI THÀNH ModelViewSe
     
     # 2. Thêm các trường Lọc/Tìm kiếm (UC15)
     filter_backends = [filters.DjangoFilterBackend]
-    filterset_fields = [
-        'muscle_group', 
-        'equipment', 
-        'difficulty', 
-        'movement_pattern'
-    ]
-    # (Bạn cũng có thể thêm 'search_fields' nếu muốn tìm kiếm text)
-    # search_fields = ['name', 'description'] 
+    filterset_fields = list(EXERCISE_FILTER_FIELDS)
+    # Tìm kiếm text dùng `?q=` (chỉ mục trong bộ nhớ, xem api/search.py)
+    # thay vì `search_fields` (icontains => quét toàn bảng)
+
+    async def _conditional_response(self, request, etag, build_response):
+        """
+        Hỗ trợ GET có điều kiện: nếu client gửi `If-None-Match` trùng ETag
+        hiện tại thì trả 304 (không body), không cần chạm tới CSDL.
+        """
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        return mark_revalidate(await build_response(), etag)
+
+    async def list(self, request, *args, **kwargs):
+        """
+        Thư viện bài tập gần như không đổi, nên response được cache theo
+        bộ lọc. Cache tự mất hiệu lực khi có thay đổi trên bảng Exercise
+        (tạo/sửa/xóa qua API hay Django Admin), xem api/catalog.py.
+        """
+        params = request.query_params
+        version = await aget_catalog_version()
+        if params.get('q'):
+            # Tìm kiếm: ?q=gap hong&muscle_group=legs&limit=20
+            etag = exercise_etag(
+                'search', exercise_filter_signature(params), params['q'], params.get('limit'), version=version
+            )
+
+            async def build_search_response():
+                # Chỉ mục nằm sẵn trong bộ nhớ; chỉ dựng lại (đọc CSDL) khi catalog đổi
+                return Response(await sync_to_async(search_exercises)(params))
+
+            return await self._conditional_response(request, etag, build_search_response)
+
+        etag = exercise_etag('list', exercise_filter_signature(params), version=version)
+        return await self._conditional_response(
+            request, etag, lambda: self._cached_list(request, version, *args, **kwargs)
+        )
+
+    async def _cached_list(self, request, version, *args, **kwargs):
+        cache_key = exercise_list_cache_key(request.query_params, version=version)
+        data = await cache.aget(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = await self.alist(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(cache_key, list(response.data), EXERCISE_LIST_CACHE_TIMEOUT)
+        return response
+
+    async def retrieve(self, request, *args, **kwargs):
+        etag = exercise_etag('detail', kwargs['pk'], version=await aget_catalog_version())
+        return await self._conditional_response(
+            request, etag, lambda: self.aretrieve(request, *args, **kwargs)
+        )
 
     @action(detail=True, methods=['get'], serializer_class=ExcersiseGuideSerializer)
-    def guide(self, request, pk=None):
+    async def guide(self, request, pk=None):
         """
         API tùy chỉnh (chỉ GET) để trả về
         hướng dẫn (video/description) của MỘT bài tập.
         """
-        # 'pk' (primary key) chính là ID bài tập
-        exercise = self.get_object() 
-        
-        # Dùng serializer_class đã chỉ định ở trên (@action)
-        serializer = self.get_serializer(exercise)
-        return Response(serializer.data)
+        async def build_response():
+            # 'pk' (primary key) chính là ID bài tập
+            exercise = await self.aget_object()
+            
+            # Dùng serializer_class đã chỉ định ở trên (@action)
+            serializer = self.get_serializer(exercise)
+            return Response(serializer.data)
+
+        etag = exercise_etag('guide', pk, version=await aget_catalog_version())
+        return await self._conditional_response(request, etag, build_response)
 
     def perform_create(self, serializer):
         """
@@ -88,8 +196,12 @@ class WorkoutPlanViewSet(viewsets.ModelViewSet):
         """
         Rất quan trọng! Chỉ trả về các plan của user đang đăng nhập.
         Không cho user này xem plan của user khác.
+
+        Nạp trước (prefetch) `plan_exercises` kèm `exercise` bằng JOIN,
+        để list/detail chỉ tốn 2 query dù plan có bao nhiêu bài tập.
         """
-        return WorkoutPlan.objects.filter(user=self.request.user)
+        queryset = WorkoutPlan.objects.filter(user=self.request.user)
+        return WorkoutPlanSerializer.setup_eager_loading(queryset)
 
     def perform_create(self, serializer):
         """
@@ -97,50 +209,6 @@ class WorkoutPlanViewSet(viewsets.ModelViewSet):
         """
         serializer.save(user=self.request.user)
 
-    # Template cho các loại buổi tập
-    SESSION_TEMPLATES = {
-        'Full Body': ['squat', 'hinge', 'horizontal_push', 'horizontal_pull', 'core'],
-        'Upper': ['horizontal_push', 'horizontal_pull', 'vertical_push', 'vertical_pull', 'isolation'],
-        'Lower': ['squat', 'hinge', 'lunge', 'core'],
-        'Push': ['horizontal_push', 'vertical_push', 'isolation'], # Chest, Shoulders, Triceps
-        'Pull': ['horizontal_pull', 'vertical_pull', 'isolation'], # Back, Biceps
-        'Legs': ['squat', 'hinge', 'lunge', 'core'],
-    }
-
-
-    def _get_structure(self, days, experience):
-        """Helper: Quyết định cấu trúc plan (e.g., Full Body, Upper/Lower)"""
-        if days <= 2:
-            return ['Full Body'] * days
-        if days == 3:
-            return ['Full Body'] * 3 # (e.g., Full Body A, B, C)
-        if days == 4:
-            if experience == 'beginner':
-                return ['Full Body', 'Full Body', 'Full Body', 'Full Body']
-            else:
-                return ['Upper', 'Lower', 'Upper', 'Lower']
-        if days >= 5:
-            if experience == 'beginner':
-                return ['Upper', 'Lower', 'Rest', 'Upper', 'Lower'] # 4 ngày
-            else:
-                # PPL (Push, Pull, Legs)
-                return ['Push', 'Pull', 'Legs', 'Push', 'Pull'] # 5 ngày
-        return ['Full Body'] # Default
-
-    def _get_sets_reps(self, goal):
-        """Helper: Quyết định sets/reps dựa trên mục tiêu"""
-        if goal == 'build_muscle':
-            return (4, "8-12") # (sets, reps)
-        elif goal == 'lose_weight':
-            return (3, "12-15")
-        else: # maintain
-            return (3, "10-12")
-    
-    def _select_exercise(self, available_pool, pattern):
-        """Helper: Chọn một bài tập từ pool theo movement_pattern"""
-        exercise = available_pool.filter(movement_pattern=pattern).first()
-        return exercise
-
     # API ENDPOINT
     # ----------------------------------------------------
     
@@ -170,73 +238,81 @@ class WorkoutPlanViewSet(viewsets.ModelViewSet):
                 status=400
             )
 
-        # 2. Lấy Pool bài tập có sẵn
-        # Đây là lý do Nâng cấp 1 (đồng bộ equipment) quan trọng:
-        available_exercise_pool = Exercise.objects.filter(equipment=inputs["equipment"])
-        if not available_exercise_pool.exists():
+        # 2. Lấy kế hoạch đã tính sẵn (xem api/catalog.py)
+        # Kế hoạch chỉ phụ thuộc 4 trường trên, nên được tính trước cho mọi
+        # tổ hợp và tự tính lại khi bảng Exercise thay đổi => không tốn query.
+        suggested_plan_json = get_suggested_plan(
+            inputs["goal"], inputs["experience"], inputs["days"], inputs["equipment"]
+        )
+        if suggested_plan_json is None:
             return Response(
                 {"error": f"Không tìm thấy bài tập nào cho dụng cụ: {inputs['equipment']}"},
                 status=404
             )
 
-        # 3. Chạy logic
-        plan_structure = self._get_structure(inputs["days"], inputs["experience"])
-        sets, reps = self._get_sets_reps(inputs["goal"])
-        
-        final_exercise_list = [] # Đây là list sẽ trả về
-        
-        # 4. Xây dựng JSON
-        for day_index, session_type in enumerate(plan_structure):
-            day_number = day_index + 1 # (e.g., 1, 2, 3)
-            
-            if session_type == 'Rest':
-                continue
-
-            # Lấy template cho buổi tập (e.g., ['squat', 'hinge', 'lunge'])
-            movement_patterns_for_day = self.SESSION_TEMPLATES.get(session_type, [])
-            
-            for pattern in movement_patterns_for_day:
-                # Chọn 1 bài tập
-                exercise = self._select_exercise(available_exercise_pool, pattern)
-                
-                if exercise:
-                    # Tạo JSON cho bài tập này
-                    # Nó phải khớp với PlanExerciseSerializer
-                    exercise_json = {
-                        "exercise_id": exercise.id,
-                        "exercise_name": exercise.name, # Thêm tên cho dễ đọc ở frontend
-                        "sets": sets,
-                        "reps": reps,
-                        "day_number": day_number, # Đây là lý do Nâng cấp 2 quan trọng
-                        "description": exercise.description
-                    }
-                    final_exercise_list.append(exercise_json)
-
-        # 5. Tạo JSON cuối cùng (khớp với WorkoutPlanSerializer)
-        plan_name = f"Gợi ý: {inputs['goal']} - {inputs['days']} ngày"
-        suggested_plan_json = {
-            "name": plan_name,
-            "description": f"Kế hoạch tự động cho {inputs['experience']} - {inputs['days']} ngày/tuần.",
-            "plan_exercises": final_exercise_list
-        }
-
         # Trả về JSON cho Frontend
         return Response(suggested_plan_json)
 
+    # Đây là API: GET /api/v1/plans/<id>/next-session/?day=<day_number>
+    @action(detail=True, methods=['get'], url_path='next-session')
+    def next_session(self, request, pk=None):
+        """
+        Gợi ý tạ/rep cho từng bài tập của plan ở buổi tập kế tiếp, dựa trên
+        các lần tập gần nhất của user (xem api/progression.py).
+        Không gửi ?day= => gợi ý cho mọi ngày của plan.
+        """
+        day = request.query_params.get('day')
+        if day is not None and not day.isdigit():
+            return Response({"error": "day phải là số nguyên dương."}, status=400)
+        plan = self.get_object()
+        day_number = int(day) if day is not None else None
+        return Response({
+            "plan_id": plan.id,
+            "day_number": day_number,
+            "exercises": next_session(plan, request.user, day_number),
+        })
+
 # --- NHÓM 3: WORKOUT SESSION (UC11, UC13) ---
 class WorkoutSessionViewSet(viewsets.ModelViewSet):
     """
     API endpoint cho phép tạo (POST - UC11) và xem (GET - UC13) 
     các buổi tập (WorkoutSession).
+
+    GET /sessions/ trả bản tóm tắt (không có 'logs').
+    GET /sessions/?expand=logs trả đầy đủ 'logs' như trang chi tiết.
     """
     serializer_class = WorkoutSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = WorkoutSessionPagination
+
+    def _wants_summary(self):
+        return self.action == 'list' and self.request.query_params.get('expand') != 'logs'
 
     def get_queryset(self):
         """
         Chỉ trả về các session của user đang đăng nhập.
         """
-        return WorkoutSession.objects.filter(user=self.request.user).order_by('-start_time')
+        queryset = WorkoutSession.objects.filter(user=self.request.user).order_by('-start_time')
+        if self._wants_summary():
+            # Tổng hợp ngay trong SQL, không nạp từng ExerciseLog. Dùng subquery
+            # tương quan (không JOIN + GROUP BY): chỉ tính cho các session của
+            # trang hiện tại, không phải cho toàn bộ lịch sử trước LIMIT.
+            logs = ExerciseLog.objects.filter(session=OuterRef('pk')).order_by()
+            return queryset.annotate(
+                exercise_count=Coalesce(Subquery(logs.annotate(
+                    value=Func('id', function='COUNT', output_field=IntegerField()),
+                ).values('value')), Value(0)),
+                total_sets=Coalesce(Subquery(logs.annotate(
+                    value=Func('sets_completed', function='SUM', output_field=IntegerField()),
+                ).values('value')), Value(0)),
+            )
+        # Nạp toàn bộ logs (và sets) của các session trong 2 query (thay vì 1 query/session)
+        return queryset.prefetch_related('logs__sets')
+
+    def get_serializer_class(self):
+        if self._wants_summary():
+            return WorkoutSessionSummarySerializer
+        return WorkoutSessionSerializer
 
     def get_serializer_context(self):
         """
@@ -246,24 +322,71 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         """
         return {'request': self.request}
 
+    def perform_update(self, serializer):
+        """
+        Sửa session (vd. total_calories) => trừ giá trị cũ, cộng giá trị mới
+        vào bảng tổng hợp của Dashboard.
+        """
+        old_session = copy.copy(serializer.instance)
+        data = serializer.validated_data
+        touches_logs = 'logs' in data or data.get('start_time', old_session.start_time) != old_session.start_time
+        with transaction.atomic():
+            apply_session(old_session, sign=-1, muscle_volume=touches_logs)
+            session = serializer.save()
+            apply_session(session, sign=1, muscle_volume=touches_logs)
+
+    def perform_destroy(self, instance):
+        remove_session(instance)
+
+    # Số session tối đa cho 1 lần đồng bộ
+    MAX_SYNC_SESSIONS = 100
+
+    # Đây là API: POST /api/v1/sessions/sync/
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Đồng bộ các buổi tập được lưu offline trên điện thoại.
+        Body là MẢNG các session (cùng định dạng với POST /sessions/).
+        Tất cả được lưu trong 1 transaction: hoặc lưu hết, hoặc không lưu gì.
+        """
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.MAX_SYNC_SESSIONS)
+        serializer.is_valid(raise_exception=True)
+        sessions = serializer.save()
+        # Trả về ID (và kỷ lục mới của từng session) theo đúng thứ tự gửi lên để client đối chiếu hàng đợi
+        return Response({
+            "created": len(sessions),
+            "ids": [session.id for session in sessions],
+            "new_records": [session.new_records for session in sessions],
+        }, status=201)
+
     # Bạn có thể tắt các hành động không dùng đến, ví dụ 'update'
     # http_method_names = ['get', 'post', 'retrieve', 'delete']'
 
 # --- NHÓM 4: PROGRESS VISUALIZATION (UC12) ---
-class DashboardView(APIView):
+class DashboardView(AsyncAPIView):
     """
-    API endpoint (chỉ GET) để trả về dữ liệu tổng hợp
+    API endpoint (chỉ GET, async) để trả về dữ liệu tổng hợp
     cho dashboard (UC12).
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         user = request.user
         try:
-            profile = user.profile
+            profile = await aget_profile(user)
         except Profile.DoesNotExist:
             return Response({"error": "Profile not found"}, status=404)
 
+        # Dữ liệu tổng hợp (đã được tính sẵn trong UserStats)
+        stats = await UserStats.objects.filter(pk=user.pk).afirst() or UserStats(user=user)
+        # Streak & Adherence % (từ chỉ mục DailyActivity)
+        streak, adherence = await aget_streak_and_adherence(user, profile.days_per_week)
+
+        return Response(self.build(profile, stats, streak, adherence))
+
+    @staticmethod
+    def build(profile, stats, streak, adherence):
+        """ JSON của Dashboard """
         # 1. Lấy dữ liệu từ Profile (cho BMI)
         current_weight = profile.weight_kg or 0
         current_height_m = (profile.height_cm or 100) / 100
@@ -271,34 +394,69 @@ class DashboardView(APIView):
         if current_height_m > 0:
             current_bmi = round(current_weight / (current_height_m ** 2), 1)
 
-        # 2. Lấy dữ liệu tổng hợp từ các Session
-        user_sessions = WorkoutSession.objects.filter(user=user)
-        
-        total_calories = user_sessions.aggregate(
-            total=Sum('total_calories')
-        )['total'] or 0
-        
-        avg_posture = user_sessions.aggregate(
-            avg=Avg('posture_score_avg')
-        )['avg'] or 0
-        
-        total_workouts = user_sessions.count()
-
-        # (Logic cho "Streak" và "Adherence %" phức tạp hơn, 
-        # bạn có thể thêm sau, chúng đòi hỏi phân tích ngày tháng)
+        # 2. Lấy dữ liệu tổng hợp
+        total_calories = stats.total_calories
+        avg_posture = stats.average_posture_score
+        total_workouts = stats.workout_count
 
         # 3. Đóng gói JSON trả về
-        dashboard_data = {
+        return {
             "current_bmi": current_bmi,
             "total_calories_burnt": total_calories,
             "total_workouts": total_workouts,
             "average_posture_score": round(avg_posture, 1),
-            "streak": 0, # (Để tạm)
-            "adherence_percent": 0 # (Để tạm)
+            "streak": streak,
+            "adherence_percent": adherence
         }
-        
-        return Response(dashboard_data)
     
+class MuscleVolumeView(APIView):
+    """
+    GET /analytics/muscle-volume/?weeks=8: số set, tổng rep và tonnage mỗi
+    tuần theo nhóm cơ, N tuần gần nhất (kể cả tuần hiện tại, tuần trống vẫn có
+    mặt để vẽ biểu đồ). Đọc từ WeeklyMuscleVolume: chi phí chỉ phụ thuộc N.
+    """
+    permission_classes = [IsAuthenticated]
+    DEFAULT_WEEKS = 8
+    MAX_WEEKS = 52
+
+    def get(self, request, *args, **kwargs):
+        count = request.query_params.get('weeks', str(self.DEFAULT_WEEKS))
+        if not count.isdigit() or not 1 <= int(count) <= self.MAX_WEEKS:
+            return Response({"error": f"weeks phải từ 1 đến {self.MAX_WEEKS}."}, status=400)
+
+        current_week = week_start(timezone.localdate())
+        weeks = [current_week - datetime.timedelta(weeks=offset) for offset in range(int(count) - 1, -1, -1)]
+        rows = WeeklyMuscleVolume.objects.filter(
+            user=request.user, week_start__gte=weeks[0], week_start__lte=current_week,
+        ).values_list('week_start', 'muscle_group', 'set_count', 'total_reps', 'volume_kg')
+
+        by_week = {week: {} for week in weeks}
+        totals = {}
+        for week, muscle_group, set_count, total_reps, volume_kg in rows:
+            by_week[week][muscle_group] = {"sets": set_count, "reps": total_reps, "volume_kg": volume_kg}
+            total = totals.setdefault(muscle_group, {"sets": 0, "reps": 0, "volume_kg": 0})
+            total["sets"] += set_count
+            total["reps"] += total_reps
+            total["volume_kg"] = round(total["volume_kg"] + volume_kg, 2)
+
+        return Response({
+            "weeks": [{"week_start": week, "muscle_groups": groups} for week, groups in by_week.items()],
+            "totals": totals,
+        })
+
+class PersonalRecordListView(generics.ListAPIView):
+    """
+    GET /records/: kỷ lục cá nhân của user cho từng bài tập đã tập.
+    Đọc thẳng bảng PersonalRecord (1 dòng mỗi bài tập, xem api/records.py).
+    """
+    serializer_class = PersonalRecordSerializer
+    permission_classes = [IsAuthenticated]
+    # Số dòng bị giới hạn bởi thư viện bài tập => không cần phân trang
+    pagination_class = None
+
+    def get_queryset(self):
+        return PersonalRecord.objects.filter(user=self.request.user).select_related('exercise').order_by('exercise__name')
+
 # --- NHÓM 6: NUTRITION & HYDRATION (UC19, UC20) ---
 
 class NutritionLogViewSet(viewsets.ModelViewSet):
@@ -308,6 +466,7 @@ class NutritionLogViewSet(viewsets.ModelViewSet):
     """
     serializer_class = NutritionLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NutritionLogPagination
 
     def get_queryset(self):
         """
@@ -328,6 +487,7 @@ class HydrationLogViewSet(viewsets.ModelViewSet):
     """
     serializer_class = HydrationLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = HydrationLogPagination
     # Chỉ cho phép các phương thức này, tránh PUT/PATCH không cần thiết
     http_method_names = ['get', 'post', 'delete', 'head', 'options']
 
@@ -345,7 +505,7 @@ class HydrationLogViewSet(viewsets.ModelViewSet):
 
 
 # --- NHÓM 6: NUTRITION (UC18) ---
-class MealSuggestionView(APIView):
+class MealSuggestionView(AsyncAPIView):
     """
     API endpoint (chỉ GET) để gợi ý bữa ăn (UC18).
     """
@@ -438,16 +598,24 @@ class MealSuggestionView(APIView):
     ]
 
     # === THAY THẾ HÀM 'get' CŨ BẰNG HÀM NÀY ===
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         try:
-            profile = request.user.profile
+            profile = await aget_profile(request.user)
         except Profile.DoesNotExist:
             return Response({"error": "Profile not found"}, status=404)
 
+        data, status = self.suggest(profile)
+        return Response(data, status=status)
+
+    @classmethod
+    def suggest(cls, profile):
+        """
+        Trả về (data, status) cho profile này.
+        """
         if not all([profile.weight_kg, profile.height_cm, profile.age, profile.gender, profile.activity_level, profile.main_goal]):
-            return Response(
+            return (
                 {"error": "Profile của bạn chưa hoàn thiện. Cần có đủ thông tin cơ bản và mục tiêu."},
-                status=400
+                400
             )
 
         # 1. Tính TDEE (calo duy trì)
@@ -465,14 +633,14 @@ class MealSuggestionView(APIView):
 
         # 3. Lọc các template theo mục tiêu của user
         goal_templates = [
-            template for template in self.MEAL_TEMPLATES 
+            template for template in cls.MEAL_TEMPLATES 
             if template['goal_type'] == user_goal
         ]
         
         if not goal_templates:
             # Dự phòng: Nếu không có template cho mục tiêu, dùng 'maintain'
             goal_templates = [
-                template for template in self.MEAL_TEMPLATES 
+                template for template in cls.MEAL_TEMPLATES 
                 if template['goal_type'] == 'maintain'
             ]
 
@@ -493,4 +661,66 @@ class MealSuggestionView(APIView):
             'calculated_target_calories': calories_target
         }
 
-        return Response(response_data)
\ No newline at end of file
+        return response_data, 200
+
+
+# --- NHÓM 7: EXPORT DỮ LIỆU ---
+class ExportView(APIView):
+    """
+    API endpoint (chỉ GET) xuất toàn bộ lịch sử của user đang đăng nhập,
+    dạng stream (xem api/export.py):
+    - GET /export/ hoặc ?format=ndjson: mọi bảng, mỗi dòng một bản ghi có "type"
+    - GET /export/?format=csv&dataset=sessions: CSV của đúng 1 bảng
+    Tùy chọn: ?dataset=... (lặp lại được), ?since=YYYY-MM-DD.
+    Gửi `Accept-Encoding: gzip` để nhận dữ liệu nén.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request, *args, **kwargs):
+        names = request.query_params.getlist('dataset') or list(EXPORT_DATASETS)
+        unknown = [name for name in names if name not in EXPORT_DATASETS]
+        if unknown:
+            return Response(
+                {"error": f"dataset không hợp lệ: {', '.join(unknown)}. Chọn trong: {', '.join(EXPORT_DATASETS)}."},
+                status=400
+            )
+        export_format = request.accepted_renderer.format
+        if export_format == 'csv' and len(names) != 1:
+            return Response({"error": "CSV chỉ xuất 1 bảng mỗi lần, ví dụ ?dataset=sessions."}, status=400)
+
+        since = None
+        if request.query_params.get('since'):
+            try:
+                since_date = parse_date(request.query_params['since'])
+            except ValueError:
+                since_date = None
+            if since_date is None:
+                return Response({"error": "since phải có dạng YYYY-MM-DD."}, status=400)
+            since = timezone.make_aware(datetime.datetime.combine(since_date, datetime.time.min))
+
+        querysets = []
+        for name in names:
+            dataset = EXPORT_DATASETS[name]
+            queryset = dataset.queryset(request.user, since)
+            # Chốt CSDL (replica/primary) ngay trong request: dữ liệu chỉ được
+            # đọc khi stream, lúc đó router không còn biết request là gì
+            querysets.append((name, dataset, queryset.using(queryset.db)))
+
+        if export_format == 'csv':
+            lines = csv_lines(*querysets[0][1:])
+        else:
+            lines = ndjson_lines(querysets)
+        gzip = accepts_gzip(request.headers.get('Accept-Encoding', ''))
+        response = StreamingHttpResponse(
+            export_stream(lines, gzip=gzip, asynchronous=isinstance(request._request, ASGIRequest)),
+            content_type=f'{request.accepted_renderer.media_type}; charset=utf-8',
+        )
+        label = '-'.join(names) if len(names) < len(EXPORT_DATASETS) else 'all'
+        response['Content-Disposition'] = (
+            f'attachment; filename="fitform-{label}-{timezone.localdate().isoformat()}.{export_format}"'
+        )
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response